@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from .models import Estado
+        from .services.estado_service import invalidar_estados
+
+        # Cualquier escritura de Estado (API, admin, seed) vacía el registro
+        post_save.connect(invalidar_estados, sender=Estado, dispatch_uid="estado_guardado")
+        post_delete.connect(invalidar_estados, sender=Estado, dispatch_uid="estado_borrado")
@@ -1,9 +1,111 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
 import jwt
 from django.conf import settings
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 
-from .models import Usuario
+from .models import Usuario, Rol
+
+
+class _CachePrincipales:
+    """
+    Cache por proceso de los usuarios autenticados (con su Rol ya cargado).
+    - TTL: cada entrada caduca a los AUTH_USER_CACHE_TTL segundos
+    - LRU: como máximo AUTH_USER_CACHE_MAX entradas
+    Con la cache caliente, autenticar no hace ninguna consulta a la BD.
+    """
+
+    def __init__(self):
+        self._entradas = OrderedDict()  # id_usuario -> (expira_en, usuario)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expiradas = 0
+        self.invalidaciones = 0
+
+    @staticmethod
+    def _ttl():
+        return getattr(settings, "AUTH_USER_CACHE_TTL", 60)
+
+    @staticmethod
+    def _max_entradas():
+        return getattr(settings, "AUTH_USER_CACHE_MAX", 1024)
+
+    def obtener(self, user_id):
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(user_id)
+            if entrada is None:
+                self.misses += 1
+                return None
+
+            expira_en, usuario = entrada
+            if expira_en <= ahora:
+                del self._entradas[user_id]
+                self.expiradas += 1
+                self.misses += 1
+                return None
+
+            self._entradas.move_to_end(user_id)
+            self.hits += 1
+
+        # Copia superficial: cada request recibe su propia instancia
+        # (el Rol cacheado viaja en la copia, no se vuelve a consultar)
+        return copy.copy(usuario)
+
+    def guardar(self, usuario):
+        ttl = self._ttl()
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._entradas[usuario.id_usuario] = (time.monotonic() + ttl, copy.copy(usuario))
+            self._entradas.move_to_end(usuario.id_usuario)
+            while len(self._entradas) > self._max_entradas():
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, user_id):
+        with self._lock:
+            if self._entradas.pop(user_id, None) is not None:
+                self.invalidaciones += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self.hits = self.misses = self.expiradas = self.invalidaciones = 0
+
+    def estadisticas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self._max_entradas(),
+                "ttl_segundos": self._ttl(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expiradas": self.expiradas,
+                "invalidaciones": self.invalidaciones,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+principal_cache = _CachePrincipales()
+
+
+def invalidar_usuario(id_usuario):
+    """
+    Quita al usuario de la cache de autenticación.
+    Llamar siempre que cambie la fila (datos, rol, contraseña o borrado).
+    """
+    principal_cache.invalidar(id_usuario)
+
+
+def estadisticas_cache():
+    return principal_cache.estadisticas()
 
 
 class JWTAuthentication(BaseAuthentication):
@@ -12,6 +114,11 @@ class JWTAuthentication(BaseAuthentication):
     Espera un header: Authorization: Bearer <token>
     """
 
+    def authenticate_header(self, request):
+        # Con esto DRF responde 401 (y no 403) cuando el token no vale,
+        # que es lo que el front usa para intentar /token/refresh/
+        return 'Bearer realm="api"'
+
     def authenticate(self, request):
         auth_header = request.headers.get("Authorization")
 
@@ -39,11 +146,53 @@ class JWTAuthentication(BaseAuthentication):
             raise AuthenticationFailed("Token inválido")
 
         user_id = payload.get("user_id")
+        token_version = payload.get("tv")
 
-        try:
-            usuario = Usuario.objects.get(id_usuario=user_id)
-        except Usuario.DoesNotExist:
-            raise AuthenticationFailed("Usuario no encontrado")
+        if getattr(settings, "JWT_CLAIMS_ONLY", False) and token_version is not None:
+            return (self._usuario_desde_claims(payload), None)
+
+        usuario = principal_cache.obtener(user_id)
+        if usuario is None:
+            try:
+                # select_related: el rol queda cargado y request.user.id_rol no consulta
+                usuario = Usuario.objects.select_related("id_rol").get(id_usuario=user_id)
+            except Usuario.DoesNotExist:
+                raise AuthenticationFailed("Usuario no encontrado")
+            principal_cache.guardar(usuario)
+
+        # Tokens antiguos (sin "tv") se aceptan hasta que expiren
+        if token_version is not None and token_version != usuario.token_version:
+            raise AuthenticationFailed("El token ha sido revocado")
 
         # DRF espera (user, auth) => auth puede ser None
         return (usuario, None)
+
+    def _usuario_desde_claims(self, payload):
+        """
+        Modo claims-only: el rol viene firmado en el token y solo se
+        comprueba la token_version contra el mapa en memoria.
+        El Usuario devuelto NO está cargado de la BD: solo trae id, correo
+        y rol (suficiente para permisos, auditoría y FKs).
+        """
+        from .services.token_service import version_vigente
+
+        user_id = payload.get("user_id")
+        version = version_vigente(user_id)
+        if version is None:
+            raise AuthenticationFailed("Usuario no encontrado")
+        if version != payload.get("tv"):
+            raise AuthenticationFailed("El token ha sido revocado")
+
+        rol = Rol(id_rol=payload.get("rol_id"), descripcion_rol=payload.get("rol") or "")
+        rol._state.adding = False
+        rol._state.db = "default"
+
+        usuario = Usuario(
+            id_usuario=user_id,
+            correo=payload.get("correo") or "",
+            token_version=version,
+        )
+        usuario._state.adding = False
+        usuario._state.db = "default"
+        usuario.id_rol = rol
+        return usuario
@@ -15,9 +15,7 @@ from api.services.actividad_service import (
 )
 
 
-ROLE_ADMIN = 1
-ROLE_RECEPCIONISTA = 3
-ROLE_VETERINARIO = 4
+from api.permissions import ROLE_ADMIN, ROLE_VETERINARIO
 
 # Para citas: normalmente solo debería ser Veterinario (y opcional Admin si también atiende)
 ROLES_DOCTOR_PARA_CITAS = {ROLE_VETERINARIO, ROLE_ADMIN}  # si NO quieres admin, deja solo {ROLE_VETERINARIO}
@@ -123,7 +121,7 @@ def doctores_por_actividad_view(request, id_actividad):
         if not d:
             continue
 
-        rid = getattr(getattr(d, "id_rol", None), "id_rol", None)
+        rid = d.id_rol_id
 
         # 🔥 IMPORTANTE: aquí decides quién aparece en "Seleccionar doctor"
         if rid not in ROLES_DOCTOR_PARA_CITAS:
@@ -4,45 +4,17 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Exists, OuterRef
+from django.conf import settings
 
-
-from ..models import Agenda, Turno, Usuario
 from ..serializers import AgendaSerializer
-
-
-ROLE_ADMIN = 1
-ROLE_CLIENTE = 2
-ROLE_RECEPCIONISTA = 3
-ROLE_VETERINARIO = 4
-
-def _role_id(user):
-    """
-    Devuelve el id del rol del usuario (int).
-    Soporta FK: user.id_rol.id_rol
-    """
-    try:
-        return int(user.id_rol.id_rol)
-    except Exception:
-        return None
-
-def _can_view_agenda(user):
-    # Admin / Recepcionista / Veterinario pueden VER horarios
-    return _role_id(user) in (ROLE_ADMIN, ROLE_RECEPCIONISTA, ROLE_VETERINARIO)
-
-def _can_edit_agenda(user):
-    # Solo admin puede EDITAR/guardar
-    return _role_id(user) == ROLE_ADMIN
+from ..permissions import IsAdmin, IsStaff
+from ..services import agenda_service, ocupacion_service
 
 
 # GET /agenda/horarios/doctor/<id_doctor>/?dia=YYYY-MM-DD
 @api_view(["GET"])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, IsStaff])  # Admin / Recepcionista / Veterinario pueden VER
 def horarios_doctor_por_dia(request, id_doctor):
-    # Admin / Recepcionista / Veterinario pueden VER
-    if not _can_view_agenda(request.user):
-        return Response({"detail": "No autorizado"}, status=403)
-
     dia_str = request.query_params.get("dia")
     if not dia_str:
         return Response(
@@ -58,30 +30,19 @@ def horarios_doctor_por_dia(request, id_doctor):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    try:
-        doctor = Usuario.objects.get(id_usuario=id_doctor)
-    except Usuario.DoesNotExist:
+    # Desde la cache de ocupación: sin consultas si el día ya está cargado
+    bloques = ocupacion_service.bloques_del_dia(id_doctor, dia, con_ocupado=False)
+    if bloques is None:
         return Response({"detail": "Doctor no encontrado."}, status=404)
-
-    agendas = Agenda.objects.filter(
-        id_usuario=doctor,
-        dia_atencion=dia,
-    ).order_by("hora_atencion")
-
-    serializer = AgendaSerializer(agendas, many=True)
-    return Response(serializer.data, status=200)
+    return Response(bloques, status=200)
 
 
 # ESTE LO PUEDES SEGUIR USANDO EN OTROS LADOS SI QUIERES, PERO
 # YA NO LO USA LA PÁGINA DE FRONT
 # POST /agenda/horarios/doctor/<id_doctor>/toggle/
 @api_view(["POST"])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, IsAdmin])  # Solo admin puede EDITAR
 def toggle_horario_doctor(request, id_doctor):
-    if not _can_edit_agenda(request.user):
-        return Response({"detail": "No autorizado"}, status=403)
-
-
     dia_str = request.data.get("dia")
     hora_str = request.data.get("hora")  # "08:00"
 
@@ -121,6 +82,7 @@ def toggle_horario_doctor(request, id_doctor):
             hora_atencion=hora,
         )
         agenda.delete()
+        ocupacion_service.agenda_cambiada(doctor.id_usuario, [dia])
         return Response({"activo": False, "detail": "Bloque deshabilitado."}, status=200)
     except Agenda.DoesNotExist:
         agenda = Agenda.objects.create(
@@ -131,6 +93,7 @@ def toggle_horario_doctor(request, id_doctor):
             id_usuario_creacion_agenda=request.user.id_usuario,
             id_usuario_actualizacion_agenda=request.user.id_usuario,
         )
+        ocupacion_service.agenda_cambiada(doctor.id_usuario, [dia])
         return Response(
             {
                 "activo": True,
@@ -141,101 +104,72 @@ def toggle_horario_doctor(request, id_doctor):
         )
 
 
-# 👉 NUEVO: GUARDAR TODO EL DÍA DE GOLPE
-# PUT /agenda/horarios/doctor/<id_doctor>/guardar/
-@api_view(["PUT"])
-@permission_classes([IsAuthenticated])
-def guardar_horarios_doctor(request, id_doctor):
-    if not _can_edit_agenda(request.user):
-        return Response({"detail": "No autorizado"}, status=403)
-
-
-    dia_str = request.data.get("dia")
-    horas = request.data.get("horas", [])  # ["08:00", "09:00", ...]
-
-    if not dia_str:
-        return Response(
-            {"detail": "Se requiere el campo 'dia' (YYYY-MM-DD)."},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
-
-    if not isinstance(horas, list):
-        return Response(
-            {"detail": "El campo 'horas' debe ser una lista de strings 'HH:MM'."},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
-
+def _horas_del_dia(dia_str, horas):
+    """("YYYY-MM-DD", ["HH:MM", ...]) -> (date, {time}). Lanza ValueError con el mensaje para el cliente."""
     try:
-        dia = date.fromisoformat(dia_str)
-        if dia < date.today():
-            return Response(
-                {"detail": "No se pueden modificar horarios en fechas pasadas."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        dia = date.fromisoformat(str(dia_str))
     except ValueError:
-        return Response(
-            {"detail": "Formato de fecha inválido. Usa YYYY-MM-DD."},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
-        
-        
+        raise ValueError("Formato de fecha inválido. Usa YYYY-MM-DD.")
+    if dia < date.today():
+        raise ValueError("No se pueden modificar horarios en fechas pasadas.")
+
+    if not isinstance(horas, list):
+        raise ValueError("Las horas de cada día deben ser una lista de strings 'HH:MM'.")
 
-    # Parsear cada "HH:MM" a time
     horas_deseadas = set()
     for hs in horas:
         try:
             h, m = hs.split(":")
             horas_deseadas.add(time(int(h), int(m)))
         except Exception:
+            raise ValueError(f"Hora inválida: '{hs}'. Usa formato HH:MM.")
+    return dia, horas_deseadas
+
+
+# 👉 NUEVO: GUARDAR TODO EL DÍA (O VARIOS DÍAS) DE GOLPE
+# PUT /agenda/horarios/doctor/<id_doctor>/guardar/
+# { "dia": "YYYY-MM-DD", "horas": ["08:00", ...] }
+# o { "dias": { "YYYY-MM-DD": ["08:00", ...], ... } } para guardar una semana entera
+@api_view(["PUT"])
+@permission_classes([IsAuthenticated, IsAdmin])  # Solo admin puede guardar
+def guardar_horarios_doctor(request, id_doctor):
+    if "dias" in request.data:
+        dias_pedidos = request.data.get("dias")
+        if not isinstance(dias_pedidos, dict) or not dias_pedidos:
             return Response(
-                {"detail": f"Hora inválida: '{hs}'. Usa formato HH:MM."},
+                {"detail": "El campo 'dias' debe ser un objeto { 'YYYY-MM-DD': ['HH:MM', ...] }."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-
-    try:
-        doctor = Usuario.objects.get(id_usuario=id_doctor)
-    except Usuario.DoesNotExist:
-        return Response({"detail": "Doctor no encontrado."}, status=404)
-
-    # Agendas actuales para ese día y doctor
-    agendas_actuales = Agenda.objects.filter(
-        id_usuario=doctor,
-        dia_atencion=dia,
-    )
-
-    # Mapear hora_atencion -> instancia Agenda
-    mapa_actual = {a.hora_atencion: a for a in agendas_actuales}
-    horas_actuales = set(mapa_actual.keys())
-
-    # 1) Eliminar las que sobran (están en BD pero no en la lista nueva)
-    horas_a_eliminar = horas_actuales - horas_deseadas
-    for h in horas_a_eliminar:
-        mapa_actual[h].delete()
-
-    # 2) Crear las nuevas (están en la lista pero no en la BD)
-    horas_a_crear = horas_deseadas - horas_actuales
-    for h in horas_a_crear:
-        Agenda.objects.create(
-            id_usuario=doctor,
-            dia_atencion=dia,
-            hora_atencion=h,
-            duracion_turno=timedelta(hours=1),
-            id_usuario_creacion_agenda=request.user.id_usuario,
-            id_usuario_actualizacion_agenda=request.user.id_usuario,
+    elif request.data.get("dia"):
+        dias_pedidos = {request.data["dia"]: request.data.get("horas", [])}
+    else:
+        return Response(
+            {"detail": "Se requiere el campo 'dia' (YYYY-MM-DD) o 'dias'."},
+            status=status.HTTP_400_BAD_REQUEST,
         )
 
-    # 3) Opcional: actualizar "quién actualizó" en las que se mantienen
-    horas_que_quedan = horas_deseadas & horas_actuales
-    for h in horas_que_quedan:
-        ag = mapa_actual[h]
-        ag.id_usuario_actualizacion_agenda = request.user.id_usuario
-        ag.save(update_fields=["id_usuario_actualizacion_agenda"])
+    max_dias = settings.HORARIOS_MAX_DIAS
+    if len(dias_pedidos) > max_dias:
+        return Response(
+            {"detail": f"Como mucho {max_dias} días por petición."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
-    # Devolver el resultado final del día
-    agendas_finales = Agenda.objects.filter(
-        id_usuario=doctor,
-        dia_atencion=dia,
-    ).order_by("hora_atencion")
+    dias = {}
+    try:
+        for dia_str, horas in dias_pedidos.items():
+            dia, horas_deseadas = _horas_del_dia(dia_str, horas)
+            dias[dia] = horas_deseadas
+    except ValueError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Todo en una transacción y sin consultas por bloque; las horas con
+    # turnos no se borran aunque no vengan en la lista
+    agendas_finales = agenda_service.guardar_horarios(
+        id_doctor, dias, realizado_por=request.user.id_usuario
+    )
+    if agendas_finales is None:
+        return Response({"detail": "Doctor no encontrado."}, status=404)
 
     serializer = AgendaSerializer(agendas_finales, many=True)
     return Response(serializer.data, status=200)
@@ -259,26 +193,78 @@ def agenda_disponibilidad_doctor(request, doctor_id):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    if not Usuario.objects.filter(id_usuario=doctor_id).exists():
+    # ✅ cada bloque con "ocupado" si tiene un turno vigente ese día
+    # (los cancelados liberan el bloque); servido desde la cache de ocupación
+    bloques = ocupacion_service.bloques_del_dia(doctor_id, dia)
+    if bloques is None:
         return Response({"detail": "Doctor no encontrado."}, status=404)
+    return Response(bloques, status=200)
 
-    agendas = Agenda.objects.filter(
-        id_usuario_id=doctor_id,
-        dia_atencion=dia,
-    ).order_by("hora_atencion")
 
-    # ✅ marcar si ya existe un turno en esa agenda y ese día
-    turnos_qs = Turno.objects.filter(
-        id_agenda=OuterRef("pk"),
-        fecha_turno=dia
-    )
-    agendas = agendas.annotate(ocupado=Exists(turnos_qs))
+def _fecha_param(request, nombre):
+    valor = request.query_params.get(nombre)
+    if not valor:
+        return None
+    return date.fromisoformat(valor)
 
-    serializer = AgendaSerializer(agendas, many=True)
-    data = serializer.data
 
-    # ✅ inyectar el campo ocupado en el JSON final
-    for i, a in enumerate(agendas):
-        data[i]["ocupado"] = bool(a.ocupado)
+# GET /agenda/disponibilidad/?doctores=3,5&desde=YYYY-MM-DD&hasta=YYYY-MM-DD
+# GET /agenda/disponibilidad/?id_actividad=2&desde=...&hasta=...
+# Todos los doctores y días de una vista de calendario en una sola petición
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def agenda_disponibilidad(request):
+    try:
+        desde = _fecha_param(request, "desde")
+        hasta = _fecha_param(request, "hasta") or desde
+    except ValueError:
+        return Response(
+            {"detail": "Formato de fecha inválido. Usa YYYY-MM-DD."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if not desde:
+        return Response(
+            {"detail": "Falta el parámetro 'desde' (YYYY-MM-DD)."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    max_dias = settings.DISPONIBILIDAD_MAX_DIAS
+    if hasta < desde or (hasta - desde).days + 1 > max_dias:
+        return Response(
+            {"detail": f"El rango debe ir de 'desde' a 'hasta' y tener como mucho {max_dias} días."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
-    return Response(data, status=200)
+    doctores = None
+    id_actividad = request.query_params.get("id_actividad")
+    try:
+        if request.query_params.get("doctores"):
+            doctores = {int(d) for d in request.query_params["doctores"].split(",")}
+        if id_actividad:
+            id_actividad = int(id_actividad)
+    except ValueError:
+        return Response(
+            {"detail": "'doctores' debe ser una lista de ids separados por comas e 'id_actividad' un id."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if doctores is None and not id_actividad:
+        return Response(
+            {"detail": "Indica 'doctores' o 'id_actividad'."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if doctores is not None and len(doctores) > settings.DISPONIBILIDAD_MAX_DOCTORES:
+        return Response(
+            {"detail": f"Como mucho {settings.DISPONIBILIDAD_MAX_DOCTORES} doctores por petición."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    return Response(
+        {
+            "desde": desde.isoformat(),
+            "hasta": hasta.isoformat(),
+            "doctores": agenda_service.disponibilidad(
+                desde, hasta, doctores=doctores, id_actividad=id_actividad or None
+            ),
+        },
+        status=200,
+    )
@@ -1,25 +1,36 @@
-import datetime
-import jwt
-from django.conf import settings
-from django.contrib.auth.hashers import check_password
-
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.decorators import api_view, permission_classes, authentication_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from ..serializers import UsuarioSerializer
 from ..services import usuario_service
+from ..services.token_service import (
+    emitir_access_token,
+    emitir_refresh_token,
+    rotar_refresh_token,
+    revocar_refresh_tokens,
+    incrementar_token_version,
+    RefreshTokenInvalido,
+)
+from ..services.password_service import verificar, HashingSaturado
 
 from ..models import Usuario
 
 
+def respuesta_saturado(error):
+    """503 + Retry-After para HashingSaturado: la misma en todas las vistas que hashean."""
+    resp = Response({"detail": str(error)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    resp["Retry-After"] = "1"
+    return resp
+
+
 @api_view(["POST"])
 @permission_classes([AllowAny])  # Login debe ser público
 def login(request):
     """
     Endpoint de login:
     - Recibe: cedula o correo + contrasena
-    - Devuelve: token JWT + info básica del usuario
+    - Devuelve: token JWT (access) + refresh token + info básica del usuario
     """
     cedula = request.data.get("cedula")
     correo = request.data.get("correo")
@@ -33,41 +44,38 @@ def login(request):
 
     # Buscar usuario por cédula o correo
     try:
+        usuarios = Usuario.objects.select_related("id_rol")
         if cedula:
-            usuario = Usuario.objects.get(cedula=cedula)
+            usuario = usuarios.get(cedula=cedula)
         else:
-            usuario = Usuario.objects.get(correo=correo)
+            usuario = usuarios.get(correo=correo)
     except Usuario.DoesNotExist:
         return Response(
             {"detail": "Credenciales inválidas"},
             status=status.HTTP_401_UNAUTHORIZED,
         )
 
-    # Verificar contraseña (está encriptada con make_password)
-    if not check_password(contrasena, usuario.contrasena):
+    # Verificar contraseña (está encriptada con make_password).
+    # El PBKDF2 corre en el pool de hashing: si está lleno, 503 inmediato
+    try:
+        contrasena_ok = verificar(contrasena, usuario.contrasena)
+    except HashingSaturado as e:
+        return respuesta_saturado(e)
+
+    if not contrasena_ok:
         return Response(
             {"detail": "Credenciales inválidas"},
             status=status.HTTP_401_UNAUTHORIZED,
         )
 
-    # Crear payload del token
-    payload = {
-        "user_id": usuario.id_usuario,
-        "correo": usuario.correo,
-        "rol": usuario.id_rol.descripcion_rol if usuario.id_rol else None,
-        "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=4),  # expira en 4h
-        "iat": datetime.datetime.utcnow(),
-    }
-
-    token = jwt.encode(payload, settings.SECRET_KEY, algorithm="HS256")
-
-    # PyJWT en versiones nuevas devuelve str, en viejas bytes -> por si acaso:
-    if isinstance(token, bytes):
-        token = token.decode("utf-8")
+    # Token firmado con rol y token_version (ver token_service)
+    token = emitir_access_token(usuario)
+    refresh = emitir_refresh_token(usuario)
 
     return Response(
     {
         "access": token,
+        "refresh": refresh,
         "usuario": {
             "id_usuario": usuario.id_usuario,
             "cedula": usuario.cedula,
@@ -76,7 +84,7 @@ def login(request):
             "correo": usuario.correo,
             "telefono": usuario.telefono,
             "direccion": usuario.direccion,
-            "id_rol": usuario.id_rol.id_rol if usuario.id_rol else None,
+            "id_rol": usuario.id_rol_id,
             "rol": usuario.id_rol.descripcion_rol if usuario.id_rol else None,
         },
     },
@@ -94,9 +102,54 @@ def register(request):
     """
     serializer = UsuarioSerializer(data=request.data)
     if serializer.is_valid():
-        usuario = usuario_service.crear_usuario(serializer.validated_data)
+        try:
+            usuario = usuario_service.crear_usuario(serializer.validated_data)
+        except HashingSaturado as e:
+            return respuesta_saturado(e)
         return Response(
             UsuarioSerializer(usuario).data,
             status=status.HTTP_201_CREATED,
         )
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def logout(request):
+    """
+    Cierra sesión en TODOS los dispositivos:
+    incrementa la token_version y los JWT emitidos dejan de valer.
+    """
+    revocar_refresh_tokens(request.user.id_usuario)
+    incrementar_token_version(request.user.id_usuario)
+    return Response({"detail": "Sesión cerrada"}, status=status.HTTP_200_OK)
+
+
+@api_view(["POST"])
+@authentication_classes([])  # el access token puede venir expirado: no se valida
+@permission_classes([AllowAny])
+def token_refresh(request):
+    """
+    Renueva el access token sin pedir contraseña (sin PBKDF2):
+    - Recibe: refresh
+    - Devuelve: access nuevo + refresh nuevo (el anterior queda revocado)
+    """
+    refresh = request.data.get("refresh")
+    if not refresh:
+        return Response(
+            {"detail": "Debe enviar el refresh token"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        usuario, nuevo_refresh = rotar_refresh_token(refresh)
+    except RefreshTokenInvalido as e:
+        return Response({"detail": str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+
+    return Response(
+        {
+            "access": emitir_access_token(usuario),
+            "refresh": nuevo_refresh,
+        },
+        status=status.HTTP_200_OK,
+    )
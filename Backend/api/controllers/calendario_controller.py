@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+
+from ..db_router import usar_replica
+from ..permissions import es_admin
+from ..services import calendario_service
+
+
+# GET  /agenda/calendario/doctor/<id_doctor>/ -> URL vigente del feed
+# POST /agenda/calendario/doctor/<id_doctor>/ -> revoca las anteriores y da una nueva
+# -> { "token": "...", "url": "https://.../api/agenda/calendario/<token>.ics" }
+# Solo el propio doctor o un admin: el feed lleva nombres y teléfonos de clientes.
+@api_view(["GET", "POST"])
+@permission_classes([IsAuthenticated])
+def calendario_doctor_token(request, id_doctor):
+    if not (es_admin(request.user) or request.user.id_usuario == id_doctor):
+        return Response({"detail": "No autorizado"}, status=status.HTTP_403_FORBIDDEN)
+
+    doctor = calendario_service.doctores().filter(id_usuario=id_doctor).first()
+    if doctor is None:
+        return Response({"detail": "Doctor no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+    if request.method == "POST":
+        calendario_service.revocar(id_doctor)
+        doctor.refresh_from_db(fields=["version_calendario"])
+
+    token = calendario_service.firmar(doctor)
+    return Response(
+        {
+            "token": token,
+            "url": request.build_absolute_uri(f"/api/agenda/calendario/{token}.ics"),
+            "dias_atras": settings.CALENDARIO_DIAS_ATRAS,
+            "dias_adelante": settings.CALENDARIO_DIAS_ADELANTE,
+        }
+    )
+
+
+# GET /agenda/calendario/<token>.ics  (para Google Calendar, Outlook, Apple...)
+# Vista de Django y no de DRF: el token de la URL es la única credencial
+# (no hay JWT que validar) y los clientes de calendario piden text/calendar,
+# que la negociación de DRF rechazaría con un 406. Con réplica, una URL
+# revocada deja de valer cuando la revocación llega a ella (sync_replica).
+@require_safe
+@usar_replica
+def calendario_doctor_ics(request, token):
+    id_doctor = calendario_service.verificar(token)
+    if id_doctor is None:
+        return JsonResponse({"detail": "Calendario no encontrado."}, status=404)
+
+    # Primero solo los validadores: si el cliente ya tiene esta versión,
+    # 304 sin leer bloques ni turnos
+    desde, hasta = calendario_service.ventana()
+    etag, modificado = calendario_service.validadores(id_doctor, desde, hasta)
+    ultima = int(modificado.timestamp()) if modificado else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=ultima)
+    if response is None:
+        response = HttpResponse(
+            calendario_service.generar(id_doctor, desde, hasta),
+            content_type="text/calendar; charset=utf-8",
+        )
+        response["Content-Disposition"] = f'inline; filename="agenda-{id_doctor}.ics"'
+
+    response["ETag"] = etag
+    if ultima is not None:
+        response["Last-Modified"] = http_date(ultima)
+    response["Cache-Control"] = f"private, max-age={settings.CALENDARIO_MAX_AGE}"
+    return response
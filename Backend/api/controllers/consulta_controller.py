@@ -1,171 +1,139 @@
 from datetime import date
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery
+from django.db.models import Exists, F, OuterRef
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
-from ..models import Turno, Consulta, Mascota
-from ..serializers import TurnoConsultaSerializer, ConsultaSerializer
-
-# Definir constantes de roles
-ROLE_ADMIN = 1
-ROLE_CLIENTE = 2
-ROLE_RECEPCIONISTA = 3
-ROLE_VETERINARIO = 4
-
-def _role_id(user):
-    """
-    Obtiene el id del rol de forma robusta aunque:
-    - user.id_rol sea int
-    - exista user.id_rol_id
-    - user.id_rol sea objeto Rol con .id_rol
-    """
-    r = getattr(user, "id_rol", None)
-
-    if isinstance(r, int):
-        return r
-
-    rid = getattr(user, "id_rol_id", None)
-    if rid is not None:
-        return int(rid)
-
-    return getattr(r, "id_rol", None)
-
-
-# 👉 1) LISTAR TODOS LOS TURNOS CON INFO DE CLIENTE, MASCOTA Y DOCTOR
-# GET /consultas/turnos/
+from ..models import CONFIG_BUSQUEDA, Turno, Consulta, Mascota
+from ..serializers import TurnoConsultaSerializer, ConsultaSerializer, HistoriaConsultaSerializer
+from .. import scoping
+from ..db_router import usar_replica
+from ..pagination import paginar, respuesta_paginada
+from ..services.turno_service import ORDEN_TURNOS
+
+# Historia: de la más antigua a la más reciente, por la fecha del turno
+ORDEN_HISTORIA = ("fecha_turno", "hora_turno", "id_consulta")
+# Búsqueda: primero las más recientes (ver buscar_consultas)
+ORDEN_BUSQUEDA = ("-id_consulta",)
+
+
+def _entero(request, nombre):
+    valor = request.query_params.get(nombre)
+    if not valor:
+        return None
+    if not valor.isdigit():
+        raise ValueError(nombre)
+    return int(valor)
+
+
+# 👉 1) LISTAR LOS TURNOS DE UN RANGO CON INFO DE CLIENTE, MASCOTA Y DOCTOR
+# GET /consultas/turnos/?desde=YYYY-MM-DD&hasta=YYYY-MM-DD
+#     [&doctor=<id>][&estado=<id>][&mascota=<id>][&limite=&cursor=]
+# desde/hasta son obligatorios (como mucho CONSULTAS_MAX_DIAS días): sin
+# ellos se recorría todo el historial. Cada filtro va por un índice de
+# Turno: turno_fecha_hora_idx, turno_estado_fecha_idx, el de id_mascota y,
+# para el doctor, agenda_doctor_dia_hora_idx + turno_agenda_fecha_hora_idx.
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@usar_replica
 def turnos_para_consulta(request):
     user = request.user
-    user_rol_id = _role_id(user)
-    
-    # Permisos por rol
-    if user_rol_id == ROLE_ADMIN:
-        # Admin ve todos los turnos
-        turnos = (
-            Turno.objects
-            .select_related(
-                "id_usuario",               # cliente
-                "id_mascota",               # mascota
-                "id_agenda__id_usuario",    # doctor
-                "id_estado",
-            )
-            .order_by("-fecha_turno", "-hora_turno")
-        )
-    
-    elif user_rol_id == ROLE_RECEPCIONISTA:
-        # Recepcionista ve todos los turnos (puede gestionar agenda)
-        turnos = (
-            Turno.objects
-            .select_related(
-                "id_usuario",               # cliente
-                "id_mascota",               # mascota
-                "id_agenda__id_usuario",    # doctor
-                "id_estado",
-            )
-            .order_by("-fecha_turno", "-hora_turno")
-        )
-    
-    elif user_rol_id == ROLE_VETERINARIO:
-        # Veterinario ve solo sus propios turnos
-        turnos = (
-            Turno.objects
-            .filter(id_agenda__id_usuario=user)  # Turnos asignados a este veterinario
-            .select_related(
-                "id_usuario",               # cliente
-                "id_mascota",               # mascota
-                "id_agenda__id_usuario",    # doctor
-                "id_estado",
-            )
-            .order_by("-fecha_turno", "-hora_turno")
-        )
-    
-    elif user_rol_id == ROLE_CLIENTE:
-        # Cliente ve solo sus propios turnos (a través de sus mascotas)
-        mascotas_cliente = Mascota.objects.filter(id_usuario=user.id_usuario)
-        turnos = (
-            Turno.objects
-            .filter(id_mascota__in=mascotas_cliente)  # Solo turnos de sus mascotas
-            .select_related(
-                "id_usuario",               # cliente
-                "id_mascota",               # mascota
-                "id_agenda__id_usuario",    # doctor
-                "id_estado",
-            )
-            .order_by("-fecha_turno", "-hora_turno")
-        )
-    
-    else:
+    if not scoping.tiene_alcance(user, Turno):
         # Rol no reconocido
         return Response({"detail": "No autorizado"}, status=403)
 
+    try:
+        desde = date.fromisoformat(request.query_params.get("desde", ""))
+        hasta = date.fromisoformat(request.query_params.get("hasta", ""))
+    except ValueError:
+        return Response(
+            {"detail": "Se requieren 'desde' y 'hasta' con formato YYYY-MM-DD."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    max_dias = settings.CONSULTAS_MAX_DIAS
+    if hasta < desde or (hasta - desde).days + 1 > max_dias:
+        return Response(
+            {"detail": f"El rango debe ir de 'desde' a 'hasta' y tener como mucho {max_dias} días."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        id_doctor = _entero(request, "doctor")
+        id_estado = _entero(request, "estado")
+        id_mascota = _entero(request, "mascota")
+    except ValueError as e:
+        return Response({str(e): "Debe ser un id numérico."}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Admin y recepcionista ven todos; veterinario, los de su agenda;
+    # cliente, los de sus mascotas (api.scoping)
+    turnos = (
+        scoping.visibles(user, Turno)
+        .filter(fecha_turno__range=(desde, hasta))
+        .select_related(
+            "id_usuario",               # cliente
+            "id_mascota",               # mascota
+            "id_agenda__id_usuario",    # doctor
+            "id_estado",
+        )
+        # En la misma consulta: antes era un exists() por turno
+        .annotate(tiene_consulta=Exists(Consulta.objects.filter(id_turno=OuterRef("pk"))))
+    )
+
+    if id_doctor is not None:
+        turnos = turnos.filter(id_agenda__id_usuario_id=id_doctor)
+    if id_estado is not None:
+        turnos = turnos.filter(id_estado_id=id_estado)
+    if id_mascota is not None:
+        turnos = turnos.filter(id_mascota_id=id_mascota)
+
+    turnos, siguiente = paginar(request, turnos, ORDEN_TURNOS)
     serializer = TurnoConsultaSerializer(turnos, many=True)
-    return Response(serializer.data, status=200)
+    return respuesta_paginada(serializer.data, siguiente)
 
 
 # 👉 2) CREAR / VER / ACTUALIZAR LA CONSULTA DE UN TURNO
 # GET  /consultas/por-turno/<id_turno>/
 # POST /consultas/por-turno/<id_turno>/
 # PUT  /consultas/por-turno/<id_turno>/
+# Cada petición lee solo la fila que le toca al usuario (api.scoping):
+# lo ajeno y lo inexistente dan el mismo 404.
 @api_view(["GET", "POST", "PUT"])
 @permission_classes([IsAuthenticated])
 def consulta_por_turno(request, id_turno):
-    try:
-        turno = Turno.objects.get(id_turno=id_turno)
-    except Turno.DoesNotExist:
-        return Response({"detail": "Turno no encontrado"}, status=404)
-
     user = request.user
-    user_rol_id = _role_id(user)
-
-    # Verificar permisos según el rol
-    if user_rol_id == ROLE_CLIENTE:
-        # Cliente: verificar que el turno sea de una de sus mascotas
-        mascotas_cliente = Mascota.objects.filter(id_usuario=user.id_usuario)
-        if turno.id_mascota not in mascotas_cliente:
-            return Response({"detail": "No autorizado"}, status=403)
-    
-    elif user_rol_id == ROLE_VETERINARIO:
-        # Veterinario: verificar que el turno sea asignado a él
-        # turno.id_agenda.id_usuario -> es un objeto Usuario
-        # turno.id_agenda.id_usuario_id -> es el entero id del doctor
-        if turno.id_agenda.id_usuario_id != user.id_usuario:
-            return Response({"detail": "No autorizado"}, status=403)
-
-    
-    elif user_rol_id not in [ROLE_ADMIN, ROLE_RECEPCIONISTA]:
-        # Solo Admin, Recepcionista y Veterinario pueden acceder
-        return Response({"detail": "No autorizado"}, status=403)
 
-    # GET: obtener la consulta (si existe)
+    # GET: obtener la consulta (si existe y el turno es visible para el usuario)
     if request.method == "GET":
-        consulta = Consulta.objects.filter(id_turno=turno).first()
+        consulta = scoping.obtener(user, Consulta, id_turno_id=id_turno)
         if not consulta:
             return Response({"detail": "Consulta no registrada"}, status=404)
         serializer = ConsultaSerializer(consulta)
         return Response(serializer.data, status=200)
 
     # POST y PUT: permisos para crear/actualizar consultas
-    # ✅ Solo Admin y Veterinario pueden crear/actualizar consultas
-    if user_rol_id not in [ROLE_ADMIN, ROLE_VETERINARIO]:
+    # ✅ Solo Admin y Veterinario (este, en sus propios turnos)
+    if not scoping.tiene_alcance(user, Turno, "atender"):
         return Response(
             {"detail": "Solo el administrador o el veterinario pueden crear/actualizar consultas."},
             status=403
         )
 
-    
-    # Veterinario solo puede editar sus propios turnos
-    if user_rol_id == ROLE_VETERINARIO and turno.id_agenda.id_usuario_id != user.id_usuario:
-        return Response(
-            {"detail": "Solo puedes editar consultas de tus propios turnos"},
-            status=403
-        )
-
     # POST: crear la consulta para ese turno
     if request.method == "POST":
+        turno = scoping.obtener(
+            user,
+            Turno.objects.annotate(tiene_consulta=Exists(Consulta.objects.filter(id_turno=OuterRef("pk")))),
+            "atender",
+            id_turno=id_turno,
+        )
+        if not turno:
+            return Response({"detail": "Turno no encontrado"}, status=404)
+
         # Evitar duplicados
-        if Consulta.objects.filter(id_turno=turno).exists():
+        if turno.tiene_consulta:
             return Response(
                 {"detail": "La consulta ya existe para este turno. Use PUT para actualizar."},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -188,19 +156,78 @@ def consulta_por_turno(request, id_turno):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     # PUT: actualizar la consulta existente
-    if request.method == "PUT":
-        consulta = Consulta.objects.filter(id_turno=turno).first()
-        if not consulta:
-            return Response(
-                {"detail": "Consulta no encontrada para este turno. Use POST para crearla."},
-                status=404,
-            )
+    consulta = scoping.obtener(user, Consulta, "editar", id_turno_id=id_turno)
+    if not consulta:
+        return Response(
+            {"detail": "Consulta no encontrada para este turno. Use POST para crearla."},
+            status=404,
+        )
+
+    serializer = ConsultaSerializer(consulta, data=request.data, partial=True)
+    if serializer.is_valid():
+        consulta = serializer.save(
+            id_usuario_actualizacion_consulta=user.id_usuario
+        )
+        return Response(ConsultaSerializer(consulta).data, status=200)
+
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = ConsultaSerializer(consulta, data=request.data, partial=True)
-        if serializer.is_valid():
-            consulta = serializer.save(
-                id_usuario_actualizacion_consulta=user.id_usuario
-            )
-            return Response(ConsultaSerializer(consulta).data, status=200)
 
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+def _consultas_con_turno(queryset):
+    # Turno, mascota y doctor en la misma consulta; busqueda (tsvector) no hace falta
+    return queryset.select_related("id_turno__id_mascota", "id_turno__id_agenda__id_usuario").defer(
+        "busqueda"
+    )
+
+
+# 👉 3) HISTORIA CLÍNICA DE UNA MASCOTA
+# GET /mascotas/<id>/historia/[?limite=&cursor=]
+# Todas sus consultas en orden cronológico con la fecha del turno y el
+# doctor, en vez de un consulta_por_turno por cada turno.
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@usar_replica
+def historia_mascota(request, pk):
+    user = request.user
+    if not scoping.obtener(user, Mascota.objects.only("id_mascota"), id_mascota=pk):
+        return Response({"detail": "Mascota no encontrada"}, status=404)
+
+    consultas = _consultas_con_turno(
+        Consulta.objects.filter(id_turno__id_mascota_id=pk)
+        # Con nombre propio para que paginar() las ordene y lea el cursor
+        .annotate(fecha_turno=F("id_turno__fecha_turno"), hora_turno=F("id_turno__hora_turno"))
+    )
+    consultas, siguiente = paginar(request, consultas, ORDEN_HISTORIA)
+    serializer = HistoriaConsultaSerializer(consultas, many=True)
+    return respuesta_paginada(serializer.data, siguiente)
+
+
+# 👉 4) BUSCAR EN DIAGNÓSTICO, PRESCRIPCIÓN Y OBSERVACIÓN
+# GET /consultas/buscar/?q=texto[&mascota=<id>][&limite=&cursor=]
+# q va en sintaxis de buscador ("frase exacta", -excluir, or) y se compara
+# con Consulta.busqueda por consulta_busqueda_gin, no con un ILIKE que
+# recorre toda la tabla. Orden por recencia y no por relevancia: ts_rank
+# se calcula sobre cada coincidencia antes de cortar la página, y con un
+# término frecuente son decenas de miles.
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@usar_replica
+def buscar_consultas(request):
+    user = request.user
+    texto = request.query_params.get("q", "").strip()
+    if len(texto) < 2:
+        return Response({"q": "Escriba al menos 2 caracteres."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        id_mascota = _entero(request, "mascota")
+    except ValueError as e:
+        return Response({str(e): "Debe ser un id numérico."}, status=status.HTTP_400_BAD_REQUEST)
+
+    consultas = scoping.visibles(user, Consulta, "historia").filter(
+        busqueda=SearchQuery(texto, config=CONFIG_BUSQUEDA, search_type="websearch")
+    )
+    if id_mascota is not None:
+        consultas = consultas.filter(id_turno__id_mascota_id=id_mascota)
+
+    consultas, siguiente = paginar(request, _consultas_con_turno(consultas), ORDEN_BUSQUEDA)
+    serializer = HistoriaConsultaSerializer(consultas, many=True)
+    return respuesta_paginada(serializer.data, siguiente)
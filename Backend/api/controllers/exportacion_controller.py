@@ -0,0 +1,55 @@
+from datetime import date
+
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+
+from ..db_router import usar_replica
+from ..permissions import IsAdmin
+from ..services import exportacion_service
+
+
+# GET /exportar/turnos/?desde=YYYY-MM-DD&hasta=YYYY-MM-DD[&formato=csv|ndjson]
+# Turnos con cliente, mascota, doctor y consulta para reportes, sin límite
+# de días: el archivo se escribe mientras se lee la BD (StreamingHttpResponse)
+# en vez de armar la lista entera en memoria como turnos_para_consulta.
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsAdmin])
+@usar_replica
+def exportar_turnos(request):
+    formato = request.query_params.get("formato", "csv")
+    if formato not in exportacion_service.FORMATOS:
+        return Response(
+            {"formato": f"Debe ser uno de: {', '.join(exportacion_service.FORMATOS)}."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    try:
+        desde = date.fromisoformat(request.query_params.get("desde", ""))
+        hasta = date.fromisoformat(request.query_params.get("hasta", ""))
+    except ValueError:
+        return Response(
+            {"detail": "Se requieren 'desde' y 'hasta' con formato YYYY-MM-DD."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if hasta < desde:
+        return Response(
+            {"detail": "'hasta' no puede ser anterior a 'desde'."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    turnos = exportacion_service.turnos(desde, hasta)
+    # La BD se elige ya: el archivo se genera después de salir de la vista,
+    # cuando @usar_replica ya no aplica y el router mandaría a la primaria
+    turnos = turnos.using(turnos.db)
+
+    response = StreamingHttpResponse(
+        exportacion_service.exportar(turnos, formato),
+        content_type=exportacion_service.FORMATOS[formato],
+    )
+    response["Content-Disposition"] = f'attachment; filename="turnos_{desde}_{hasta}.{formato}"'
+    response["Cache-Control"] = "no-store"
+    # Sin búfer en un proxy nginx delante: cada bloque sale al cliente al generarse
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -3,9 +3,12 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
+from .. import scoping
 from ..serializers import MascotaSerializer
 from ..services import mascota_service
-from ..models import Usuario, HistorialUsuario
+from ..models import Usuario, HistorialUsuario, Mascota
+from ..permissions import IsAdmin
+from ..pagination import paginar, respuesta_paginada
 
 
 @api_view(["GET", "POST"])
@@ -53,7 +56,10 @@ def mascotas_list_create(request):
 @api_view(["GET", "PUT", "DELETE"])
 @permission_classes([IsAuthenticated])
 def mascotas_detail(request, pk: int):
-    mascota = mascota_service.obtener_mascota_por_id(pk)
+    # Ver: el personal cualquiera y el cliente las suyas; editar/borrar: el
+    # admin cualquiera y los demás solo las suyas (api.scoping)
+    accion = "ver" if request.method == "GET" else "editar"
+    mascota = scoping.obtener(request.user, Mascota, accion, id_mascota=pk)
     if not mascota:
         return Response(
             {"detail": "Mascota no encontrada"},
@@ -87,7 +93,7 @@ def mascotas_detail(request, pk: int):
 
         # ✅ HISTORIAL: registrar eliminación de mascota
         HistorialUsuario.objects.create(
-            usuario=mascota.id_usuario,  # dueño real
+            usuario_id=mascota.id_usuario_id,  # dueño real
             realizado_por=request.user,
             tipo="mascota_eliminada",
             detalle=f"Se eliminó la mascota '{mascota.nombre_mascota}'."
@@ -97,12 +103,8 @@ def mascotas_detail(request, pk: int):
 
 
 @api_view(["POST"])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, IsAdmin])  # Solo admin
 def mascotas_admin_create(request):
-    # Solo admin
-    if request.user.id_rol.id_rol != 1:
-        return Response({"error": "No autorizado"}, status=status.HTTP_403_FORBIDDEN)
-
     data = request.data.copy()
 
     # dueño requerido
@@ -138,14 +140,9 @@ def mascotas_admin_create(request):
 
 
 @api_view(["GET"])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, IsAdmin])  # Solo admin puede ver mascotas de cualquier usuario
 def mascotas_por_usuario(request, id_usuario: int):
-    # Solo admin puede ver mascotas de cualquier usuario
-    if request.user.id_rol.id_rol != 1:
-        return Response({"error": "No autorizado"}, status=status.HTTP_403_FORBIDDEN)
-
-    from ..models import Mascota
-    mascotas = Mascota.objects.filter(id_usuario_id=id_usuario).order_by("-id_mascota")
+    mascotas, siguiente = paginar(request, Mascota.objects.filter(id_usuario_id=id_usuario), ("-id_mascota",))
 
     serializer = MascotaSerializer(mascotas, many=True)
-    return Response(serializer.data)
+    return respuesta_paginada(serializer.data, siguiente)
@@ -0,0 +1,33 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+
+from ..permissions import IsAdmin
+from ..authentication import estadisticas_cache
+from ..services.token_service import estadisticas_versiones
+from ..services.password_service import estadisticas_hashing
+from ..db_router import estadisticas_replica
+from ..services.db_pool_service import estadisticas_pool
+from ..services.ocupacion_service import estadisticas_ocupacion
+
+
+# GET /metricas/
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsAdmin])
+def metricas(request):
+    """
+    Métricas internas del proceso que atiende la petición (solo admin).
+    Cada worker de gunicorn tiene las suyas.
+    """
+    return Response(
+        {
+            "auth_cache": estadisticas_cache(),
+            "token_versions": estadisticas_versiones(),
+            "hashing": estadisticas_hashing(),
+            "replica": estadisticas_replica(),
+            "db_pool": estadisticas_pool(),
+            "ocupacion": estadisticas_ocupacion(),
+        },
+        status=status.HTTP_200_OK,
+    )
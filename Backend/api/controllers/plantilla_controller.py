@@ -0,0 +1,144 @@
+from datetime import date
+
+from django.conf import settings
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+
+from ..serializers import PlantillaHorarioSerializer, ExcepcionHorarioSerializer
+from ..services import plantilla_service
+from ..permissions import IsAdmin
+
+
+def _id_doctor(request):
+    valor = request.query_params.get("doctor")
+    return int(valor) if valor and valor.isdigit() else None
+
+
+# ---------- PLANTILLAS ----------
+# GET/POST /agenda/plantillas/?doctor=<id>
+@api_view(["GET", "POST"])
+@permission_classes([IsAuthenticated, IsAdmin])
+def plantillas_list_create(request):
+    if request.method == "GET":
+        plantillas = plantilla_service.listar_plantillas(_id_doctor(request))
+        return Response(PlantillaHorarioSerializer(plantillas, many=True).data)
+
+    serializer = PlantillaHorarioSerializer(data=request.data)
+    if serializer.is_valid():
+        plantilla = plantilla_service.crear_plantilla(
+            {
+                **serializer.validated_data,
+                "id_usuario_creacion_plantilla": request.user.id_usuario,
+                "id_usuario_actualizacion_plantilla": request.user.id_usuario,
+            }
+        )
+        return Response(PlantillaHorarioSerializer(plantilla).data, status=status.HTTP_201_CREATED)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(["GET", "PUT", "DELETE"])
+@permission_classes([IsAuthenticated, IsAdmin])
+def plantillas_detail(request, id_plantilla):
+    plantilla = plantilla_service.obtener_plantilla_por_id(id_plantilla)
+    if not plantilla:
+        return Response({"detail": "Plantilla no encontrada."}, status=status.HTTP_404_NOT_FOUND)
+
+    if request.method == "GET":
+        return Response(PlantillaHorarioSerializer(plantilla).data)
+
+    if request.method == "PUT":
+        serializer = PlantillaHorarioSerializer(plantilla, data=request.data, partial=True)
+        if serializer.is_valid():
+            plantilla = serializer.save(id_usuario_actualizacion_plantilla=request.user.id_usuario)
+            return Response(PlantillaHorarioSerializer(plantilla).data)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    plantilla_service.eliminar_plantilla(plantilla)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+# ---------- EXCEPCIONES ----------
+# GET/POST /agenda/excepciones/?doctor=<id>  (sin id_usuario: toda la clínica)
+@api_view(["GET", "POST"])
+@permission_classes([IsAuthenticated, IsAdmin])
+def excepciones_list_create(request):
+    if request.method == "GET":
+        excepciones = plantilla_service.listar_excepciones(_id_doctor(request))
+        return Response(ExcepcionHorarioSerializer(excepciones, many=True).data)
+
+    serializer = ExcepcionHorarioSerializer(data=request.data)
+    if serializer.is_valid():
+        excepcion = plantilla_service.crear_excepcion(
+            {
+                **serializer.validated_data,
+                "id_usuario_creacion_excepcion": request.user.id_usuario,
+                "id_usuario_actualizacion_excepcion": request.user.id_usuario,
+            }
+        )
+        return Response(ExcepcionHorarioSerializer(excepcion).data, status=status.HTTP_201_CREATED)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(["GET", "PUT", "DELETE"])
+@permission_classes([IsAuthenticated, IsAdmin])
+def excepciones_detail(request, id_excepcion):
+    excepcion = plantilla_service.obtener_excepcion_por_id(id_excepcion)
+    if not excepcion:
+        return Response({"detail": "Excepción no encontrada."}, status=status.HTTP_404_NOT_FOUND)
+
+    if request.method == "GET":
+        return Response(ExcepcionHorarioSerializer(excepcion).data)
+
+    if request.method == "PUT":
+        serializer = ExcepcionHorarioSerializer(excepcion, data=request.data, partial=True)
+        if serializer.is_valid():
+            excepcion = serializer.save(id_usuario_actualizacion_excepcion=request.user.id_usuario)
+            return Response(ExcepcionHorarioSerializer(excepcion).data)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    plantilla_service.eliminar_excepcion(excepcion)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+# ---------- MATERIALIZAR ----------
+# POST /agenda/plantillas/materializar/
+# { "desde": "YYYY-MM-DD", "hasta": "YYYY-MM-DD", "doctores": [3, 5] (opcional) }
+@api_view(["POST"])
+@permission_classes([IsAuthenticated, IsAdmin])
+def materializar_plantillas(request):
+    try:
+        desde = date.fromisoformat(str(request.data.get("desde", "")))
+        hasta = date.fromisoformat(str(request.data.get("hasta", "")))
+    except ValueError:
+        return Response(
+            {"detail": "Se requieren 'desde' y 'hasta' con formato YYYY-MM-DD."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    if desde < date.today():
+        return Response(
+            {"detail": "No se pueden materializar horarios en fechas pasadas."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    max_dias = settings.PLANTILLA_MAX_DIAS
+    if hasta < desde or (hasta - desde).days + 1 > max_dias:
+        return Response(
+            {"detail": f"El rango debe ir de 'desde' a 'hasta' y tener como mucho {max_dias} días."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    doctores = request.data.get("doctores")
+    if doctores is not None:
+        if not isinstance(doctores, list) or not all(isinstance(d, int) for d in doctores):
+            return Response(
+                {"detail": "'doctores' debe ser una lista de ids."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+    resultado = plantilla_service.materializar(
+        desde, hasta, doctores=doctores, realizado_por=request.user.id_usuario
+    )
+    return Response(resultado, status=status.HTTP_200_OK)
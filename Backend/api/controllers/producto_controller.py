@@ -7,36 +7,33 @@ from rest_framework import status
 
 from ..models import Producto
 from ..serializers import ProductoSerializer
-from ..services.producto_service import productos_publicos, productos_admin
-
-ROLE_ADMIN = 1
-ROLE_RECEPCIONISTA = 3
-
-def _role_id(user):
-    r = getattr(user, "id_rol", None)
-    return int(getattr(r, "id_rol", 0) or 0)
-
-def can_manage_products(user):
-    # ✅ Admin o Recepcionista pueden gestionar productos
-    return _role_id(user) in (ROLE_ADMIN, ROLE_RECEPCIONISTA)
+from ..services.producto_service import productos_publicos, productos_admin, categorias_productos
+from ..permissions import IsGestor, ReadOnly
+from ..db_router import usar_replica
+from ..pagination import paginar, respuesta_paginada
 
 
+# GET: cualquier usuario autenticado | POST: ✅ Admin o Recepcionista
 @api_view(["GET", "POST"])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, IsGestor | ReadOnly])
 @parser_classes([MultiPartParser, FormParser])
+@usar_replica
 def productos_list_create(request):
     # GET: todos los usuarios autenticados ven productos (incluye stock 0 para mostrar “Agotado”)
     if request.method == "GET":
-        qs = productos_publicos()
-        return Response(
-            ProductoSerializer(qs, many=True, context={"request": request}).data,
-            status=status.HTTP_200_OK
+        # Por id y no por fecha_creacion_producto (que admite NULL): es el
+        # mismo orden de alta y sirve de clave única para el cursor
+        qs = productos_publicos(
+            (request.query_params.get("q") or "").strip(),
+            (request.query_params.get("categoria") or "").strip(),
+        )
+        productos, siguiente = paginar(request, qs, ("-id_producto",))
+        return respuesta_paginada(
+            ProductoSerializer(productos, many=True, context={"request": request}).data,
+            siguiente,
         )
 
     # POST: admin o recepcionista crean
-    if not can_manage_products(request.user):
-        return Response({"detail": "No autorizado"}, status=status.HTTP_403_FORBIDDEN)
-
     serializer = ProductoSerializer(data=request.data, context={"request": request})
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -54,12 +51,9 @@ def productos_list_create(request):
 
 
 @api_view(["GET"])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, IsGestor])  # ✅ Admin o Recepcionista ven “admin list”
+@usar_replica
 def productos_admin_list(request):
-    # ✅ Admin o Recepcionista ven “admin list”
-    if not can_manage_products(request.user):
-        return Response({"detail": "No autorizado"}, status=status.HTTP_403_FORBIDDEN)
-
     qs = productos_admin()
     return Response(
         ProductoSerializer(qs, many=True, context={"request": request}).data,
@@ -67,8 +61,17 @@ def productos_admin_list(request):
     )
 
 
-@api_view(["GET", "PUT", "DELETE"])
+# GET: cualquier usuario autenticado (opciones del filtro de la tienda)
+@api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@usar_replica
+def productos_categorias(request):
+    return Response(categorias_productos(), status=status.HTTP_200_OK)
+
+
+# GET: cualquier usuario autenticado | PUT / DELETE: solo admin o recepcionista
+@api_view(["GET", "PUT", "DELETE"])
+@permission_classes([IsAuthenticated, IsGestor | ReadOnly])
 @parser_classes([MultiPartParser, FormParser])
 def productos_detail(request, pk):
     try:
@@ -83,10 +86,6 @@ def productos_detail(request, pk):
             status=status.HTTP_200_OK
         )
 
-    # PUT / DELETE: solo admin o recepcionista
-    if not can_manage_products(request.user):
-        return Response({"detail": "No autorizado"}, status=status.HTTP_403_FORBIDDEN)
-
     if request.method == "PUT":
         serializer = ProductoSerializer(prod, data=request.data, partial=True, context={"request": request})
         if not serializer.is_valid():
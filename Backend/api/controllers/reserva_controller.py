@@ -4,9 +4,11 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
+from .. import scoping
 from ..models import Reserva
+from ..permissions import IsGestor
 from ..services.reserva_service import (
-    es_gestor_reservas,
+    ORDEN_RESERVAS,
     crear_reserva_desde_carrito,
     listar_reservas_usuario,
     listar_reservas_admin,
@@ -20,15 +22,19 @@ from ..serializers_reserva import (
     ReservaDetailSerializer,
     ReservaEstadoSerializer,
 )
+from ..db_router import usar_replica
+from ..pagination import paginar, respuesta_paginada
 
 
 @api_view(["GET", "POST"])
 @permission_classes([IsAuthenticated])
+@usar_replica
 def reservas_list_create(request):
     # LISTAR (cliente: las suyas)
     if request.method == "GET":
         qs = listar_reservas_usuario(request.user)
-        return Response(ReservaListSerializer(qs, many=True).data, status=200)
+        reservas, siguiente = paginar(request, qs, ORDEN_RESERVAS)
+        return respuesta_paginada(ReservaListSerializer(reservas, many=True).data, siguiente)
 
     # CREAR
     ser = ReservaCreateSerializer(data=request.data)
@@ -52,12 +58,9 @@ def reservas_list_create(request):
 
 
 @api_view(["GET"])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, IsGestor])  # ✅ Admin o Recepcionista
+@usar_replica
 def reservas_admin_list(request):
-    # ✅ Admin o Recepcionista
-    if not es_gestor_reservas(request.user):
-        return Response({"detail": "No autorizado"}, status=403)
-
     qs = listar_reservas_admin()
 
     q = (request.query_params.get("q") or "").strip().lower()
@@ -68,19 +71,18 @@ def reservas_admin_list(request):
             codigo_factura__icontains=q
         )
 
-    return Response(ReservaListSerializer(qs, many=True).data, status=200)
+    reservas, siguiente = paginar(request, qs, ORDEN_RESERVAS)
+    return respuesta_paginada(ReservaListSerializer(reservas, many=True).data, siguiente)
 
 
 @api_view(["DELETE"])
 @permission_classes([IsAuthenticated])
 def reserva_cancelar(request, id_reserva):
-    try:
-        reserva = (
-            Reserva.objects.select_related("id_usuario", "id_estado")
-            .prefetch_related("detalles__id_producto")
-            .get(id_reserva=id_reserva)
-        )
-    except Reserva.DoesNotExist:
+    # Dueño o Admin/Recepcionista; cancelar_reserva ya lee los detalles con su producto
+    reserva = scoping.obtener(
+        request.user, Reserva.objects.select_related("id_estado"), "cancelar", id_reserva=id_reserva
+    )
+    if reserva is None:
         return Response({"detail": "Reserva no encontrada"}, status=404)
 
     try:
@@ -94,12 +96,8 @@ def reserva_cancelar(request, id_reserva):
 
 
 @api_view(["PUT"])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, IsGestor])  # ✅ Admin o Recepcionista
 def reserva_actualizar_estado(request, id_reserva):
-    # ✅ Admin o Recepcionista
-    if not es_gestor_reservas(request.user):
-        return Response({"detail": "No autorizado"}, status=403)
-
     try:
         reserva = Reserva.objects.get(id_reserva=id_reserva)
     except Reserva.DoesNotExist:
@@ -130,19 +128,15 @@ def reserva_actualizar_estado(request, id_reserva):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def reserva_factura_pdf(request, id_reserva):
-    try:
-        reserva = (
-            Reserva.objects.select_related("id_usuario", "id_estado")
-            .prefetch_related("detalles__id_producto")
-            .get(id_reserva=id_reserva)
-        )
-    except Reserva.DoesNotExist:
+    # ✅ Admin/Recepcionista o dueño: la ajena no se lee (ni sus detalles)
+    reserva = scoping.obtener(
+        request.user,
+        Reserva.objects.select_related("id_usuario", "id_estado").prefetch_related("detalles__id_producto"),
+        id_reserva=id_reserva,
+    )
+    if reserva is None:
         return Response({"detail": "Reserva no encontrada"}, status=404)
 
-    # ✅ Permisos: Admin/Recepcionista o dueño
-    if (not es_gestor_reservas(request.user)) and (reserva.id_usuario_id != request.user.id_usuario):
-        return Response({"detail": "No autorizado"}, status=403)
-
     pdf_bytes = generar_factura_pdf(reserva)
     resp = HttpResponse(pdf_bytes, content_type="application/pdf")
     resp["Content-Disposition"] = f'attachment; filename="{reserva.codigo_factura}.pdf"'
@@ -3,22 +3,20 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
+from .. import scoping
 from ..serializers import TurnoSerializer
-from ..services import turno_service
-from ..models import Mascota, Estado, Agenda, HistorialUsuario, Usuario
+from ..services import estado_service, turno_service
+from ..models import Mascota, Agenda, HistorialUsuario, Usuario, Turno, Consulta
+from ..permissions import IsAdmin
+from ..pagination import paginar, respuesta_paginada
 
 
 def _get_estado_pendiente():
-    try:
-        return Estado.objects.get(descripcion_estado__iexact="Pendiente")
-    except Estado.DoesNotExist:
-        return None
+    return estado_service.estado_por_nombre("Pendiente")
 def _get_estado_cancelada():
-    try:
-        return Estado.objects.get(descripcion_estado__iexact="Cancelada")
-    except Estado.DoesNotExist:
-        return None
+    return estado_service.estado_por_nombre("Cancelada")
 
 
 def _get_agenda_default():
@@ -36,7 +34,8 @@ def turnos_list_create(request):
     # Cliente: lista solo sus turnos
     if request.method == "GET":
         turnos = turno_service.listar_turnos_por_usuario(request.user.id_usuario)
-        return Response(TurnoSerializer(turnos, many=True).data)
+        turnos, siguiente = paginar(request, turnos, turno_service.ORDEN_TURNOS)
+        return respuesta_paginada(TurnoSerializer(turnos, many=True).data, siguiente)
 
      # Cliente: crea turno para una mascota suya
     if request.method == "POST":
@@ -56,7 +55,7 @@ def turnos_list_create(request):
             return Response({"error": "Se requiere id_agenda (hora del doctor)."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            agenda = Agenda.objects.get(id_agenda=id_agenda)
+            agenda = Agenda.objects.select_related("id_usuario").get(id_agenda=id_agenda)
         except Agenda.DoesNotExist:
             return Response({"error": "Agenda no encontrada."}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -77,11 +76,6 @@ def turnos_list_create(request):
         if not estado_pendiente:
             return Response({"error": "No existe el Estado 'Pendiente' en la BD"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # (opcional recomendado) evitar doble reserva misma agenda
-        from ..models import Turno
-        if Turno.objects.filter(id_agenda=agenda, fecha_turno=agenda.dia_atencion, hora_turno=agenda.hora_atencion).exists():
-            return Response({"error": "Esa hora ya está reservada."}, status=status.HTTP_409_CONFLICT)
-
         # asignaciones obligatorias
         data["id_usuario"] = request.user.id_usuario
         data["id_estado"] = estado_pendiente.id_estado
@@ -93,7 +87,11 @@ def turnos_list_create(request):
 
         serializer = TurnoSerializer(data=data)
         if serializer.is_valid():
-            turno = turno_service.crear_turno(serializer.validated_data)
+            # la doble reserva la frena el índice único al insertar
+            try:
+                turno = turno_service.crear_turno(serializer.validated_data)
+            except turno_service.BloqueOcupado:
+                return Response({"error": "Esa hora ya está reservada."}, status=status.HTTP_409_CONFLICT)
 
             HistorialUsuario.objects.create(
                 usuario=request.user,
@@ -108,12 +106,8 @@ def turnos_list_create(request):
 
 
 @api_view(["GET"])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, IsAdmin])  # Doctor/Admin (por ahora rol=1): ver turnos del día
 def turnos_del_dia(request):
-    # Doctor/Admin (por ahora rol=1): ver turnos del día
-    if request.user.id_rol.id_rol != 1:
-        return Response({"error": "No autorizado"}, status=status.HTTP_403_FORBIDDEN)
-
     fecha_str = request.query_params.get("fecha")
     if not fecha_str:
         fecha = datetime.now().date()
@@ -130,35 +124,28 @@ def turnos_del_dia(request):
 @api_view(["PATCH"])
 @permission_classes([IsAuthenticated])
 def cancelar_turno(request, id_turno):
-    from ..models import Turno
-
-    # 1️⃣ Buscar turno
-    try:
-        turno = Turno.objects.get(id_turno=id_turno)
-    except Turno.DoesNotExist:
+    # 1️⃣ Buscar turno, solo si el usuario puede cancelarlo (dueño o admin):
+    # una consulta, que ya trae si tiene consulta
+    turno = scoping.obtener(
+        request.user,
+        Turno.objects.annotate(tiene_consulta=Exists(Consulta.objects.filter(id_turno=OuterRef("pk")))),
+        "cancelar",
+        id_turno=id_turno,
+    )
+    if turno is None:
         return Response(
             {"error": "Turno no encontrado."},
             status=status.HTTP_404_NOT_FOUND
         )
 
-    # 2️⃣ Seguridad: solo dueño o admin
-    es_dueno = turno.id_usuario_id == request.user.id_usuario
-    es_admin = request.user.id_rol.id_rol == 1  # ajusta si tu admin usa otro id
-
-    if not (es_dueno or es_admin):
-        return Response(
-            {"error": "No autorizado para cancelar este turno."},
-            status=status.HTTP_403_FORBIDDEN
-        )
-
-    # 3️⃣ No cancelar si ya tiene consulta
-    if turno.consultas.exists():
+    # 2️⃣ No cancelar si ya tiene consulta
+    if turno.tiene_consulta:
         return Response(
             {"error": "No se puede cancelar un turno que ya tiene consulta."},
             status=status.HTTP_409_CONFLICT
         )
 
-    # 4️⃣ Obtener estado Cancelada
+    # 3️⃣ Obtener estado Cancelada
     estado_cancelada = _get_estado_cancelada()
     if not estado_cancelada:
         return Response(
@@ -166,21 +153,19 @@ def cancelar_turno(request, id_turno):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-    # 5️⃣ Si ya estaba cancelado
+    # 4️⃣ Si ya estaba cancelado
     if turno.id_estado_id == estado_cancelada.id_estado:
         return Response(
             {"detail": "El turno ya estaba cancelado."},
             status=status.HTTP_200_OK
         )
 
-    # 6️⃣ Cancelar turno
-    turno.id_estado = estado_cancelada
-    turno.id_usuario_actualizacion_turno = request.user.id_usuario
-    turno.save()
+    # 5️⃣ Cancelar turno
+    turno_service.cancelar_turno(turno, estado_cancelada, request.user.id_usuario)
 
-    # 7️⃣ Auditoría
+    # 6️⃣ Auditoría
     HistorialUsuario.objects.create(
-        usuario=turno.id_usuario,
+        usuario_id=turno.id_usuario_id,
         realizado_por=request.user,
         tipo="turno_cancelado",
         detalle=f"Se canceló el turno del {turno.fecha_turno} a las {turno.hora_turno}."
@@ -5,28 +5,28 @@ from rest_framework import status
 
 from ..serializers import UsuarioSerializer, HistorialUsuarioSerializer
 from ..services import usuario_service
+from ..services.token_service import incrementar_token_version
+from ..services.password_service import HashingSaturado
+from .auth_controller import respuesta_saturado
 from ..models import Usuario, Rol, HistorialUsuario
-
-ROLE_ADMIN = 1
-ROLE_CLIENTE = 2
-ROLE_RECEPCIONISTA = 3
-ROLE_VETERINARIO = 4
-WORKER_ROLES = (ROLE_ADMIN,ROLE_RECEPCIONISTA, ROLE_VETERINARIO)
-
-def _is_admin(user):
-    try:
-        return getattr(user, "id_rol", None) and user.id_rol.id_rol == ROLE_ADMIN
-    except Exception:
-        return False
+from ..permissions import (
+    IsAdmin,
+    IsStaff,
+    ROLE_ADMIN,
+    ROLE_CLIENTE,
+    ROLE_RECEPCIONISTA,
+    ROLE_VETERINARIO,
+    ROLES_STAFF,
+)
+from ..db_router import usar_replica
+from ..pagination import paginar, respuesta_paginada
+
+WORKER_ROLES = ROLES_STAFF
 
 def _get_user_id(user):
     return getattr(user, "id_usuario", getattr(user, "pk", None))
 
 
-def _is_admin(user):
-    return getattr(getattr(user, "id_rol", None), "id_rol", None) == 1
-
-
 def _realizado_por(user):
     # Por si request.user no es instancia de tu modelo Usuario
     return user if isinstance(user, Usuario) else None
@@ -36,9 +36,9 @@ def _realizado_por(user):
 @permission_classes([IsAuthenticated])
 def usuarios_list_create(request):
     if request.method == "GET":
-        usuarios = usuario_service.listar_usuarios()
+        usuarios, siguiente = paginar(request, usuario_service.listar_usuarios(), ("id_usuario",))
         serializer = UsuarioSerializer(usuarios, many=True)
-        return Response(serializer.data)
+        return respuesta_paginada(serializer.data, siguiente)
 
     if request.method == "POST":
         data = request.data.copy()
@@ -54,7 +54,10 @@ def usuarios_list_create(request):
 
         serializer = UsuarioSerializer(data=data)
         if serializer.is_valid():
-            usuario = usuario_service.crear_usuario(serializer.validated_data)
+            try:
+                usuario = usuario_service.crear_usuario(serializer.validated_data)
+            except HashingSaturado as e:
+                return respuesta_saturado(e)
 
             # Historial: creación
             HistorialUsuario.objects.create(
@@ -108,6 +111,10 @@ def usuarios_detail(request, pk: int):
         if "contrasena" in data and data.get("contrasena") == "":
             data.pop("contrasena")
 
+        # El rol solo cambia por /usuarios/<id>/cambiar-rol/ (solo admin):
+        # aquí basta con estar autenticado
+        data.pop("id_rol", None)
+
         # Auditoría: quien actualiza
         fields = UsuarioSerializer().get_fields().keys()
         uid = _get_user_id(request.user)
@@ -136,9 +143,12 @@ def usuarios_detail(request, pk: int):
             if "contrasena" in serializer.validated_data:
                 cambios.append("contraseña actualizada")
 
-            usuario_actualizado = usuario_service.actualizar_usuario(
-                usuario, serializer.validated_data
-            )
+            try:
+                usuario_actualizado = usuario_service.actualizar_usuario(
+                    usuario, serializer.validated_data
+                )
+            except HashingSaturado as e:
+                return respuesta_saturado(e)
 
             # Historial: un registro por cada cambio
             for cambio in cambios:
@@ -155,7 +165,8 @@ def usuarios_detail(request, pk: int):
 
 
 @api_view(["GET"])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, IsStaff])
+@usar_replica
 def usuarios_por_tipo(request, tipo):
     """
     clientes       -> rol 2
@@ -164,18 +175,6 @@ def usuarios_por_tipo(request, tipo):
 
     Accesible para: Admin, Recepcionista, Veterinario
     """
-    user = request.user
-    user_rol_id = getattr(user.id_rol, "id_rol", None) if hasattr(user, "id_rol") else None
-
-    # Permitir solo a Admin, Recepcionista y Veterinario
-    allowed_roles = [ROLE_ADMIN, ROLE_RECEPCIONISTA, ROLE_VETERINARIO]
-
-    if user_rol_id not in allowed_roles:
-        return Response(
-            {"detail": "No autorizado."},
-            status=status.HTTP_403_FORBIDDEN
-        )
-
     tipo = (tipo or "").lower().strip()
 
     if tipo in ("clientes", "usuarios"):
@@ -199,11 +198,8 @@ def usuarios_por_tipo(request, tipo):
 
 
 @api_view(["PUT"])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, IsAdmin])
 def cambiar_rol(request, id_usuario):
-    if not _is_admin(request.user):
-        return Response({"error": "No autorizado"}, status=status.HTTP_403_FORBIDDEN)
-
     try:
         usuario = Usuario.objects.get(id_usuario=id_usuario)
     except Usuario.DoesNotExist:
@@ -227,6 +223,8 @@ def cambiar_rol(request, id_usuario):
         usuario.id_usuario_actualizacion = _get_user_id(request.user)
 
     usuario.save()
+    # El rol va firmado en el JWT: los tokens anteriores dejan de valer
+    incrementar_token_version(usuario.id_usuario)
 
     # Historial: cambio de rol
     detalle = (
@@ -244,11 +242,9 @@ def cambiar_rol(request, id_usuario):
 
 
 @api_view(["GET"])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, IsAdmin])
+@usar_replica
 def historial_global_usuarios(request):
-    if not _is_admin(request.user):
-        return Response({"error": "No autorizado"}, status=status.HTTP_403_FORBIDDEN)
-
     logs = (
         HistorialUsuario.objects.select_related("usuario", "realizado_por")
         .order_by("-fecha")[:100]
@@ -258,7 +254,7 @@ def historial_global_usuarios(request):
 
 
 @api_view(["GET"])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, IsStaff])
 def doctores_list(request):
     """
     Lista para dropdowns / schedule:
@@ -267,18 +263,11 @@ def doctores_list(request):
     - Veterinario (4)
     Accesible solo para estos roles
     """
-    user = request.user
-    user_rol_id = getattr(user.id_rol, 'id_rol', None) if hasattr(user, 'id_rol') else None
-    
-    # Permitir solo a Admin, Recepcionista y Veterinario
-    allowed_roles = [ROLE_ADMIN, ROLE_RECEPCIONISTA, ROLE_VETERINARIO]
-    
-    if user_rol_id not in allowed_roles:
-        return Response({"detail": "No autorizado"}, status=status.HTTP_403_FORBIDDEN)
-
-    personal = Usuario.objects.filter(
-        id_rol__id_rol__in=[ROLE_ADMIN, ROLE_RECEPCIONISTA, ROLE_VETERINARIO]
-    ).order_by("nombre", "apellido")
+    personal = (
+        Usuario.objects.filter(id_rol__id_rol__in=[ROLE_ADMIN, ROLE_RECEPCIONISTA, ROLE_VETERINARIO])
+        .select_related("id_rol")
+        .order_by("nombre", "apellido")
+    )
 
     data = [
         {
@@ -286,7 +275,7 @@ def doctores_list(request):
             "nombre": p.nombre,
             "apellido": p.apellido,
             "correo": p.correo,
-            "id_rol": p.id_rol.id_rol if p.id_rol else None,
+            "id_rol": p.id_rol_id,
             "rol": p.id_rol.descripcion_rol if p.id_rol else None,
         }
         for p in personal
@@ -314,7 +303,7 @@ def usuarios_doctores(request):
             "nombre": d.nombre,
             "apellido": d.apellido,
             "correo": d.correo,
-            "id_rol": d.id_rol.id_rol if d.id_rol else None,
+            "id_rol": d.id_rol_id,
         }
         for d in doctores
     ]
@@ -341,7 +330,7 @@ def usuarios_doctores(request):
             "nombre": d.nombre,
             "apellido": d.apellido,
             "correo": d.correo,
-            "id_rol": d.id_rol.id_rol if d.id_rol else None,
+            "id_rol": d.id_rol_id,
         }
         for d in doctores
     ]
@@ -368,7 +357,7 @@ def doctores_por_actividad_view(request, id_actividad):
         d = r.doctor
         if not d:
             continue
-        rid = d.id_rol.id_rol if d.id_rol else None
+        rid = d.id_rol_id
         if rid not in allowed:
             continue
         if d.id_usuario in seen:
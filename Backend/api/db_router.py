@@ -0,0 +1,205 @@
+import contextvars
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections, DatabaseError
+
+REPLICA = "replica"
+
+_SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Lectura de lo propio: tras escribir, la respuesta trae esta cabecera y el
+# cliente la reenvía (ver marca_primaria)
+CABECERA_PIN = "X-Leer-Primaria"
+_SAL_PIN = "api.db_router.pin"
+
+
+class _EstadoPeticion:
+    """Decisión de lectura de la petición en curso (una por request)."""
+
+    __slots__ = ("leer_replica", "escribio")
+
+    def __init__(self):
+        self.leer_replica = False
+        self.escribio = False
+
+
+_estado = contextvars.ContextVar("estado_bd_peticion", default=None)
+
+
+class _Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.vistas_replica = 0
+        self.vistas_primaria_pin = 0
+        self.vistas_primaria_lag = 0
+        self.lag_segundos = None
+        self._lag_medido_en = None
+
+    def sumar(self, campo):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "replica_configurada": replica_configurada(),
+                "max_lag_segundos": _max_lag(),
+                "lag_segundos": self.lag_segundos,
+                "vistas_replica": self.vistas_replica,
+                "vistas_primaria_por_escritura_reciente": self.vistas_primaria_pin,
+                "vistas_primaria_por_lag": self.vistas_primaria_lag,
+            }
+
+
+metricas = _Metricas()
+
+
+def replica_configurada():
+    return REPLICA in settings.DATABASES
+
+
+def _max_lag():
+    return getattr(settings, "REPLICA_MAX_LAG", 30)
+
+
+def _segundos_pin():
+    return getattr(settings, "REPLICA_PIN_SEGUNDOS", _max_lag())
+
+
+def marca_primaria():
+    """
+    Marca firmada con la hora de la escritura, para CABECERA_PIN. Mientras
+    el cliente la reenvíe y tenga menos de REPLICA_PIN_SEGUNDOS, sus
+    lecturas van a la primaria y ve sus propios cambios. Viaja con el
+    cliente: vale en cualquier worker o proceso sin una cache compartida.
+    """
+    return signing.TimestampSigner(salt=_SAL_PIN).sign("primaria")
+
+
+def _fijado_a_primaria(request):
+    marca = request.headers.get(CABECERA_PIN)
+    if not marca:
+        return False
+    try:
+        signing.TimestampSigner(salt=_SAL_PIN).unsign(marca, max_age=_segundos_pin())
+    except signing.BadSignature:  # también si caducó (SignatureExpired)
+        return False
+    return True
+
+
+def _medir_lag():
+    """
+    Segundos de retraso de la réplica, o None si no se puede saber
+    (réplica caída o nunca sincronizada).
+    - Réplica en streaming: último WAL aplicado.
+    - Réplica copiada con manage.py sync_replica: marca más antigua de
+      la tabla ReplicaSync.
+    """
+    try:
+        with connections[REPLICA].cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT CASE
+                    WHEN NOT pg_is_in_recovery() THEN
+                        (SELECT EXTRACT(EPOCH FROM now() - MIN(marca)) FROM "ReplicaSync")
+                    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+                END
+                """
+            )
+            fila = cursor.fetchone()
+    except DatabaseError:
+        return None
+    return float(fila[0]) if fila and fila[0] is not None else None
+
+
+def lag_replica():
+    """Lag de la réplica, medido como mucho cada REPLICA_LAG_CHECK_SEGUNDOS."""
+    ahora = time.monotonic()
+    intervalo = getattr(settings, "REPLICA_LAG_CHECK_SEGUNDOS", 5)
+    medido_en = metricas._lag_medido_en
+    if medido_en is None or ahora - medido_en >= intervalo:
+        metricas._lag_medido_en = ahora
+        metricas.lag_segundos = _medir_lag()
+    return metricas.lag_segundos
+
+
+def usar_replica(view):
+    """
+    Decorador para vistas de solo lectura: sus consultas van a la réplica
+    salvo que
+    - la petición no sea GET/HEAD/OPTIONS,
+    - el cliente haya escrito hace menos de REPLICA_PIN_SEGUNDOS (CABECERA_PIN),
+    - o la réplica vaya más atrasada que REPLICA_MAX_LAG (o no responda).
+    Se coloca debajo de @api_view/@permission_classes (con request.user ya
+    autenticado).
+    """
+
+    @wraps(view)
+    def _view(request, *args, **kwargs):
+        estado = _estado.get()
+        if estado is None or request.method not in _SAFE_METHODS or not replica_configurada():
+            return view(request, *args, **kwargs)
+
+        if _fijado_a_primaria(request):
+            metricas.sumar("vistas_primaria_pin")
+            return view(request, *args, **kwargs)
+
+        lag = lag_replica()
+        if lag is None or lag > _max_lag():
+            metricas.sumar("vistas_primaria_lag")
+            return view(request, *args, **kwargs)
+
+        metricas.sumar("vistas_replica")
+        estado.leer_replica = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            estado.leer_replica = False
+
+    return _view
+
+
+def iniciar_peticion():
+    return _estado.set(_EstadoPeticion())
+
+
+def terminar_peticion(token):
+    estado = _estado.get()
+    _estado.reset(token)
+    return estado
+
+
+class ReplicaRouter:
+    """
+    Lecturas a la réplica solo dentro de vistas marcadas con @usar_replica
+    y mientras la petición no haya escrito nada (después, todo a la
+    primaria). Escrituras y migraciones: siempre 'default'.
+    """
+
+    def db_for_read(self, model, **hints):
+        estado = _estado.get()
+        if estado is not None and estado.leer_replica and not estado.escribio:
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        estado = _estado.get()
+        if estado is not None:
+            estado.escribio = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica y primaria tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+def estadisticas_replica():
+    return metricas.estadisticas()
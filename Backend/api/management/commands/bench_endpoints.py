@@ -0,0 +1,150 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import Client
+
+from ...models import Usuario
+from ...services.token_service import emitir_access_token
+
+# Endpoints baratos: en ellos pesa más abrir la conexión que la consulta
+ENDPOINTS = (
+    "/api/estados/",
+    "/api/roles/",
+    "/api/actividades/",
+    "/api/productos/",
+)
+
+# Modos que compara --comparar (variables de entorno de cada ejecución)
+MODOS = (
+    ("sin_reutilizar", {"DB_POOL": "False", "DB_CONN_MAX_AGE": "0"}),
+    ("conn_max_age", {"DB_POOL": "False", "DB_CONN_MAX_AGE": "60"}),
+    ("pool", {"DB_POOL": "True"}),
+)
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la latencia (p50/p95) de endpoints pequeños con la configuración "
+        "de conexiones actual, o compara sin reutilizar / CONN_MAX_AGE / pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--peticiones", type=int, default=200, help="Peticiones por endpoint")
+        parser.add_argument("--usuario", type=int, default=None, help="id_usuario para el JWT")
+        parser.add_argument(
+            "--comparar",
+            action="store_true",
+            help="Ejecuta el benchmark en cada modo de conexión y muestra la tabla",
+        )
+        parser.add_argument("--json", action="store_true", help="Salida en JSON")
+
+    def handle(self, *args, **options):
+        if options["comparar"]:
+            return self._comparar(options)
+
+        resultados = self._medir(options["peticiones"], options["usuario"])
+        if options["json"]:
+            self.stdout.write(json.dumps(resultados))
+            return
+
+        self.stdout.write(f"Modo: {self._modo_actual()}")
+        self._imprimir({self._modo_actual(): resultados})
+
+    def _modo_actual(self):
+        if settings.DB_POOL:
+            return "pool"
+        max_age = settings.DATABASES["default"].get("CONN_MAX_AGE") or 0
+        return "conn_max_age" if max_age else "sin_reutilizar"
+
+    def _medir(self, peticiones, id_usuario):
+        usuarios = Usuario.objects.select_related("id_rol")
+        usuario = (
+            usuarios.filter(id_usuario=id_usuario).first()
+            if id_usuario
+            else usuarios.order_by("id_rol_id", "id_usuario").first()
+        )
+        if usuario is None:
+            raise CommandError("No hay usuarios para firmar el JWT (usa --usuario o crea uno)")
+
+        cliente = Client(HTTP_HOST="localhost")
+        cabeceras = {"HTTP_AUTHORIZATION": f"Bearer {emitir_access_token(usuario)}"}
+
+        def peticion(url):
+            respuesta = cliente.get(url, **cabeceras)
+            # El Client de tests no cierra las conexiones al terminar la
+            # petición; lo hacemos como lo haría gunicorn (request_finished)
+            close_old_connections()
+            return respuesta
+
+        resultados = {}
+        for url in ENDPOINTS:
+            # Calentamiento: imports, caches y la primera conexión
+            for _ in range(5):
+                peticion(url)
+
+            tiempos = []
+            for _ in range(peticiones):
+                inicio = time.perf_counter()
+                respuesta = peticion(url)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+                if respuesta.status_code != 200:
+                    raise CommandError(f"{url} respondió {respuesta.status_code}")
+
+            resultados[url] = {
+                "p50_ms": round(_percentil(tiempos, 0.50), 2),
+                "p95_ms": round(_percentil(tiempos, 0.95), 2),
+            }
+        return resultados
+
+    def _comparar(self, options):
+        por_modo = {}
+        for nombre, entorno in MODOS:
+            argumentos = [
+                sys.executable,
+                sys.argv[0],
+                "bench_endpoints",
+                "--json",
+                "--peticiones",
+                str(options["peticiones"]),
+            ]
+            if options["usuario"]:
+                argumentos += ["--usuario", str(options["usuario"])]
+
+            salida = subprocess.run(
+                argumentos,
+                env={**os.environ, **entorno},
+                capture_output=True,
+                text=True,
+            )
+            if salida.returncode != 0:
+                raise CommandError(f"Modo {nombre}: {salida.stderr.strip()}")
+            por_modo[nombre] = json.loads(salida.stdout.strip().splitlines()[-1])
+
+        if options["json"]:
+            self.stdout.write(json.dumps(por_modo))
+            return
+        self._imprimir(por_modo)
+
+    def _imprimir(self, por_modo):
+        modos = list(por_modo)
+        cabecera = f"{'endpoint':<22}" + "".join(f"{m + ' p50/p95 ms':>30}" for m in modos)
+        self.stdout.write(cabecera)
+        for url in ENDPOINTS:
+            fila = f"{url:<22}"
+            for modo in modos:
+                r = por_modo[modo][url]
+                fila += f"{r['p50_ms']:>21.2f} / {r['p95_ms']:<6.2f}"
+            self.stdout.write(fila)
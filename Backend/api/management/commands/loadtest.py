@@ -0,0 +1,301 @@
+import datetime
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import Usuario, Mascota, Producto
+from ...permissions import ROLE_ADMIN, ROLE_CLIENTE, ROLE_VETERINARIO
+from ...services.seed_service import CONTRASENA_PERF, DOMINIO_PERF
+from .bench_endpoints import _percentil
+
+# Mezcla de operaciones: (nombre, peso). Una operación puede hacer más de
+# una petición (reservar turno consulta antes la disponibilidad)
+MEZCLA = (
+    ("login", 5),
+    ("disponibilidad", 30),
+    ("reservar_turno", 10),
+    ("catalogo", 25),
+    ("checkout", 10),
+    ("factura_pdf", 5),
+    ("admin_consultas", 5),
+)
+
+# 409 al reservar un bloque que otro hilo acaba de tomar es lo esperado
+ESPERADOS = {409}
+
+
+class _Registro:
+    """Latencias y códigos por ruta, compartido entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rutas = {}
+
+    def anotar(self, ruta, ms, estado):
+        with self._lock:
+            r = self.rutas.setdefault(ruta, {"tiempos": [], "estados": {}})
+            r["tiempos"].append(ms)
+            r["estados"][estado] = r["estados"].get(estado, 0) + 1
+
+    def informe(self, segundos):
+        rutas = {}
+        for ruta, r in sorted(self.rutas.items()):
+            total = len(r["tiempos"])
+            errores = sum(
+                n
+                for estado, n in r["estados"].items()
+                if not (isinstance(estado, int) and (200 <= estado < 400 or estado in ESPERADOS))
+            )
+            rutas[ruta] = {
+                "peticiones": total,
+                "rps": round(total / segundos, 2),
+                "errores": errores,
+                "tasa_error": round(errores / total, 4) if total else 0.0,
+                "p50_ms": round(_percentil(r["tiempos"], 0.50), 2),
+                "p95_ms": round(_percentil(r["tiempos"], 0.95), 2),
+                "p99_ms": round(_percentil(r["tiempos"], 0.99), 2),
+                "max_ms": round(max(r["tiempos"]), 2) if total else 0.0,
+                "estados": {str(k): v for k, v in sorted(r["estados"].items(), key=lambda e: str(e[0]))},
+            }
+        return rutas
+
+
+class _UsuarioVirtual:
+    """Un cliente que navega la API en bucle; el admin solo mira consultas."""
+
+    def __init__(self, base, registro, datos, rnd, timeout):
+        self.base = base.rstrip("/")
+        self.timeout = timeout
+        self.registro = registro
+        self.datos = datos
+        self.rnd = rnd
+        self.cliente = rnd.choice(datos["clientes"])
+        self.tokens = {}
+        self.reservas = []
+
+    def _peticion(self, ruta, metodo, url, cuerpo=None, correo=None):
+        cabeceras = {"Content-Type": "application/json"}
+        if correo:
+            cabeceras["Authorization"] = f"Bearer {self._token(correo)}"
+        datos = json.dumps(cuerpo).encode() if cuerpo is not None else None
+        req = urllib.request.Request(f"{self.base}{url}", data=datos, method=metodo, headers=cabeceras)
+
+        inicio = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                estado, contenido = resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            estado, contenido = e.code, e.read()
+        except (urllib.error.URLError, OSError) as e:
+            estado, contenido = type(e).__name__, b""
+        self.registro.anotar(ruta, (time.perf_counter() - inicio) * 1000, estado)
+
+        if estado == 401 and correo:
+            self.tokens.pop(correo, None)  # se vuelve a hacer login en la próxima
+        return estado, contenido
+
+    def _token(self, correo):
+        if correo not in self.tokens:
+            self.login(correo)
+        return self.tokens.get(correo, "")
+
+    def _json(self, contenido):
+        try:
+            return json.loads(contenido)
+        except ValueError:
+            return None
+
+    # ---------- OPERACIONES ----------
+    def login(self, correo=None):
+        correo = correo or self.cliente["correo"]
+        estado, contenido = self._peticion(
+            "POST login/", "POST", "/api/login/", {"correo": correo, "contrasena": CONTRASENA_PERF}
+        )
+        if estado == 200:
+            self.tokens[correo] = self._json(contenido)["access"]
+
+    def disponibilidad(self):
+        # Como la página de turnos: los doctores de una actividad, dos semanas,
+        # una sola petición
+        doctores = self.rnd.sample(self.datos["veterinarios"], min(8, len(self.datos["veterinarios"])))
+        desde = self._dia_futuro()
+        hasta = (datetime.date.fromisoformat(desde) + datetime.timedelta(days=13)).isoformat()
+        estado, contenido = self._peticion(
+            "GET agenda/disponibilidad/",
+            "GET",
+            f"/api/agenda/disponibilidad/?doctores={','.join(map(str, doctores))}&desde={desde}&hasta={hasta}",
+            correo=self.cliente["correo"],
+        )
+        return self._json(contenido)["doctores"] if estado == 200 else {}
+
+    def reservar_turno(self):
+        libres = [
+            (dia, bloque)
+            for dias in self.disponibilidad().values()
+            for dia, bloques in dias.items()
+            for bloque in bloques
+            if not bloque["ocupado"]
+        ]
+        if not libres or not self.cliente["mascotas"]:
+            return
+        dia, bloque = self.rnd.choice(libres)
+        self._peticion(
+            "POST turnos/",
+            "POST",
+            "/api/turnos/",
+            {
+                "id_mascota": self.rnd.choice(self.cliente["mascotas"]),
+                "id_agenda": bloque["id_agenda"],
+                "fecha_turno": dia,
+                "hora_turno": bloque["hora"],
+            },
+            correo=self.cliente["correo"],
+        )
+
+    def catalogo(self):
+        self._peticion("GET productos/", "GET", "/api/productos/", correo=self.cliente["correo"])
+
+    def checkout(self):
+        productos = self.rnd.sample(self.datos["productos"], min(3, len(self.datos["productos"])))
+        items = [{"id_producto": p, "cantidad": 1} for p in productos[: self.rnd.randint(1, len(productos))]]
+        estado, contenido = self._peticion(
+            "POST reservas/", "POST", "/api/reservas/", {"items": items}, correo=self.cliente["correo"]
+        )
+        if estado == 201:
+            self.reservas.append(self._json(contenido)["id_reserva"])
+
+    def factura_pdf(self):
+        if not self.reservas:
+            estado, contenido = self._peticion(
+                "GET reservas/", "GET", "/api/reservas/", correo=self.cliente["correo"]
+            )
+            self.reservas = [r["id_reserva"] for r in (self._json(contenido) or [])][:20] if estado == 200 else []
+            if not self.reservas:
+                return
+        id_reserva = self.rnd.choice(self.reservas)
+        self._peticion(
+            "GET reservas/<id>/factura/",
+            "GET",
+            f"/api/reservas/{id_reserva}/factura/",
+            correo=self.cliente["correo"],
+        )
+
+    def admin_consultas(self):
+        hoy = datetime.date.today()
+        self._peticion(
+            "GET consultas/turnos/",
+            "GET",
+            f"/api/consultas/turnos/?desde={hoy - datetime.timedelta(days=7)}&hasta={hoy + datetime.timedelta(days=7)}",
+            correo=self.datos["admin"],
+        )
+
+    def _dia_futuro(self):
+        dia = datetime.date.today() + datetime.timedelta(days=self.rnd.randint(1, 30))
+        if dia.weekday() == 6:  # domingo sin agenda
+            dia += datetime.timedelta(days=1)
+        return dia.isoformat()
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga HTTP contra un servidor sembrado con seed_perf: mezcla "
+        "ponderada de logins, disponibilidad, reservas de turno, catálogo, checkout, "
+        "facturas PDF y consultas del admin. Escribe un JSON con rps, p50/p95/p99 y "
+        "tasa de error por ruta."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://localhost:8000", help="URL base del servidor")
+        parser.add_argument("--segundos", type=float, default=30, help="Duración de la prueba")
+        parser.add_argument("--hilos", type=int, default=8, help="Usuarios virtuales concurrentes")
+        parser.add_argument("--timeout", type=float, default=30, help="Timeout por petición (s)")
+        parser.add_argument("--seed", type=int, default=42, help="Semilla de la mezcla")
+        parser.add_argument("--salida", default="loadtest.json", help="Fichero JSON del informe")
+
+    def handle(self, *args, **options):
+        datos = self._datos()
+        registro = _Registro()
+        operaciones = [nombre for nombre, _ in MEZCLA]
+        pesos = [peso for _, peso in MEZCLA]
+        fin = time.monotonic() + options["segundos"]
+
+        def trabajar(n):
+            rnd = random.Random(options["seed"] + n)
+            usuario = _UsuarioVirtual(options["url"], registro, datos, rnd, options["timeout"])
+            while time.monotonic() < fin:
+                getattr(usuario, rnd.choices(operaciones, pesos)[0])()
+
+        inicio = time.monotonic()
+        hilos = [threading.Thread(target=trabajar, args=(n,), daemon=True) for n in range(options["hilos"])]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        segundos = time.monotonic() - inicio
+
+        rutas = registro.informe(segundos)
+        total = sum(r["peticiones"] for r in rutas.values())
+        errores = sum(r["errores"] for r in rutas.values())
+        informe = {
+            "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+            "url": options["url"],
+            "hilos": options["hilos"],
+            "segundos": round(segundos, 2),
+            "mezcla": dict(MEZCLA),
+            "total": {
+                "peticiones": total,
+                "rps": round(total / segundos, 2),
+                "errores": errores,
+                "tasa_error": round(errores / total, 4) if total else 0.0,
+            },
+            "rutas": rutas,
+        }
+        with open(options["salida"], "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+
+        self._imprimir(informe)
+        self.stdout.write(self.style.SUCCESS(f"Informe en {options['salida']}"))
+
+    def _datos(self):
+        """Usuarios, mascotas y productos sembrados por seed_perf."""
+        sembrados = Usuario.objects.filter(correo__endswith=f"@{DOMINIO_PERF}")
+        admin = sembrados.filter(id_rol_id=ROLE_ADMIN).values_list("correo", flat=True).first()
+        veterinarios = list(sembrados.filter(id_rol_id=ROLE_VETERINARIO).values_list("id_usuario", flat=True))
+        clientes = list(
+            sembrados.filter(id_rol_id=ROLE_CLIENTE).order_by("id_usuario").values("id_usuario", "correo")[:500]
+        )
+        if not (admin and veterinarios and clientes):
+            raise CommandError("No hay datos de seed_perf: ejecuta antes manage.py seed_perf")
+
+        mascotas = {}
+        for id_mascota, id_usuario in Mascota.objects.filter(
+            id_usuario__in=[c["id_usuario"] for c in clientes]
+        ).values_list("id_mascota", "id_usuario"):
+            mascotas.setdefault(id_usuario, []).append(id_mascota)
+        for c in clientes:
+            c["mascotas"] = mascotas.get(c["id_usuario"], [])
+
+        # Productos con stock de sobra para que el checkout no falle por stock
+        productos = list(
+            Producto.objects.filter(stock_producto__gte=50).values_list("id_producto", flat=True)[:200]
+        )
+        return {"admin": admin, "veterinarios": veterinarios, "clientes": clientes, "productos": productos}
+
+    def _imprimir(self, informe):
+        self.stdout.write(
+            f"{'ruta':<30} {'pet':>7} {'rps':>8} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8}"
+        )
+        for ruta, r in informe["rutas"].items():
+            self.stdout.write(
+                f"{ruta:<30} {r['peticiones']:>7} {r['rps']:>8.1f} {r['tasa_error'] * 100:>6.1f} "
+                f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}"
+            )
+        t = informe["total"]
+        self.stdout.write(
+            f"Total: {t['peticiones']} peticiones, {t['rps']} rps, {t['tasa_error'] * 100:.2f}% errores"
+        )
@@ -0,0 +1,54 @@
+import datetime
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ...services.plantilla_service import materializar
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera la Agenda de los próximos días a partir de las plantillas semanales "
+        "(PlantillaHorario) menos las excepciones (ExcepcionHorario). Idempotente: "
+        "crea lo que falta, borra lo que sobra sin turnos y no toca lo demás "
+        "(ni los bloques guardados a mano)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", default=None, help="Primer día (YYYY-MM-DD). Por defecto, hoy")
+        parser.add_argument("--dias", type=int, default=90, help="Días a materializar desde --desde")
+        parser.add_argument(
+            "--doctor",
+            type=int,
+            action="append",
+            dest="doctores",
+            help="Solo este doctor (se puede repetir). Por defecto, todos los que tienen plantilla",
+        )
+
+    def handle(self, *args, **options):
+        max_dias = settings.PLANTILLA_MAX_DIAS
+        if not 1 <= options["dias"] <= max_dias:
+            raise CommandError(f"--dias debe estar entre 1 y {max_dias}")
+
+        desde = datetime.date.today()
+        if options["desde"]:
+            try:
+                desde = datetime.date.fromisoformat(options["desde"])
+            except ValueError:
+                raise CommandError("Formato de --desde inválido. Usa YYYY-MM-DD")
+        if desde < datetime.date.today():
+            raise CommandError("--desde no puede ser un día pasado")
+        hasta = desde + datetime.timedelta(days=options["dias"] - 1)
+
+        inicio = time.monotonic()
+        resultado = materializar(desde, hasta, doctores=options["doctores"])
+        segundos = time.monotonic() - inicio
+
+        self.stdout.write(
+            f"{desde} a {hasta}: {resultado['doctores']} doctores, {resultado['creados']} bloques creados, "
+            f"{resultado['borrados']} borrados, {resultado['actualizados']} actualizados, "
+            f"{resultado['conservados']} conservados por tener turnos, "
+            f"{resultado['manuales']} guardados a mano sin tocar"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Agenda materializada en {segundos:.2f}s"))
@@ -0,0 +1,61 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...services.seed_service import sembrar, CONTRASENA_PERF, DOMINIO_PERF
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera un conjunto de datos sintético de la clínica (usuarios, mascotas, "
+        "agenda, turnos, consultas, productos y reservas) proporcional a --scale, "
+        "con semilla fija y COPY. Tras sembrar, la réplica necesita sync_replica --completo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", type=int, default=1, help="Multiplicador del tamaño (1 ≈ 50k filas)")
+        parser.add_argument("--seed", type=int, default=42, help="Semilla del generador aleatorio")
+        parser.add_argument(
+            "--desde",
+            default=None,
+            help="Primer día de agenda (YYYY-MM-DD). Por defecto, medio periodo antes de hoy",
+        )
+        parser.add_argument("--dias", type=int, default=365, help="Días de agenda por veterinario")
+        parser.add_argument("--lote", type=int, default=50000, help="Filas por bloque de COPY")
+        parser.add_argument(
+            "--limpiar",
+            action="store_true",
+            help="Vacía antes Usuario, Producto, Reserva y todo lo que depende de ellos",
+        )
+
+    def handle(self, *args, **options):
+        if options["scale"] < 1:
+            raise CommandError("--scale debe ser 1 o mayor")
+
+        desde = None
+        if options["desde"]:
+            try:
+                desde = datetime.date.fromisoformat(options["desde"])
+            except ValueError:
+                raise CommandError("Formato de --desde inválido. Usa YYYY-MM-DD")
+
+        inicio = time.monotonic()
+        conteo = sembrar(
+            escala=options["scale"],
+            semilla=options["seed"],
+            desde=desde,
+            dias=options["dias"],
+            limpiar=options["limpiar"],
+            lote=options["lote"],
+        )
+        segundos = time.monotonic() - inicio
+
+        for tabla, filas in conteo.items():
+            self.stdout.write(f"{tabla:<16} {filas:>10}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{sum(conteo.values())} filas en {segundos:.1f}s. "
+                f"Usuarios u<id>@{DOMINIO_PERF}, contraseña '{CONTRASENA_PERF}'"
+            )
+        )
@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, DatabaseError
+
+from ...services.replica_sync_service import sincronizar, ReplicaNoConfigurada
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia a la réplica solo las filas cambiadas desde la última marca "
+        "(columnas fecha_actualizacion_* + registro de borrados), en lotes con COPY."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=None, help="Filas por lote de COPY")
+        parser.add_argument(
+            "--completo",
+            action="store_true",
+            help="Vacía la réplica y la copia entera (primera carga)",
+        )
+        parser.add_argument(
+            "--loop",
+            type=float,
+            default=None,
+            metavar="SEGUNDOS",
+            help="Repite la sincronización cada N segundos",
+        )
+
+    def handle(self, *args, **options):
+        completo = options["completo"]
+        while True:
+            inicio = time.monotonic()
+            try:
+                informe = sincronizar(lote=options["lote"], completo=completo)
+            except ReplicaNoConfigurada as e:
+                raise CommandError(str(e))
+            except DatabaseError as e:
+                if options["loop"] is None:
+                    raise CommandError(f"Error sincronizando la réplica: {e}")
+                # En modo loop se reintenta en la siguiente pasada
+                self.stderr.write(f"Error sincronizando la réplica: {e}")
+                connections.close_all()
+            else:
+                self._imprimir(informe, time.monotonic() - inicio)
+
+            if options["loop"] is None:
+                return
+            completo = False
+            time.sleep(options["loop"])
+
+    def _imprimir(self, informe, segundos):
+        self.stdout.write(f"{'tabla':<20} {'filas':>8} {'borradas':>9} {'bytes':>12}")
+        for fila in informe:
+            self.stdout.write(
+                f"{fila['tabla']:<20} {fila['filas']:>8} {fila['borradas']:>9} {fila['bytes']:>12}"
+            )
+        total_filas = sum(f["filas"] for f in informe)
+        total_bytes = sum(f["bytes"] for f in informe)
+        tipo = "completa" if informe and informe[0]["completa"] else "incremental"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sincronización {tipo}: {total_filas} filas, {total_bytes} bytes en {segundos:.2f}s"
+            )
+        )
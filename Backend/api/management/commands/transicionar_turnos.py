@@ -0,0 +1,41 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...services.turno_service import ESTADO_ATENDIDO, ESTADO_NO_ASISTIO, transicionar_pasados
+
+
+class Command(BaseCommand):
+    help = (
+        f"Cierra los turnos pendientes ya pasados: {ESTADO_ATENDIDO} si tienen consulta, "
+        f"{ESTADO_NO_ASISTIO} si no. Por lotes y con un HistorialTurno por cambio. "
+        "Pensado para cron (una vez al día, de madrugada); se puede repetir sin efecto."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hasta", default=None, help="Último día a cerrar (YYYY-MM-DD). Por defecto, ayer"
+        )
+        parser.add_argument("--lote", type=int, default=5000, help="Turnos por transacción")
+
+    def handle(self, *args, **options):
+        if options["lote"] < 1:
+            raise CommandError("--lote debe ser 1 o mayor")
+
+        hasta = datetime.date.today() - datetime.timedelta(days=1)
+        if options["hasta"]:
+            try:
+                hasta = datetime.date.fromisoformat(options["hasta"])
+            except ValueError:
+                raise CommandError("Formato de --hasta inválido. Usa YYYY-MM-DD")
+
+        inicio = time.monotonic()
+        resultado = transicionar_pasados(hasta, lote=options["lote"])
+        segundos = time.monotonic() - inicio
+
+        self.stdout.write(
+            f"Hasta {hasta}: {resultado['atendidos']} atendidos, "
+            f"{resultado['no_asistio']} sin asistir, en {resultado['lotes']} lotes"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Turnos cerrados en {segundos:.2f}s"))
@@ -0,0 +1,23 @@
+from .db_router import CABECERA_PIN, iniciar_peticion, marca_primaria, replica_configurada, terminar_peticion
+
+
+class ReplicaMiddleware:
+    """
+    Abre el estado de lectura/escritura de cada request para ReplicaRouter.
+    Si la request escribió en la BD, la respuesta lleva CABECERA_PIN: el
+    cliente que la reenvía lee de la primaria unos segundos (ve sus propios
+    cambios aunque la réplica vaya atrasada).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = iniciar_peticion()
+        try:
+            response = self.get_response(request)
+        finally:
+            estado = terminar_peticion(token)
+        if estado.escribio and replica_configurada():
+            response[CABECERA_PIN] = marca_primaria()
+        return response
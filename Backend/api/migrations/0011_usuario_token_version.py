@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_reserva_detallereserva'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_usuario_token_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RefreshToken',
+            fields=[
+                ('id_refresh_token', models.AutoField(primary_key=True, serialize=False)),
+                ('token_hash', models.CharField(max_length=64, unique=True)),
+                ('familia', models.CharField(db_index=True, max_length=32)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_expiracion', models.DateTimeField()),
+                ('fecha_revocacion', models.DateTimeField(blank=True, null=True)),
+                ('id_usuario', models.ForeignKey(db_column='id_usuario', on_delete=django.db.models.deletion.CASCADE, related_name='refresh_tokens', to='api.usuario')),
+            ],
+            options={
+                'db_table': 'RefreshToken',
+            },
+        ),
+    ]
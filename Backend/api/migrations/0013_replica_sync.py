@@ -0,0 +1,79 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:03
+
+from django.db import migrations, models
+
+# Tablas que copia sync_replica -> columna de su clave primaria
+TABLAS = {
+    "Estado": "id_estado",
+    "Rol": "id_rol",
+    "Usuario": "id_usuario",
+    "HistorialUsuario": "id_historial",
+    "Mascota": "id_mascota",
+    "Agenda": "id_agenda",
+    "Turno": "id_turno",
+    "Consulta": "id_consulta",
+    "Producto": "id_producto",
+    "Compra": "id_compra",
+    "Detalle_compra": "id_detalle",
+    "Actividad": "id_actividad",
+    "Doctor_Actividad": "id",
+    "Reserva": "id_reserva",
+    "DetalleReserva": "id_detalle",
+}
+
+FUNCION = """
+CREATE OR REPLACE FUNCTION replica_registrar_borrado() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO "ReplicaBorrado" (tabla, id_fila, fecha)
+    VALUES (TG_TABLE_NAME, (to_jsonb(OLD) ->> TG_ARGV[0])::bigint, now());
+    RETURN OLD;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+TRIGGERS = "".join(
+    f'''CREATE TRIGGER replica_borrado AFTER DELETE ON "{tabla}"
+    FOR EACH ROW EXECUTE FUNCTION replica_registrar_borrado('{pk}');
+'''
+    for tabla, pk in TABLAS.items()
+)
+
+BORRAR_TRIGGERS = "".join(
+    f'DROP TRIGGER IF EXISTS replica_borrado ON "{tabla}";\n' for tabla in TABLAS
+) + "DROP FUNCTION IF EXISTS replica_registrar_borrado();"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_refreshtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReplicaBorrado',
+            fields=[
+                ('id_borrado', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tabla', models.CharField(max_length=63)),
+                ('id_fila', models.BigIntegerField()),
+                ('fecha', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'db_table': 'ReplicaBorrado',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReplicaSync',
+            fields=[
+                ('tabla', models.CharField(max_length=63, primary_key=True, serialize=False)),
+                ('marca', models.DateTimeField()),
+                ('filas', models.BigIntegerField(default=0)),
+                ('bytes', models.BigIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'ReplicaSync',
+            },
+        ),
+        migrations.RunSQL(FUNCION + TRIGGERS, BORRAR_TRIGGERS),
+    ]
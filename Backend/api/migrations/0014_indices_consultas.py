@@ -0,0 +1,72 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:12
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY: no bloquea escrituras en Turno/Reserva
+    # mientras se construyen (no puede ir dentro de una transacción)
+    atomic = False
+
+    dependencies = [
+        ('api', '0013_replica_sync'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='agenda',
+            index=models.Index(fields=['id_usuario', 'dia_atencion', 'hora_atencion'], name='agenda_doctor_dia_hora_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='estado',
+            index=models.Index(django.db.models.functions.text.Upper('descripcion_estado'), name='estado_descripcion_upper_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='historialusuario',
+            index=models.Index(fields=['-fecha'], name='historial_fecha_desc_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='refreshtoken',
+            index=models.Index(condition=models.Q(('fecha_revocacion__isnull', True)), fields=['id_usuario'], name='refresh_activo_usuario_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='reserva',
+            index=models.Index(fields=['-fecha_reserva'], name='reserva_fecha_desc_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='reserva',
+            index=models.Index(fields=['id_usuario', '-fecha_reserva'], name='reserva_usuario_fecha_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='turno',
+            index=models.Index(fields=['id_agenda', 'fecha_turno', 'hora_turno'], name='turno_agenda_fecha_hora_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='turno',
+            index=models.Index(fields=['fecha_turno', 'hora_turno'], name='turno_fecha_hora_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='usuario',
+            index=models.Index(fields=['correo'], name='usuario_correo_idx'),
+        ),
+        # Los índices simples de estas FK sobran: las nuevas compuestas
+        # empiezan por la misma columna. Se quitan cuando ya existen.
+        migrations.AlterField(
+            model_name='agenda',
+            name='id_usuario',
+            field=models.ForeignKey(db_column='id_usuario', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='agendas', to='api.usuario'),
+        ),
+        migrations.AlterField(
+            model_name='reserva',
+            name='id_usuario',
+            field=models.ForeignKey(db_column='id_usuario', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='api.usuario'),
+        ),
+        migrations.AlterField(
+            model_name='turno',
+            name='id_agenda',
+            field=models.ForeignKey(db_column='id_agenda', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='turnos', to='api.agenda'),
+        ),
+    ]
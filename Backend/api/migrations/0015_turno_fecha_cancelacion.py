@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:30
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Coalesce, Now
+
+
+def marcar_cancelados(apps, schema_editor):
+    """Los turnos ya cancelados liberan su bloque."""
+    Turno = apps.get_model("api", "Turno")
+    db = schema_editor.connection.alias
+    # fecha_actualizacion_turno también: la sincronización con la réplica la usa
+    Turno.objects.using(db).filter(
+        id_estado__descripcion_estado__iexact="Cancelada",
+        fecha_cancelacion_turno__isnull=True,
+    ).update(
+        fecha_cancelacion_turno=Coalesce("fecha_actualizacion_turno", Now()),
+        fecha_actualizacion_turno=Now(),
+    )
+
+
+def comprobar_duplicados(apps, schema_editor):
+    """
+    Si ya hay bloques con más de un turno vigente el índice único de 0016 no se
+    puede crear. No se cancela ninguno a ciegas: se avisa para resolverlo a mano.
+    """
+    Turno = apps.get_model("api", "Turno")
+    db = schema_editor.connection.alias
+    duplicados = (
+        Turno.objects.using(db).filter(fecha_cancelacion_turno__isnull=True)
+        .values("id_agenda", "fecha_turno", "hora_turno")
+        .annotate(n=Count("id_turno"))
+        .filter(n__gt=1)
+        .order_by("fecha_turno", "hora_turno")
+    )
+    total = duplicados.count()
+    if total:
+        ejemplos = ", ".join(
+            f"agenda {d['id_agenda']} {d['fecha_turno']} {d['hora_turno']} ({d['n']} turnos)"
+            for d in duplicados[:5]
+        )
+        raise RuntimeError(
+            f"Hay {total} bloques de agenda con más de un turno vigente (p. ej. {ejemplos}). "
+            "Cancela los sobrantes antes de migrar."
+        )
+
+
+class Migration(migrations.Migration):
+    # Todo en una transacción: si hay duplicados no queda nada a medias
+
+    dependencies = [
+        ('api', '0014_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turno',
+            name='fecha_cancelacion_turno',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(marcar_cancelados, migrations.RunPython.noop),
+        migrations.RunPython(comprobar_duplicados, migrations.RunPython.noop),
+    ]
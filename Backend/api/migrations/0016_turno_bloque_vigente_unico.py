@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE UNIQUE INDEX CONCURRENTLY: no bloquea las reservas mientras se
+    # construye (no puede ir dentro de una transacción)
+    atomic = False
+
+    dependencies = [
+        ('api', '0015_turno_fecha_cancelacion'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                # Un CONCURRENTLY fallido deja el índice INVALID: se quita antes de reintentar
+                migrations.RunSQL(
+                    'DROP INDEX CONCURRENTLY IF EXISTS "turno_bloque_vigente_unico"',
+                    migrations.RunSQL.noop,
+                ),
+                migrations.RunSQL(
+                    'CREATE UNIQUE INDEX CONCURRENTLY "turno_bloque_vigente_unico" '
+                    'ON "Turno" ("id_agenda", "fecha_turno", "hora_turno") '
+                    'WHERE "fecha_cancelacion_turno" IS NULL',
+                    'DROP INDEX CONCURRENTLY IF EXISTS "turno_bloque_vigente_unico"',
+                ),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='turno',
+                    constraint=models.UniqueConstraint(condition=models.Q(('fecha_cancelacion_turno__isnull', True)), fields=('id_agenda', 'fecha_turno', 'hora_turno'), name='turno_bloque_vigente_unico'),
+                ),
+            ],
+        ),
+    ]
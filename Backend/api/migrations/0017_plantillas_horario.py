@@ -0,0 +1,72 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:38
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Trigger de borrados para sync_replica (función creada en 0013)
+TABLAS = {
+    "PlantillaHorario": "id_plantilla",
+    "ExcepcionHorario": "id_excepcion",
+}
+
+TRIGGERS = "".join(
+    f'''CREATE TRIGGER replica_borrado AFTER DELETE ON "{tabla}"
+    FOR EACH ROW EXECUTE FUNCTION replica_registrar_borrado('{pk}');
+'''
+    for tabla, pk in TABLAS.items()
+)
+
+BORRAR_TRIGGERS = "".join(
+    f'DROP TRIGGER IF EXISTS replica_borrado ON "{tabla}";\n' for tabla in TABLAS
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_turno_bloque_vigente_unico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExcepcionHorario',
+            fields=[
+                ('id_excepcion', models.AutoField(primary_key=True, serialize=False)),
+                ('fecha_inicio', models.DateField()),
+                ('fecha_fin', models.DateField()),
+                ('motivo', models.CharField(blank=True, max_length=150, null=True)),
+                ('fecha_creacion_excepcion', models.DateTimeField(auto_now_add=True, null=True)),
+                ('fecha_actualizacion_excepcion', models.DateTimeField(auto_now=True, null=True)),
+                ('id_usuario_creacion_excepcion', models.IntegerField(blank=True, null=True)),
+                ('id_usuario_actualizacion_excepcion', models.IntegerField(blank=True, null=True)),
+                ('id_usuario', models.ForeignKey(blank=True, db_column='id_usuario', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='excepciones_horario', to='api.usuario')),
+            ],
+            options={
+                'db_table': 'ExcepcionHorario',
+                'ordering': ['fecha_inicio'],
+                'constraints': [models.CheckConstraint(condition=models.Q(('fecha_fin__gte', models.F('fecha_inicio'))), name='excepcion_fecha_fin_mayor')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PlantillaHorario',
+            fields=[
+                ('id_plantilla', models.AutoField(primary_key=True, serialize=False)),
+                ('dia_semana', models.PositiveSmallIntegerField(choices=[(0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'), (4, 'Viernes'), (5, 'Sábado'), (6, 'Domingo')])),
+                ('hora_inicio', models.TimeField()),
+                ('hora_fin', models.TimeField()),
+                ('duracion_turno', models.DurationField(default=datetime.timedelta(seconds=3600))),
+                ('fecha_creacion_plantilla', models.DateTimeField(auto_now_add=True, null=True)),
+                ('fecha_actualizacion_plantilla', models.DateTimeField(auto_now=True, null=True)),
+                ('id_usuario_creacion_plantilla', models.IntegerField(blank=True, null=True)),
+                ('id_usuario_actualizacion_plantilla', models.IntegerField(blank=True, null=True)),
+                ('id_usuario', models.ForeignKey(db_column='id_usuario', on_delete=django.db.models.deletion.CASCADE, related_name='plantillas_horario', to='api.usuario')),
+            ],
+            options={
+                'db_table': 'PlantillaHorario',
+                'ordering': ['id_usuario', 'dia_semana', 'hora_inicio'],
+                'constraints': [models.CheckConstraint(condition=models.Q(('hora_fin__gt', models.F('hora_inicio'))), name='plantilla_hora_fin_mayor'), models.CheckConstraint(condition=models.Q(('duracion_turno__gt', datetime.timedelta(0))), name='plantilla_duracion_positiva')],
+            },
+        ),
+        migrations.RunSQL(TRIGGERS, BORRAR_TRIGGERS),
+    ]
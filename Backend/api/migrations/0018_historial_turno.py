@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Trigger de borrados para sync_replica (función creada en 0013)
+TRIGGER = """CREATE TRIGGER replica_borrado AFTER DELETE ON "HistorialTurno"
+    FOR EACH ROW EXECUTE FUNCTION replica_registrar_borrado('id_historial_turno');
+"""
+
+BORRAR_TRIGGER = 'DROP TRIGGER IF EXISTS replica_borrado ON "HistorialTurno";\n'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_plantillas_horario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistorialTurno',
+            fields=[
+                ('id_historial_turno', models.AutoField(primary_key=True, serialize=False)),
+                ('motivo', models.CharField(max_length=50)),
+                ('realizado_por', models.IntegerField(blank=True, null=True)),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'HistorialTurno',
+            },
+        ),
+        migrations.AddField(
+            model_name='historialturno',
+            name='id_estado_anterior',
+            field=models.ForeignKey(db_column='id_estado_anterior', on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='api.estado'),
+        ),
+        migrations.AddField(
+            model_name='historialturno',
+            name='id_estado_nuevo',
+            field=models.ForeignKey(db_column='id_estado_nuevo', on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='api.estado'),
+        ),
+        migrations.AddField(
+            model_name='historialturno',
+            name='id_turno',
+            field=models.ForeignKey(db_column='id_turno', on_delete=django.db.models.deletion.CASCADE, related_name='historial', to='api.turno'),
+        ),
+        migrations.RunSQL(TRIGGER, BORRAR_TRIGGER),
+    ]
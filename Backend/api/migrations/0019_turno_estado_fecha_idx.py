@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CONCURRENTLY: Turno sigue aceptando reservas mientras se construye el
+    # índice (no puede ir dentro de una transacción)
+    atomic = False
+
+    dependencies = [
+        ('api', '0018_historial_turno'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                # Un CONCURRENTLY fallido deja el índice INVALID: se quita antes de reintentar
+                migrations.RunSQL(
+                    'DROP INDEX CONCURRENTLY IF EXISTS "turno_estado_fecha_idx"',
+                    migrations.RunSQL.noop,
+                ),
+                migrations.RunSQL(
+                    'CREATE INDEX CONCURRENTLY "turno_estado_fecha_idx" ON "Turno" ("id_estado", "fecha_turno")',
+                    'DROP INDEX CONCURRENTLY IF EXISTS "turno_estado_fecha_idx"',
+                ),
+                # El índice de la FK id_estado queda cubierto por el nuevo
+                migrations.RunSQL(
+                    'DROP INDEX CONCURRENTLY IF EXISTS "Turno_id_estado_ffe50007"',
+                    'CREATE INDEX CONCURRENTLY IF NOT EXISTS "Turno_id_estado_ffe50007" ON "Turno" ("id_estado")',
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='turno',
+                    name='id_estado',
+                    field=models.ForeignKey(db_column='id_estado', db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='turnos', to='api.estado'),
+                ),
+                migrations.AddIndex(
+                    model_name='turno',
+                    index=models.Index(fields=['id_estado', 'fecha_turno'], name='turno_estado_fecha_idx'),
+                ),
+            ],
+        ),
+    ]
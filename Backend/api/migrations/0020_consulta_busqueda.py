@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:05
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_turno_estado_fecha_idx'),
+    ]
+
+    # ADD COLUMN ... STORED reescribe la tabla para calcular la columna de las
+    # filas que ya hay (un bloqueo del tiempo de esa pasada); el índice va
+    # aparte, CONCURRENTLY, en 0021
+    operations = [
+        migrations.AddField(
+            model_name='consulta',
+            name='busqueda',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('diagnostico_consulta', config='spanish', weight='A'), '||', django.contrib.postgres.search.SearchVector('prescripcion_consulta', config='spanish', weight='B'), django.contrib.postgres.search.SearchConfig('spanish')), '||', django.contrib.postgres.search.SearchVector('observacion_consulta', config='spanish', weight='C'), django.contrib.postgres.search.SearchConfig('spanish')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:06
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # CONCURRENTLY: se siguen registrando consultas mientras se construye el
+    # índice (no puede ir dentro de una transacción)
+    atomic = False
+
+    dependencies = [
+        ('api', '0020_consulta_busqueda'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                # Un CONCURRENTLY fallido deja el índice INVALID: se quita antes de reintentar
+                migrations.RunSQL(
+                    'DROP INDEX CONCURRENTLY IF EXISTS "consulta_busqueda_gin"',
+                    migrations.RunSQL.noop,
+                ),
+                migrations.RunSQL(
+                    'CREATE INDEX CONCURRENTLY "consulta_busqueda_gin" ON "Consulta" USING gin ("busqueda")',
+                    'DROP INDEX CONCURRENTLY IF EXISTS "consulta_busqueda_gin"',
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='consulta',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['busqueda'], name='consulta_busqueda_gin'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:10
+
+from django.db import migrations, models
+
+# (tabla, índice, columna): la marca de cambios que filtra sync_replica en
+# cada pasada. HistorialUsuario ya la tiene (historial_fecha_desc_idx).
+INDICES = (
+    ("Agenda", "agenda_actualizacion_idx", "fecha_actualizacion_agenda"),
+    ("Turno", "turno_actualizacion_idx", "fecha_actualizacion_turno"),
+    ("HistorialTurno", "historial_turno_fecha_idx", "fecha"),
+    ("Consulta", "consulta_actualizacion_idx", "fecha_actualizacion_consulta"),
+)
+
+
+def _crear(tabla, indice, columna):
+    return [
+        # Un CONCURRENTLY fallido deja el índice INVALID: se quita antes de reintentar
+        migrations.RunSQL(
+            f'DROP INDEX CONCURRENTLY IF EXISTS "{indice}"',
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            f'CREATE INDEX CONCURRENTLY "{indice}" ON "{tabla}" ("{columna}")',
+            f'DROP INDEX CONCURRENTLY IF EXISTS "{indice}"',
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+    # CONCURRENTLY: las tablas siguen aceptando escrituras mientras se
+    # construyen los índices (no puede ir dentro de una transacción)
+    atomic = False
+
+    dependencies = [
+        ('api', '0021_consulta_busqueda_gin'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[op for indice in INDICES for op in _crear(*indice)],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='agenda',
+                    index=models.Index(fields=['fecha_actualizacion_agenda'], name='agenda_actualizacion_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='turno',
+                    index=models.Index(fields=['fecha_actualizacion_turno'], name='turno_actualizacion_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='historialturno',
+                    index=models.Index(fields=['fecha'], name='historial_turno_fecha_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='consulta',
+                    index=models.Index(fields=['fecha_actualizacion_consulta'], name='consulta_actualizacion_idx'),
+                ),
+            ],
+        ),
+    ]
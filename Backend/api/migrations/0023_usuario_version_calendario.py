@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_indices_marca_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='version_calendario',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_usuario_version_calendario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agenda',
+            name='de_plantilla',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,4 +1,10 @@
+from datetime import timedelta
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models import F, Q
+from django.db.models.functions import Upper
 
 class Estado(models.Model):
     id_estado = models.AutoField(primary_key=True)
@@ -10,6 +16,10 @@ class Estado(models.Model):
 
     class Meta:
         db_table = "Estado"
+        indexes = [
+            # descripcion_estado__iexact compila a UPPER(col) = UPPER(%s)
+            models.Index(Upper("descripcion_estado"), name="estado_descripcion_upper_idx"),
+        ]
 
     def __str__(self):
         return self.descripcion_estado
@@ -50,6 +60,10 @@ class Usuario(models.Model):
     fecha_actualizacion_usuario = models.DateTimeField(auto_now=True, null=True, blank=True)
     id_usuario_creacion = models.IntegerField(null=True, blank=True)
     id_usuario_actualizacion = models.IntegerField(null=True, blank=True)
+    # Se incrementa al cerrar sesión, cambiar rol o contraseña: invalida los JWT emitidos
+    token_version = models.PositiveIntegerField(default=0)
+    # Va firmada en la URL del feed .ics del doctor: subirla revoca las URLs anteriores
+    version_calendario = models.PositiveIntegerField(default=0)
     id_rol = models.ForeignKey(
         Rol,
         on_delete=models.PROTECT,
@@ -59,6 +73,9 @@ class Usuario(models.Model):
 
     class Meta:
         db_table = "Usuario"
+        indexes = [
+            models.Index(fields=["correo"], name="usuario_correo_idx"),  # login por correo
+        ]
 
     def __str__(self):
         return f"{self.nombre} {self.apellido}"
@@ -73,6 +90,41 @@ class Usuario(models.Model):
         return True
 
 
+class RefreshToken(models.Model):
+    """
+    Refresh token de larga duración (rotativo).
+    Solo se guarda el SHA-256 del token: es aleatorio y largo, así que no
+    necesita PBKDF2 y se busca por índice único en una sola consulta.
+    """
+    id_refresh_token = models.AutoField(primary_key=True)
+    id_usuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        db_column="id_usuario",
+        related_name="refresh_tokens",
+    )
+    token_hash = models.CharField(max_length=64, unique=True)
+    # Todas las rotaciones de un mismo login comparten familia
+    familia = models.CharField(max_length=32, db_index=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_expiracion = models.DateTimeField()
+    fecha_revocacion = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "RefreshToken"
+        indexes = [
+            # Solo los vigentes: es lo que se busca al revocar en logout
+            models.Index(
+                fields=["id_usuario"],
+                condition=Q(fecha_revocacion__isnull=True),
+                name="refresh_activo_usuario_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"RefreshToken {self.id_refresh_token} - usuario {self.id_usuario_id}"
+
+
 class HistorialUsuario(models.Model):
     id_historial = models.AutoField(primary_key=True)
 
@@ -103,6 +155,9 @@ class HistorialUsuario(models.Model):
     class Meta:
         db_table = "HistorialUsuario"
         ordering = ["-fecha"]
+        indexes = [
+            models.Index(fields=["-fecha"], name="historial_fecha_desc_idx"),
+        ]
 
     def __str__(self):
         return f"{self.usuario.nombre} - {self.tipo} - {self.fecha}"
@@ -143,20 +198,121 @@ class Agenda(models.Model):
     fecha_actualizacion_agenda = models.DateTimeField(auto_now=True, null=True, blank=True)
     id_usuario_creacion_agenda = models.IntegerField(null=True, blank=True)
     id_usuario_actualizacion_agenda = models.IntegerField(null=True, blank=True)
+    # Lo creó plantilla_service.materializar: solo estos bloques los borra o
+    # ajusta una nueva pasada. Lo guardado a mano (guardar_horarios) no se toca.
+    de_plantilla = models.BooleanField(default=False)
     id_usuario = models.ForeignKey(
         Usuario,
         on_delete=models.CASCADE,
         db_column="id_usuario",
         related_name="agendas",
+        db_index=False,  # cubierto por agenda_doctor_dia_hora_idx
     )
 
     class Meta:
         db_table = "Agenda"
+        indexes = [
+            # horarios de un doctor en un día, ya ordenados por hora
+            models.Index(
+                fields=["id_usuario", "dia_atencion", "hora_atencion"],
+                name="agenda_doctor_dia_hora_idx",
+            ),
+            # cambios desde la última pasada de sync_replica
+            models.Index(fields=["fecha_actualizacion_agenda"], name="agenda_actualizacion_idx"),
+        ]
 
     def __str__(self):
         return f"Agenda {self.id_agenda} - {self.dia_atencion}"
 
 
+class PlantillaHorario(models.Model):
+    """
+    Horario semanal recurrente de un doctor: cada dia_semana atiende de
+    hora_inicio a hora_fin en bloques de duracion_turno. Las filas de
+    Agenda se generan con plantilla_service.materializar.
+    """
+
+    DIAS_SEMANA = [
+        (0, "Lunes"),
+        (1, "Martes"),
+        (2, "Miércoles"),
+        (3, "Jueves"),
+        (4, "Viernes"),
+        (5, "Sábado"),
+        (6, "Domingo"),
+    ]
+
+    id_plantilla = models.AutoField(primary_key=True)
+    dia_semana = models.PositiveSmallIntegerField(choices=DIAS_SEMANA)  # date.weekday()
+    hora_inicio = models.TimeField()
+    hora_fin = models.TimeField()
+    duracion_turno = models.DurationField(default=timedelta(hours=1))
+    fecha_creacion_plantilla = models.DateTimeField(auto_now_add=True, null=True, blank=True)
+    fecha_actualizacion_plantilla = models.DateTimeField(auto_now=True, null=True, blank=True)
+    id_usuario_creacion_plantilla = models.IntegerField(null=True, blank=True)
+    id_usuario_actualizacion_plantilla = models.IntegerField(null=True, blank=True)
+    id_usuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        db_column="id_usuario",
+        related_name="plantillas_horario",
+    )
+
+    class Meta:
+        db_table = "PlantillaHorario"
+        ordering = ["id_usuario", "dia_semana", "hora_inicio"]
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(hora_fin__gt=F("hora_inicio")),
+                name="plantilla_hora_fin_mayor",
+            ),
+            models.CheckConstraint(
+                condition=Q(duracion_turno__gt=timedelta(0)),
+                name="plantilla_duracion_positiva",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Plantilla {self.id_usuario_id} - {self.get_dia_semana_display()} {self.hora_inicio}-{self.hora_fin}"
+
+
+class ExcepcionHorario(models.Model):
+    """
+    Días sin atención (vacaciones, feriados) de fecha_inicio a fecha_fin,
+    ambos incluidos. Sin doctor aplica a toda la clínica.
+    """
+
+    id_excepcion = models.AutoField(primary_key=True)
+    fecha_inicio = models.DateField()
+    fecha_fin = models.DateField()
+    motivo = models.CharField(max_length=150, null=True, blank=True)
+    fecha_creacion_excepcion = models.DateTimeField(auto_now_add=True, null=True, blank=True)
+    fecha_actualizacion_excepcion = models.DateTimeField(auto_now=True, null=True, blank=True)
+    id_usuario_creacion_excepcion = models.IntegerField(null=True, blank=True)
+    id_usuario_actualizacion_excepcion = models.IntegerField(null=True, blank=True)
+    id_usuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        db_column="id_usuario",
+        related_name="excepciones_horario",
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        db_table = "ExcepcionHorario"
+        ordering = ["fecha_inicio"]
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(fecha_fin__gte=F("fecha_inicio")),
+                name="excepcion_fecha_fin_mayor",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Excepción {self.fecha_inicio} - {self.fecha_fin} ({self.motivo or 'sin motivo'})"
+
+
 class Turno(models.Model):
     id_turno = models.AutoField(primary_key=True)
     fecha_turno = models.DateField()
@@ -182,21 +338,91 @@ class Turno(models.Model):
         on_delete=models.CASCADE,
         db_column="id_agenda",
         related_name="turnos",
+        db_index=False,  # cubierto por turno_agenda_fecha_hora_idx
     )
     id_estado = models.ForeignKey(
         Estado,
         on_delete=models.PROTECT,
         db_column="id_estado",
         related_name="turnos",
+        db_index=False,  # cubierto por turno_estado_fecha_idx
     )
+    # Se rellena al cancelar: un turno cancelado deja libre su bloque
+    fecha_cancelacion_turno = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = "Turno"
+        constraints = [
+            # Un solo turno vigente por bloque de agenda: el INSERT es la reserva
+            models.UniqueConstraint(
+                fields=["id_agenda", "fecha_turno", "hora_turno"],
+                condition=Q(fecha_cancelacion_turno__isnull=True),
+                name="turno_bloque_vigente_unico",
+            ),
+        ]
+        indexes = [
+            # ¿está ocupado este horario? (agenda + fecha + hora)
+            models.Index(
+                fields=["id_agenda", "fecha_turno", "hora_turno"],
+                name="turno_agenda_fecha_hora_idx",
+            ),
+            # turnos de un día ordenados por hora / listados por fecha
+            models.Index(fields=["fecha_turno", "hora_turno"], name="turno_fecha_hora_idx"),
+            # informes por estado en un rango (atendidos / no asistió) y
+            # los pendientes ya pasados que busca transicionar_turnos
+            models.Index(fields=["id_estado", "fecha_turno"], name="turno_estado_fecha_idx"),
+            # cambios desde la última pasada de sync_replica
+            models.Index(fields=["fecha_actualizacion_turno"], name="turno_actualizacion_idx"),
+        ]
 
     def __str__(self):
         return f"Turno {self.id_turno} - {self.fecha_turno} {self.hora_turno}"
 
 
+class HistorialTurno(models.Model):
+    """Un cambio de estado de un turno: quién (None = proceso automático), cuándo y por qué."""
+
+    id_historial_turno = models.AutoField(primary_key=True)
+    id_turno = models.ForeignKey(
+        Turno,
+        on_delete=models.CASCADE,
+        db_column="id_turno",
+        related_name="historial",
+    )
+    # DO_NOTHING: la FK de la BD ya impide borrar un estado con historial, y así
+    # borrar un Estado no hace dos SELECT más sobre esta tabla
+    id_estado_anterior = models.ForeignKey(
+        Estado,
+        on_delete=models.DO_NOTHING,
+        db_column="id_estado_anterior",
+        related_name="+",
+    )
+    id_estado_nuevo = models.ForeignKey(
+        Estado,
+        on_delete=models.DO_NOTHING,
+        db_column="id_estado_nuevo",
+        related_name="+",
+    )
+    motivo = models.CharField(max_length=50)  # ej: "con_consulta", "sin_consulta"
+    realizado_por = models.IntegerField(null=True, blank=True)
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "HistorialTurno"
+        indexes = [
+            # altas desde la última pasada de sync_replica
+            models.Index(fields=["fecha"], name="historial_turno_fecha_idx"),
+        ]
+
+    def __str__(self):
+        return f"Turno {self.id_turno_id}: {self.id_estado_anterior_id} -> {self.id_estado_nuevo_id}"
+
+
+# Configuración de texto de PostgreSQL para Consulta.busqueda (y las
+# búsquedas sobre ella: tienen que usar la misma)
+CONFIG_BUSQUEDA = "spanish"
+
+
 class Consulta(models.Model):
     id_consulta = models.AutoField(primary_key=True)
     diagnostico_consulta = models.TextField(null=True, blank=True)
@@ -212,9 +438,27 @@ class Consulta(models.Model):
         db_column="id_turno",
         related_name="consultas",
     )
+    # Diagnóstico, prescripción y observación como tsvector en español (con
+    # ese peso), para la búsqueda de consultas_buscar. Columna generada: la
+    # BD la recalcula en cada INSERT/UPDATE, también en los update() y COPY
+    # que no pasan por save()
+    busqueda = models.GeneratedField(
+        expression=(
+            SearchVector("diagnostico_consulta", config=CONFIG_BUSQUEDA, weight="A")
+            + SearchVector("prescripcion_consulta", config=CONFIG_BUSQUEDA, weight="B")
+            + SearchVector("observacion_consulta", config=CONFIG_BUSQUEDA, weight="C")
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
 
     class Meta:
         db_table = "Consulta"
+        indexes = [
+            GinIndex(fields=["busqueda"], name="consulta_busqueda_gin"),
+            # cambios desde la última pasada de sync_replica
+            models.Index(fields=["fecha_actualizacion_consulta"], name="consulta_actualizacion_idx"),
+        ]
 
     def __str__(self):
         return f"Consulta {self.id_consulta}"
@@ -364,6 +608,7 @@ class Reserva(models.Model):
         on_delete=models.CASCADE,
         db_column="id_usuario",
         related_name="reservas",
+        db_index=False,  # cubierto por reserva_usuario_fecha_idx
     )
     
     # Datos de la reserva
@@ -394,6 +639,10 @@ class Reserva(models.Model):
     class Meta:
         db_table = "Reserva"
         ordering = ['-fecha_reserva']
+        indexes = [
+            models.Index(fields=["-fecha_reserva"], name="reserva_fecha_desc_idx"),
+            models.Index(fields=["id_usuario", "-fecha_reserva"], name="reserva_usuario_fecha_idx"),
+        ]
 
     def __str__(self):
         return f"Reserva {self.codigo_factura} - {self.id_usuario.nombre}"
@@ -460,4 +709,41 @@ class DetalleReserva(models.Model):
         # Calcular subtotal automáticamente
         if self.precio_unitario and self.cantidad:
             self.subtotal = self.precio_unitario * self.cantidad
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+# ---------- SINCRONIZACIÓN DE LA RÉPLICA (manage.py sync_replica) ----------
+class ReplicaBorrado(models.Model):
+    """
+    Registro de filas borradas en la primaria. Lo llenan triggers
+    AFTER DELETE (migración 0013) y sync_replica lo usa para borrar
+    esas mismas filas en la réplica.
+    """
+    id_borrado = models.BigAutoField(primary_key=True)
+    tabla = models.CharField(max_length=63)
+    id_fila = models.BigIntegerField()
+    fecha = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = "ReplicaBorrado"
+
+    def __str__(self):
+        return f"{self.tabla} #{self.id_fila} borrado {self.fecha}"
+
+
+class ReplicaSync(models.Model):
+    """
+    Marca de agua por tabla: hasta qué momento de la primaria está copiada
+    la réplica. Vive en la réplica (la escribe sync_replica) y de ella sale
+    el lag que usa api.db_router.
+    """
+    tabla = models.CharField(max_length=63, primary_key=True)
+    marca = models.DateTimeField()
+    filas = models.BigIntegerField(default=0)
+    bytes = models.BigIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "ReplicaSync"
+
+    def __str__(self):
+        return f"{self.tabla} @ {self.marca}"
@@ -0,0 +1,95 @@
+import base64
+import datetime
+import json
+from typing import List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+# Cabecera con el cursor de la página siguiente (no viene en la última).
+# El cuerpo sigue siendo la lista de siempre: los clientes que no paginan
+# reciben la primera página sin cambiar nada.
+CABECERA_SIGUIENTE = "X-Cursor-Siguiente"
+
+
+def _tamano(request) -> int:
+    valor = request.query_params.get("limite")
+    if not valor:
+        return settings.PAGINA_TAMANO
+    try:
+        limite = int(valor)
+    except ValueError:
+        raise ValidationError({"limite": "Debe ser un número entero."})
+    return max(1, min(limite, settings.PAGINA_MAX))
+
+
+def _codificar(valores: list) -> str:
+    texto = json.dumps(
+        [v.isoformat() if isinstance(v, (datetime.date, datetime.time)) else v for v in valores],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip("=")
+
+
+def _decodificar(cursor: str, n: int) -> list:
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        valores = None
+    if not isinstance(valores, list) or len(valores) != n or any(v is None for v in valores):
+        raise ValidationError({"cursor": "Cursor inválido."})
+    return valores
+
+
+def _despues_de(orden: Sequence[str], valores: list) -> Q:
+    """
+    Filas que van después de `valores` en `orden` (keyset):
+    (a > x) OR (a = x AND b > y) OR ..., con > o < según la dirección
+    de cada campo. Se añade a >= x (o <=) sobre el primer campo para que
+    la BD lo use como rango del índice y no recorra lo ya servido.
+    """
+    siguientes = Q()
+    iguales = Q()
+    for campo, valor in zip(orden, valores):
+        nombre = campo.lstrip("-")
+        op = "lt" if campo.startswith("-") else "gt"
+        siguientes |= iguales & Q(**{f"{nombre}__{op}": valor})
+        iguales &= Q(**{nombre: valor})
+
+    primero = orden[0].lstrip("-")
+    op = "lte" if orden[0].startswith("-") else "gte"
+    return Q(**{f"{primero}__{op}": valores[0]}) & siguientes
+
+
+def paginar(request, queryset, orden: Sequence[str]) -> Tuple[List, Optional[str]]:
+    """
+    Una página de `queryset` ordenado por `orden` (campos del modelo, con
+    '-' para descendente; el último debe ser único, p. ej. la PK).
+    ?limite= fija el tamaño (PAGINA_TAMANO por defecto, como mucho
+    PAGINA_MAX) y ?cursor= sigue desde donde acabó la página anterior.
+    Sin OFFSET: la página 1000 cuesta lo mismo que la primera.
+    Devuelve (filas, cursor de la siguiente página o None).
+    """
+    tamano = _tamano(request)
+    queryset = queryset.order_by(*orden)
+
+    cursor = request.query_params.get("cursor")
+    if cursor:
+        queryset = queryset.filter(_despues_de(orden, _decodificar(cursor, len(orden))))
+
+    filas = list(queryset[: tamano + 1])
+    if len(filas) <= tamano:
+        return filas, None
+
+    filas = filas[:tamano]
+    ultima = filas[-1]
+    return filas, _codificar([getattr(ultima, campo.lstrip("-")) for campo in orden])
+
+
+def respuesta_paginada(datos, siguiente: Optional[str], status=200) -> Response:
+    response = Response(datos, status=status)
+    if siguiente:
+        response[CABECERA_SIGUIENTE] = siguiente
+    return response
@@ -0,0 +1,66 @@
+from rest_framework.permissions import BasePermission, SAFE_METHODS
+
+# Roles (tabla Rol)
+ROLE_ADMIN = 1
+ROLE_CLIENTE = 2
+ROLE_RECEPCIONISTA = 3
+ROLE_VETERINARIO = 4
+
+ROLES_STAFF = (ROLE_ADMIN, ROLE_RECEPCIONISTA, ROLE_VETERINARIO)
+ROLES_GESTOR = (ROLE_ADMIN, ROLE_RECEPCIONISTA)
+ROLES_DOCTOR = (ROLE_ADMIN, ROLE_VETERINARIO)  # los que atienden citas y tienen agenda
+
+
+def rol_de(user):
+    """
+    Id del rol del usuario leído de la columna local id_rol_id:
+    nunca hace JOIN ni consulta la tabla Rol.
+    """
+    rid = getattr(user, "id_rol_id", None)
+    return int(rid) if rid is not None else None
+
+
+def es_admin(user):
+    return rol_de(user) == ROLE_ADMIN
+
+
+def es_gestor_reservas(user):
+    """
+    Permisos tipo 'admin' SOLO para RESERVAS/FACTURAS:
+    Admin (1) y Recepcionista (3)
+    """
+    return rol_de(user) in ROLES_GESTOR
+
+
+class _PermisoPorRol(BasePermission):
+    roles = ()
+    # DRF responde 403 {"detail": message}; el frontend lo lee con
+    # mensajeError (src/api.js), igual que los {"error": ...} de las vistas
+    message = "No autorizado"
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        return rol_de(user) in self.roles
+
+
+class IsAdmin(_PermisoPorRol):
+    roles = (ROLE_ADMIN,)
+
+
+class IsStaff(_PermisoPorRol):
+    """Admin, Recepcionista o Veterinario."""
+    roles = ROLES_STAFF
+
+
+class IsGestor(_PermisoPorRol):
+    """Admin o Recepcionista (reservas, facturas y tienda)."""
+    roles = ROLES_GESTOR
+
+
+class ReadOnly(BasePermission):
+    """Solo métodos de lectura. Útil combinado: IsGestor | ReadOnly"""
+
+    def has_permission(self, request, view):
+        return request.method in SAFE_METHODS
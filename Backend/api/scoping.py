@@ -0,0 +1,123 @@
+from typing import Optional
+
+from django.db.models import Model, Q, QuerySet
+
+from .models import Consulta, Mascota, Reserva, Turno
+from .permissions import (
+    rol_de,
+    ROLE_ADMIN,
+    ROLE_CLIENTE,
+    ROLE_RECEPCIONISTA,
+    ROLE_VETERINARIO,
+)
+
+# Alcance por filas: qué filas de cada modelo puede ver o tocar un usuario
+# según su rol, como filtro del queryset. La comprobación va en el WHERE de
+# la misma consulta que lee la fila (por PK u otro índice): lo ajeno nunca
+# se carga, y "no existe" y "no es tuyo" responden igual (404), sin revelar
+# qué ids existen. Un rol sin regla para la acción no ve ninguna fila,
+# salvo que la acción tenga regla OTROS (la de cualquier otro rol).
+
+OTROS = "otros"
+
+
+def _todas(user):
+    return Q()
+
+
+def _suyas(campo):
+    return lambda user: Q(**{campo: user.id_usuario})
+
+
+_REGLAS = {
+    Turno: {
+        "ver": {
+            ROLE_ADMIN: _todas,
+            ROLE_RECEPCIONISTA: _todas,
+            ROLE_VETERINARIO: _suyas("id_agenda__id_usuario_id"),  # los de su agenda
+            ROLE_CLIENTE: _suyas("id_mascota__id_usuario_id"),  # los de sus mascotas
+        },
+        # Cancelar: el admin cualquiera; los demás, solo los que reservaron
+        "cancelar": {
+            ROLE_ADMIN: _todas,
+            OTROS: _suyas("id_usuario_id"),
+        },
+        # Registrar la consulta del turno
+        "atender": {
+            ROLE_ADMIN: _todas,
+            ROLE_VETERINARIO: _suyas("id_agenda__id_usuario_id"),
+        },
+    },
+    Consulta: {
+        "ver": {
+            ROLE_ADMIN: _todas,
+            ROLE_RECEPCIONISTA: _todas,
+            ROLE_VETERINARIO: _suyas("id_turno__id_agenda__id_usuario_id"),
+            ROLE_CLIENTE: _suyas("id_turno__id_mascota__id_usuario_id"),
+        },
+        "editar": {
+            ROLE_ADMIN: _todas,
+            ROLE_VETERINARIO: _suyas("id_turno__id_agenda__id_usuario_id"),
+        },
+        # Historia clínica: el personal, la de cualquier mascota (como en
+        # Mascota "ver"); el cliente, la de las suyas
+        "historia": {
+            ROLE_ADMIN: _todas,
+            ROLE_RECEPCIONISTA: _todas,
+            ROLE_VETERINARIO: _todas,
+            ROLE_CLIENTE: _suyas("id_turno__id_mascota__id_usuario_id"),
+        },
+    },
+    Mascota: {
+        "ver": {
+            ROLE_ADMIN: _todas,
+            ROLE_RECEPCIONISTA: _todas,
+            ROLE_VETERINARIO: _todas,
+            ROLE_CLIENTE: _suyas("id_usuario_id"),
+        },
+        # Editar/borrar: el admin cualquiera; los demás, solo las suyas
+        "editar": {
+            ROLE_ADMIN: _todas,
+            OTROS: _suyas("id_usuario_id"),
+        },
+    },
+    Reserva: {
+        # Admin y recepción gestionan todas; cada usuario ve y cancela las suyas
+        "ver": {
+            ROLE_ADMIN: _todas,
+            ROLE_RECEPCIONISTA: _todas,
+            OTROS: _suyas("id_usuario_id"),
+        },
+    },
+}
+_REGLAS[Reserva]["cancelar"] = _REGLAS[Reserva]["ver"]
+
+
+def filtro(user, modelo, accion: str = "ver") -> Optional[Q]:
+    """Q con las filas de `modelo` sobre las que `user` puede `accion`; None si ninguna."""
+    reglas = _REGLAS[modelo][accion]
+    regla = reglas.get(rol_de(user), reglas.get(OTROS))
+    return regla(user) if regla else None
+
+
+def tiene_alcance(user, modelo, accion: str = "ver") -> bool:
+    """¿Puede el rol de `user` hacer `accion` sobre alguna fila de `modelo`? Sin consultas."""
+    reglas = _REGLAS[modelo][accion]
+    return rol_de(user) in reglas or OTROS in reglas
+
+
+def visibles(user, queryset, accion: str = "ver") -> QuerySet:
+    """`queryset` (o un modelo) limitado a lo que `user` puede `accion`. Sin alcance: .none(), que no consulta."""
+    if isinstance(queryset, type) and issubclass(queryset, Model):
+        queryset = queryset._default_manager.all()
+    q = filtro(user, queryset.model, accion)
+    return queryset.none() if q is None else queryset.filter(q)
+
+
+def obtener(user, queryset, accion: str = "ver", **lookup) -> Optional[Model]:
+    """
+    La fila de `lookup` (p. ej. id_turno=5) si `user` puede `accion` sobre
+    ella; None si no existe o no le toca. Una consulta, o ninguna si el rol
+    no tiene alcance.
+    """
+    return visibles(user, queryset, accion).filter(**lookup).first()
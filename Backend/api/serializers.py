@@ -5,6 +5,8 @@ from .models import (
     Usuario,
     Mascota,
     Agenda,
+    PlantillaHorario,
+    ExcepcionHorario,
     Turno,
     Consulta,
     Producto,
@@ -39,6 +41,7 @@ class UsuarioSerializer(serializers.ModelSerializer):
     class Meta:
         model = Usuario
         fields = "__all__"
+        read_only_fields = ["token_version", "version_calendario"]
 
     def update(self, instance, validated_data):
 
@@ -83,10 +86,43 @@ class AgendaSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class PlantillaHorarioSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PlantillaHorario
+        fields = "__all__"
+
+    def validate(self, attrs):
+        inicio = attrs.get("hora_inicio", getattr(self.instance, "hora_inicio", None))
+        fin = attrs.get("hora_fin", getattr(self.instance, "hora_fin", None))
+        if inicio and fin and fin <= inicio:
+            raise serializers.ValidationError("hora_fin debe ser posterior a hora_inicio.")
+        duracion = attrs.get("duracion_turno")
+        if duracion is not None and duracion.total_seconds() <= 0:
+            raise serializers.ValidationError("duracion_turno debe ser mayor que cero.")
+        return attrs
+
+
+class ExcepcionHorarioSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ExcepcionHorario
+        fields = "__all__"
+
+    def validate(self, attrs):
+        inicio = attrs.get("fecha_inicio", getattr(self.instance, "fecha_inicio", None))
+        fin = attrs.get("fecha_fin", getattr(self.instance, "fecha_fin", None))
+        if inicio and fin and fin < inicio:
+            raise serializers.ValidationError("fecha_fin no puede ser anterior a fecha_inicio.")
+        return attrs
+
+
 class TurnoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Turno
         fields = "__all__"
+        read_only_fields = ["fecha_cancelacion_turno"]
+        # Sin el validador de DRF para turno_bloque_vigente_unico: comprobar
+        # antes del INSERT no evita la carrera; la resuelve el índice (409)
+        validators = []
 
 class TurnoConsultaSerializer(serializers.ModelSerializer):
     # Datos del cliente (dueño)
@@ -112,8 +148,9 @@ class TurnoConsultaSerializer(serializers.ModelSerializer):
         source="id_estado.descripcion_estado", read_only=True
     )
 
-    # Saber si ya tiene o no consulta
-    tiene_consulta = serializers.SerializerMethodField()
+    # Saber si ya tiene o no consulta: anotado con Exists en la vista
+    # (turnos_para_consulta), no una consulta por turno
+    tiene_consulta = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = Turno
@@ -137,15 +174,42 @@ class TurnoConsultaSerializer(serializers.ModelSerializer):
             "tiene_consulta",
         ]
 
-    def get_tiene_consulta(self, obj):
-        return obj.consultas.exists()
-
 
 
 class ConsultaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Consulta
-        fields = "__all__"
+        # busqueda (tsvector generado) es solo para buscar, no se expone
+        exclude = ["busqueda"]
+
+
+class HistoriaConsultaSerializer(serializers.ModelSerializer):
+    # Del turno y de su doctor: con select_related en la vista
+    # (historia_mascota, buscar_consultas), sin una consulta por fila
+    fecha_turno = serializers.DateField(source="id_turno.fecha_turno", read_only=True)
+    hora_turno = serializers.TimeField(source="id_turno.hora_turno", read_only=True)
+    id_mascota = serializers.IntegerField(source="id_turno.id_mascota_id", read_only=True)
+    mascota_nombre = serializers.CharField(source="id_turno.id_mascota.nombre_mascota", read_only=True)
+    doctor_nombre = serializers.CharField(source="id_turno.id_agenda.id_usuario.nombre", read_only=True)
+    doctor_apellido = serializers.CharField(source="id_turno.id_agenda.id_usuario.apellido", read_only=True)
+
+    class Meta:
+        model = Consulta
+        fields = [
+            "id_consulta",
+            "id_turno",
+            "fecha_turno",
+            "hora_turno",
+            "id_mascota",
+            "mascota_nombre",
+            "doctor_nombre",
+            "doctor_apellido",
+            "diagnostico_consulta",
+            "prescripcion_consulta",
+            "observacion_consulta",
+            "fecha_creacion_consulta",
+            "fecha_actualizacion_consulta",
+        ]
 
 class ProductoSerializer(serializers.ModelSerializer):
     id_usuario = serializers.PrimaryKeyRelatedField(read_only=True)
@@ -178,7 +242,7 @@ class ProductoSerializer(serializers.ModelSerializer):
         
         if imagen:
             producto.URL_imagen = imagen
-            producto.save(update_fields=["URL_imagen"])
+            producto.save(update_fields=["URL_imagen", "fecha_actualizacion_producto"])
         
         return producto
     
@@ -1,10 +1,15 @@
+from django.db.models import Exists, OuterRef, Prefetch
+
 from api.models import Actividad, DoctorActividad, Usuario, HistorialUsuario, Agenda, Estado
+from api.services.estado_service import estado_por_id
 
 def listar_actividades():
     return Actividad.objects.all()
 
 def crear_actividad(data, realizado_por=None):
-    estado_activo = Estado.objects.get(id_estado=1)
+    estado_activo = estado_por_id(1)
+    if estado_activo is None:
+        raise Estado.DoesNotExist("No existe el Estado 1 (Activo).")
 
     actividad = Actividad.objects.create(
         nombre_actividad=data.get("nombre"),
@@ -67,34 +72,33 @@ def limpiar_actividades_de_doctor(id_doctor):
 
 def obtener_doctores_por_actividad(id_actividad):
     """Obtener todos los doctores que tienen una actividad específica"""
-    # Obtener IDs de doctores que tienen esta actividad
-    doctores_ids = DoctorActividad.objects.filter(
-        actividad_id=id_actividad
-    ).values_list('doctor_id', flat=True)
-    
-    # Obtener los usuarios doctores (rol 1)
-    doctores = Usuario.objects.filter(
-        id_usuario__in=doctores_ids,
-        id_rol__id_rol=1  # Solo doctores (rol admin=1)
+    # Una sola consulta para los doctores (con Exists para la agenda)
+    # y otra para todas sus actividades: nada por doctor
+    doctores = (
+        Usuario.objects.filter(
+            actividades_asignadas__actividad_id=id_actividad,
+            id_rol__id_rol=1,  # Solo doctores (rol admin=1)
+        )
+        .annotate(tiene_agenda=Exists(Agenda.objects.filter(id_usuario=OuterRef("pk"))))
+        .prefetch_related(
+            Prefetch(
+                "actividades_asignadas",
+                queryset=DoctorActividad.objects.select_related("actividad"),
+            )
+        )
+        .distinct()
     )
-    
-    # Verificar si tienen agenda configurada
-    doctores_con_info = []
-    for doctor in doctores:
-        # Verificar si tiene agendas configuradas
-        tiene_agenda = Agenda.objects.filter(id_usuario=doctor).exists()
-        
-        # Obtener todas las actividades del doctor
-        actividades_doctor = DoctorActividad.objects.filter(doctor=doctor)
-        nombres_actividades = [da.actividad.nombre_actividad for da in actividades_doctor]
-        
-        doctores_con_info.append({
+
+    return [
+        {
             'id_usuario': doctor.id_usuario,
             'nombre': doctor.nombre,
             'apellido': doctor.apellido,
             'email': doctor.correo,
-            'tiene_agenda': tiene_agenda,
-            'especialidades': nombres_actividades
-        })
-    
-    return doctores_con_info
\ No newline at end of file
+            'tiene_agenda': doctor.tiene_agenda,
+            'especialidades': [
+                da.actividad.nombre_actividad for da in doctor.actividades_asignadas.all()
+            ],
+        }
+        for doctor in doctores
+    ]
\ No newline at end of file
@@ -0,0 +1,132 @@
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+
+from ..models import Agenda, DoctorActividad, Turno, Usuario
+from . import ocupacion_service
+from .replica_sync_service import marca_actualizacion
+
+
+def disponibilidad(
+    desde: date,
+    hasta: date,
+    doctores: Optional[Iterable[int]] = None,
+    id_actividad: Optional[int] = None,
+) -> Dict[str, Dict[str, List[dict]]]:
+    """
+    Bloques de agenda de varios doctores entre desde y hasta (incluidos),
+    en una sola consulta: {id_doctor: {dia: [{id_agenda, hora, ocupado}]}}.
+    Se filtra por la lista de doctores, por los doctores de una actividad
+    o por ambas. Sin instanciar modelos ni pasar por AgendaSerializer.
+    """
+    agendas = Agenda.objects.filter(dia_atencion__range=(desde, hasta))
+    if doctores is not None:
+        agendas = agendas.filter(id_usuario_id__in=list(doctores))
+    if id_actividad is not None:
+        agendas = agendas.filter(
+            id_usuario_id__in=DoctorActividad.objects.filter(actividad_id=id_actividad).values("doctor_id")
+        )
+
+    # Mismas columnas que turno_bloque_vigente_unico: lo resuelve el índice parcial
+    vigente = Turno.objects.filter(
+        id_agenda=OuterRef("pk"),
+        fecha_turno=OuterRef("dia_atencion"),
+        hora_turno=OuterRef("hora_atencion"),
+        fecha_cancelacion_turno__isnull=True,
+    )
+    filas = (
+        agendas.annotate(ocupado=Exists(vigente))
+        .order_by("id_usuario_id", "dia_atencion", "hora_atencion")
+        .values_list("id_usuario_id", "dia_atencion", "hora_atencion", "id_agenda", "ocupado")
+    )
+
+    resultado = {}
+    for id_doctor, dia, hora, id_agenda, ocupado in filas:
+        resultado.setdefault(str(id_doctor), {}).setdefault(dia.isoformat(), []).append(
+            {"id_agenda": id_agenda, "hora": hora.isoformat("minutes"), "ocupado": ocupado}
+        )
+    return resultado
+
+
+def borrar_sin_turnos(ids: List[int]) -> int:
+    """
+    Borra las agendas de `ids` que no tienen turnos (cancelados incluidos:
+    borrar la agenda borraría su historial) y devuelve cuántas borró.
+    Un DELETE en SQL: el Collector de Django cargaría fila a fila lo que
+    cuelga de cada agenda. El NOT EXISTS mira los turnos en el mismo
+    momento del borrado, así que una reserva hecha después de leer la
+    agenda tampoco se pierde (las FK de la BD no son CASCADE).
+    """
+    if not ids:
+        return 0
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {qn(Agenda._meta.db_table)} a WHERE a.id_agenda = ANY(%s) "
+            f"AND NOT EXISTS (SELECT 1 FROM {qn(Turno._meta.db_table)} t WHERE t.id_agenda = a.id_agenda)",
+            [list(ids)],
+        )
+        return cursor.rowcount
+
+
+@transaction.atomic
+def guardar_horarios(
+    id_doctor: int, dias: Dict[date, set], realizado_por: Optional[int] = None
+) -> Optional[List[Agenda]]:
+    """
+    Deja la agenda del doctor en cada día de `dias` ({dia: {time}}) con
+    exactamente esas horas: borra las que sobran, crea las que faltan y
+    marca quién actualizó las que se quedan. Todas quedan como guardadas a
+    mano (de_plantilla=False): materializar ya no las toca. Un número fijo
+    de consultas sea cual sea el número de días u horas. Las horas que sobran pero
+    tienen turnos no se borran y siguen en el resultado.
+    Devuelve las agendas finales de esos días ordenadas por día y hora,
+    o None si el doctor no existe.
+    """
+    # Bloquea al doctor: dos guardados a la vez no duplican bloques
+    if not Usuario.objects.select_for_update().filter(id_usuario=id_doctor).values_list("id_usuario", flat=True):
+        return None
+
+    existentes = (
+        Agenda.objects.filter(id_usuario_id=id_doctor, dia_atencion__in=list(dias))
+        .annotate(con_turnos=Exists(Turno.objects.filter(id_agenda=OuterRef("pk"))))
+        .values_list("id_agenda", "dia_atencion", "hora_atencion", "con_turnos")
+    )
+    vistos = set()
+    borrar, quedan = [], []
+    for id_agenda, dia, hora, con_turnos in existentes:
+        if hora in dias[dia] and (dia, hora) not in vistos:
+            vistos.add((dia, hora))
+            quedan.append(id_agenda)
+        elif not con_turnos:
+            borrar.append(id_agenda)
+
+    borrar_sin_turnos(borrar)
+
+    Agenda.objects.bulk_create(
+        Agenda(
+            id_usuario_id=id_doctor,
+            dia_atencion=dia,
+            hora_atencion=hora,
+            duracion_turno=timedelta(hours=1),
+            id_usuario_creacion_agenda=realizado_por,
+            id_usuario_actualizacion_agenda=realizado_por,
+        )
+        for dia, horas in dias.items()
+        for hora in sorted(horas)
+        if (dia, hora) not in vistos
+    )
+
+    if quedan:
+        Agenda.objects.filter(id_agenda__in=quedan).update(
+            de_plantilla=False, **marca_actualizacion(Agenda, realizado_por)
+        )
+
+    ocupacion_service.agenda_cambiada(id_doctor, dias)
+    return list(
+        Agenda.objects.filter(id_usuario_id=id_doctor, dia_atencion__in=list(dias)).order_by(
+            "dia_atencion", "hora_atencion"
+        )
+    )
@@ -0,0 +1,186 @@
+import datetime
+import hashlib
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Count, F, Max
+from django.utils import timezone
+
+from ..models import Agenda, Turno, Usuario
+from ..permissions import ROLES_DOCTOR
+
+SAL_TOKEN = "api.calendario"
+
+
+# ---------- TOKENS ----------
+def doctores():
+    """Usuarios que pueden tener feed: los roles con agenda (ROLES_DOCTOR)."""
+    return Usuario.objects.filter(id_rol_id__in=ROLES_DOCTOR)
+
+
+def firmar(doctor: Usuario) -> str:
+    """
+    Token de solo lectura para el .ics de un doctor (va en la URL del feed).
+    Lleva su version_calendario: revocar() la sube y anula los anteriores.
+    """
+    return signing.dumps([doctor.id_usuario, doctor.version_calendario], salt=SAL_TOKEN)
+
+
+def verificar(token: str) -> Optional[int]:
+    """
+    Id del doctor del token, o None si la firma no vale, caducó
+    (CALENDARIO_TOKEN_DIAS), se revocó o el usuario ya no es doctor.
+    """
+    try:
+        datos = signing.loads(
+            token, salt=SAL_TOKEN, max_age=datetime.timedelta(days=settings.CALENDARIO_TOKEN_DIAS)
+        )
+    except signing.BadSignature:
+        return None
+    if not (isinstance(datos, list) and len(datos) == 2 and all(isinstance(v, int) for v in datos)):
+        return None
+    id_doctor, version = datos
+    if not doctores().filter(id_usuario=id_doctor, version_calendario=version).exists():
+        return None
+    return id_doctor
+
+
+def revocar(id_doctor: int) -> None:
+    """Anula todas las URLs del feed emitidas hasta ahora para el doctor."""
+    Usuario.objects.filter(id_usuario=id_doctor).update(
+        version_calendario=F("version_calendario") + 1,
+        fecha_actualizacion_usuario=timezone.now(),
+    )
+
+
+# ---------- VENTANA Y VALIDADORES ----------
+def ventana(hoy: Optional[datetime.date] = None) -> Tuple[datetime.date, datetime.date]:
+    """Días que cubre el feed: de hoy - CALENDARIO_DIAS_ATRAS a hoy + CALENDARIO_DIAS_ADELANTE."""
+    hoy = hoy or timezone.localdate()
+    return (
+        hoy - datetime.timedelta(days=settings.CALENDARIO_DIAS_ATRAS),
+        hoy + datetime.timedelta(days=settings.CALENDARIO_DIAS_ADELANTE),
+    )
+
+
+def _agendas(id_doctor, desde, hasta):
+    return Agenda.objects.filter(id_usuario_id=id_doctor, dia_atencion__range=(desde, hasta))
+
+
+def validadores(id_doctor: int, desde: datetime.date, hasta: datetime.date):
+    """
+    (etag, última modificación) del feed con una sola consulta agregada por
+    agenda_doctor_dia_hora_idx, sin leer las filas: es lo único que cuesta
+    un 304. Los máximos de fecha_actualizacion_* ven altas y cambios; los
+    conteos, los borrados (que no dejan fecha). Mascota y cliente entran
+    para que un cambio de nombre también renueve el feed.
+    """
+    resumen = _agendas(id_doctor, desde, hasta).aggregate(
+        n_agendas=Count("id_agenda", distinct=True),
+        n_turnos=Count("turnos"),
+        ult_agenda=Max("fecha_actualizacion_agenda"),
+        ult_turno=Max("turnos__fecha_actualizacion_turno"),
+        ult_mascota=Max("turnos__id_mascota__fecha_actualizacion_mascota"),
+        ult_cliente=Max("turnos__id_usuario__fecha_actualizacion_usuario"),
+    )
+    fechas = [resumen[c] for c in ("ult_agenda", "ult_turno", "ult_mascota", "ult_cliente")]
+    modificado = max((f for f in fechas if f), default=None)
+
+    clave = "|".join(
+        str(v) for v in (id_doctor, desde, hasta, resumen["n_agendas"], resumen["n_turnos"], *fechas)
+    )
+    return f'"{hashlib.sha256(clave.encode()).hexdigest()[:32]}"', modificado
+
+
+# ---------- ICS ----------
+def _texto(valor) -> str:
+    """TEXT de RFC 5545: se escapan \\ ; , y los saltos de línea."""
+    return (
+        str(valor)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _plegar(linea: str) -> str:
+    """Corta las líneas de más de 75 octetos (RFC 5545 3.1) sin partir caracteres UTF-8."""
+    partes = []
+    actual, octetos = "", 0
+    for caracter in linea:
+        n = len(caracter.encode("utf-8"))
+        if octetos + n > 75:
+            partes.append(actual)
+            actual, octetos = " ", 1
+        actual += caracter
+        octetos += n
+    partes.append(actual)
+    return "\r\n".join(partes)
+
+
+def _utc(valor: datetime.datetime) -> str:
+    return valor.astimezone(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def generar(id_doctor: int, desde: datetime.date, hasta: datetime.date) -> str:
+    """
+    VCALENDAR con un VEVENT por bloque de Agenda del doctor en la ventana:
+    los reservados con mascota y cliente, los libres como TRANSPARENT
+    (no cuentan como ocupado). Las horas de la agenda son de la clínica
+    (CALENDARIO_ZONA_HORARIA) y se escriben en UTC, así no hace falta
+    VTIMEZONE. Dos consultas: bloques y turnos vigentes.
+    """
+    zona = ZoneInfo(settings.CALENDARIO_ZONA_HORARIA)
+    turnos = {
+        t.id_agenda_id: t
+        for t in Turno.objects.filter(
+            id_agenda__id_usuario_id=id_doctor,
+            id_agenda__dia_atencion__range=(desde, hasta),
+            fecha_cancelacion_turno__isnull=True,
+        ).select_related("id_mascota", "id_usuario")
+    }
+    ahora = timezone.now()
+
+    lineas = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//PozoVet//Agenda//ES",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        "X-WR-CALNAME:Agenda PozoVet",
+        f"REFRESH-INTERVAL;VALUE=DURATION:PT{settings.CALENDARIO_REFRESCO_MINUTOS}M",
+        f"X-PUBLISHED-TTL:PT{settings.CALENDARIO_REFRESCO_MINUTOS}M",
+    ]
+    for agenda in _agendas(id_doctor, desde, hasta).order_by("dia_atencion", "hora_atencion"):
+        inicio = datetime.datetime.combine(agenda.dia_atencion, agenda.hora_atencion, tzinfo=zona)
+        turno = turnos.get(agenda.id_agenda)
+        modificado = agenda.fecha_actualizacion_agenda or ahora
+        lineas += [
+            "BEGIN:VEVENT",
+            f"UID:agenda-{agenda.id_agenda}@pozovet",
+            f"DTSTART:{_utc(inicio)}",
+            f"DTEND:{_utc(inicio + agenda.duracion_turno)}",
+        ]
+        if turno is None:
+            lineas += ["SUMMARY:Libre", "TRANSP:TRANSPARENT"]
+        else:
+            mascota, cliente = turno.id_mascota, turno.id_usuario
+            if turno.fecha_actualizacion_turno and turno.fecha_actualizacion_turno > modificado:
+                modificado = turno.fecha_actualizacion_turno
+            lineas += [
+                "SUMMARY:" + _texto(f"Turno: {mascota.nombre_mascota} ({cliente.nombre} {cliente.apellido})"),
+                "DESCRIPTION:"
+                + _texto(
+                    f"Turno #{turno.id_turno}\nMascota: {mascota.nombre_mascota} ({mascota.especie})\n"
+                    f"Cliente: {cliente.nombre} {cliente.apellido}"
+                    + (f" - {cliente.telefono}" if cliente.telefono else "")
+                ),
+                "TRANSP:OPAQUE",
+            ]
+        lineas += [f"DTSTAMP:{_utc(modificado)}", "STATUS:CONFIRMED", "END:VEVENT"]
+    lineas.append("END:VCALENDAR")
+    return "\r\n".join(_plegar(linea) for linea in lineas) + "\r\n"
@@ -0,0 +1,107 @@
+import datetime
+import io
+
+from django.db import connection
+
+
+def copiar_salida(cursor, sql):
+    """COPY ... TO STDOUT -> bytes (psycopg2 o psycopg 3)."""
+    crudo = cursor.cursor
+    if hasattr(crudo, "copy_expert"):
+        buffer = io.BytesIO()
+        crudo.copy_expert(sql, buffer)
+        return buffer.getvalue()
+
+    partes = []
+    with crudo.copy(sql) as copy:
+        for bloque in copy:
+            partes.append(bytes(bloque))
+    return b"".join(partes)
+
+
+def copiar_entrada(cursor, sql, datos):
+    """COPY ... FROM STDIN desde bytes (psycopg2 o psycopg 3)."""
+    crudo = cursor.cursor
+    if hasattr(crudo, "copy_expert"):
+        crudo.copy_expert(sql, io.BytesIO(datos))
+        return
+
+    with crudo.copy(sql) as copy:
+        copy.write(datos)
+
+
+def texto_copy(valor):
+    """Valor Python -> campo del formato texto de COPY."""
+    tipo = type(valor)
+    if tipo is int:
+        return str(valor)
+    if valor is None:
+        return "\\N"
+    if tipo is str:
+        return (
+            valor.replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+        )
+    if tipo is bool:
+        return "t" if valor else "f"
+    if isinstance(valor, datetime.timedelta):
+        return f"{int(valor.total_seconds())} seconds"
+    if isinstance(valor, (datetime.date, datetime.time)):
+        return valor.isoformat()
+    return str(valor)
+
+
+class Copia:
+    """
+    Acumula filas de un modelo y las envía con COPY cada `lote` filas.
+    Las columnas que no se pasan toman el default del modelo (los
+    auto_now/auto_now_add, `ahora`); las de `omitir` ni se envían y las
+    rellena la base de datos (p. ej. la pk autoincremental).
+    """
+
+    def __init__(self, cursor, modelo, lote, ahora, omitir=()):
+        self.cursor = cursor
+        self.lote = lote
+        campos = [
+            f
+            for f in modelo._meta.concrete_fields
+            if not getattr(f, "generated", False) and f.attname not in omitir
+        ]
+        self.columnas = [f.attname for f in campos]
+        # Valores por defecto ya convertidos a texto: solo se convierte lo que llega
+        self.base = {}
+        for f in campos:
+            if getattr(f, "auto_now", False) or getattr(f, "auto_now_add", False):
+                valor = ahora
+            elif f.has_default():
+                valor = f.get_default()
+            else:
+                valor = None
+            self.base[f.attname] = texto_copy(valor)
+
+        qn = connection.ops.quote_name
+        lista = ", ".join(qn(f.column) for f in campos)
+        self.sql = f"COPY {qn(modelo._meta.db_table)} ({lista}) FROM STDIN"
+        self.lineas = []
+        self.filas = 0
+
+    def agregar(self, **valores):
+        self.agregar_texto(**{columna: texto_copy(valor) for columna, valor in valores.items()})
+
+    def agregar_texto(self, **textos):
+        """Como agregar, con los valores ya pasados por texto_copy (para reutilizarlos entre filas)."""
+        fila = dict(self.base)
+        fila.update(textos)
+        self.lineas.append("\t".join([fila[c] for c in self.columnas]))
+        if len(self.lineas) >= self.lote:
+            self.enviar()
+
+    def enviar(self):
+        if self.lineas:
+            datos = ("\n".join(self.lineas) + "\n").encode()
+            copiar_entrada(self.cursor, self.sql, datos)
+            self.filas += len(self.lineas)
+            self.lineas = []
+        return self.filas
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.db import connections
+
+
+def _estadisticas_alias(alias):
+    conexion = connections[alias]
+    pool = getattr(conexion, "pool", None) if settings.DB_POOL else None
+    if pool is None:
+        return {
+            "pool": False,
+            "conn_max_age": conexion.settings_dict.get("CONN_MAX_AGE"),
+            "health_checks": conexion.settings_dict.get("CONN_HEALTH_CHECKS"),
+        }
+
+    stats = pool.get_stats()
+    solicitudes = stats.get("requests_num", 0)
+    espera_ms = stats.get("requests_wait_ms", 0)
+    return {
+        "pool": True,
+        "min": stats.get("pool_min"),
+        "max": stats.get("pool_max"),
+        "abiertas": stats.get("pool_size", 0),
+        "libres": stats.get("pool_available", 0),
+        "en_uso": stats.get("pool_size", 0) - stats.get("pool_available", 0),
+        "esperando": stats.get("requests_waiting", 0),
+        "solicitudes": solicitudes,
+        "solicitudes_en_cola": stats.get("requests_queued", 0),
+        "espera_total_ms": espera_ms,
+        "espera_media_ms": round(espera_ms / solicitudes, 2) if solicitudes else 0.0,
+        "errores": stats.get("requests_errors", 0),
+        "conexiones_creadas": stats.get("connections_num", 0),
+        "conexiones_perdidas": stats.get("connections_lost", 0),
+    }
+
+
+def estadisticas_pool():
+    """Estado del pool de conexiones de cada base de datos en este worker."""
+    return {alias: _estadisticas_alias(alias) for alias in settings.DATABASES}
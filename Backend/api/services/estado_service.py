@@ -1,6 +1,105 @@
+import copy
+import threading
+import time
+import unicodedata
 from typing import List, Optional
+
+from django.conf import settings
+from django.db import transaction
+
 from ..models import Estado
 
+# Nombres que significan lo mismo (ya normalizados): los datos antiguos
+# tienen "Cancelado" y "Cancelada" según quién creó la fila
+SINONIMOS = (
+    ("cancelada", "cancelado"),
+    ("entregado", "entregada"),
+    ("atendido", "atendida"),
+)
+
+
+def normalizar(nombre: str) -> str:
+    """'  CANCELADÁ ' -> 'cancelada': sin espacios de más, sin tildes y en minúsculas."""
+    sin_tildes = unicodedata.normalize("NFKD", nombre or "").encode("ascii", "ignore").decode()
+    return " ".join(sin_tildes.split()).casefold()
+
+
+class _RegistroEstados:
+    """
+    Los Estados del proceso, leídos con una sola consulta la primera vez
+    que se piden: nombre normalizado (y sus sinónimos) -> Estado e
+    id -> Estado. Cualquier escritura de Estado lo vacía (señales en
+    ApiConfig.ready); otros workers lo ven al pasar ESTADOS_CACHE_TTL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_nombre = None
+        self._por_id = None
+        self._expira_en = 0.0
+        self._version = 0  # sube al invalidar: una carga que se cruza con eso no se guarda
+        self.cargas = 0
+
+    def _cargados(self):
+        with self._lock:
+            if self._por_nombre is not None and time.monotonic() < self._expira_en:
+                return self._por_nombre, self._por_id
+            version = self._version
+
+        por_nombre, por_id = {}, {}
+        for estado in Estado.objects.order_by("id_estado"):
+            por_id[estado.id_estado] = estado
+            # Con nombres repetidos gana el más antiguo (el que ya usaban los datos)
+            por_nombre.setdefault(normalizar(estado.descripcion_estado), estado)
+        for grupo in SINONIMOS:
+            estado = next((por_nombre[n] for n in grupo if n in por_nombre), None)
+            if estado is not None:
+                for n in grupo:
+                    por_nombre.setdefault(n, estado)
+
+        with self._lock:
+            if version != self._version:
+                return por_nombre, por_id
+            self._por_nombre, self._por_id = por_nombre, por_id
+            self._expira_en = time.monotonic() + getattr(settings, "ESTADOS_CACHE_TTL", 300)
+            self.cargas += 1
+        return por_nombre, por_id
+
+    def por_nombre(self, nombre: str) -> Optional[Estado]:
+        estado = self._cargados()[0].get(normalizar(nombre))
+        # Copia: quien la reciba puede asignarla a una FK sin tocar la del registro
+        return copy.copy(estado) if estado is not None else None
+
+    def por_id(self, id_estado: int) -> Optional[Estado]:
+        estado = self._cargados()[1].get(id_estado)
+        return copy.copy(estado) if estado is not None else None
+
+    def invalidar(self):
+        with self._lock:
+            self._version += 1
+            self._por_nombre = self._por_id = None
+
+
+registro = _RegistroEstados()
+
+
+def estado_por_nombre(nombre: str) -> Optional[Estado]:
+    """Estado por nombre, sin distinguir mayúsculas ni tildes y aceptando sinónimos."""
+    return registro.por_nombre(nombre)
+
+
+def estado_por_id(id_estado: int) -> Optional[Estado]:
+    return registro.por_id(id_estado)
+
+
+def invalidar_estados(**kwargs):
+    """
+    Vacía el registro ya y otra vez al hacer commit (para que nadie lo
+    vuelva a llenar con lo de antes del commit). Firma de receptor de señal.
+    """
+    registro.invalidar()
+    transaction.on_commit(registro.invalidar)
+
 
 def listar_estados() -> List[Estado]:
     return Estado.objects.all()
@@ -27,4 +126,3 @@ def actualizar_estado(estado: Estado, data: dict) -> Estado:
 
 def eliminar_estado(estado: Estado) -> None:
     estado.delete()
-
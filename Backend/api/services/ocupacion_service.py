@@ -0,0 +1,228 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from ..models import Agenda, Turno, Usuario
+from ..serializers import AgendaSerializer
+
+
+class _Dia:
+    """
+    Bloques de un doctor en un día: las filas ya serializadas (ordenadas por
+    hora) y un bitmap con los ocupados (bit i = fila i tiene turno vigente).
+    """
+
+    __slots__ = ("filas", "posiciones", "ocupados")
+
+    def __init__(self, filas, ocupados):
+        self.filas = tuple(filas)
+        self.posiciones = {f["id_agenda"]: i for i, f in enumerate(self.filas)}
+        self.ocupados = ocupados
+
+    def datos(self, con_ocupado=True):
+        if not con_ocupado:
+            return [dict(f) for f in self.filas]
+        return [{**f, "ocupado": bool(self.ocupados >> i & 1)} for i, f in enumerate(self.filas)]
+
+
+def _construir(id_doctor: int, dia: date) -> Optional[_Dia]:
+    """Lee de la BD los bloques del día y cuáles tienen turno vigente. None si el doctor no existe."""
+    if not Usuario.objects.filter(id_usuario=id_doctor).exists():
+        return None
+
+    # los cancelados liberan el bloque
+    vigente = Turno.objects.filter(
+        id_agenda=OuterRef("pk"),
+        fecha_turno=dia,
+        fecha_cancelacion_turno__isnull=True,
+    )
+    agendas = list(
+        Agenda.objects.filter(id_usuario_id=id_doctor, dia_atencion=dia)
+        .annotate(ocupado=Exists(vigente))
+        .order_by("hora_atencion")
+    )
+    ocupados = 0
+    for i, a in enumerate(agendas):
+        if a.ocupado:
+            ocupados |= 1 << i
+    return _Dia(AgendaSerializer(agendas, many=True).data, ocupados)
+
+
+class _Ocupacion:
+    """
+    Cache por proceso de la ocupación de la agenda por (doctor, día).
+    - TTL: cada entrada caduca a los OCUPACION_CACHE_TTL segundos
+    - LRU: como máximo OCUPACION_CACHE_MAX días
+    - Reservar/cancelar un turno cambia solo su bit; guardar la agenda de
+      un día descarta ese día. Siempre al hacer commit.
+    - Cada OCUPACION_VERIFICAR_CADA aciertos se vuelve a leer el día de la
+      BD y se compara: si no coincide, se corrige y se cuenta.
+    Cada worker tiene la suya: lo que cambia otro worker solo se ve al
+    caducar la entrada. No decide nada: la doble reserva la frena el índice
+    único de Turno y el front recarga la disponibilidad al recibir un 409.
+    """
+
+    def __init__(self):
+        self._dias = OrderedDict()  # (id_doctor, dia) -> (expira_en, _Dia)
+        self._agendas = {}  # id_agenda -> (id_doctor, dia), para reservar/cancelar
+        self._version = 0  # sube con cada cambio: una lectura que se cruza con uno no se guarda
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expiradas = 0
+        self.actualizaciones = 0
+        self.invalidaciones = 0
+        self.verificaciones = 0
+        self.inconsistencias = 0
+
+    @staticmethod
+    def _ttl():
+        return getattr(settings, "OCUPACION_CACHE_TTL", 30)
+
+    @staticmethod
+    def _max_entradas():
+        return getattr(settings, "OCUPACION_CACHE_MAX", 4096)
+
+    @staticmethod
+    def _verificar_cada():
+        return getattr(settings, "OCUPACION_VERIFICAR_CADA", 200)
+
+    def _quitar(self, clave):
+        entrada = self._dias.pop(clave, None)
+        if entrada is not None:
+            for id_agenda in entrada[1].posiciones:
+                self._agendas.pop(id_agenda, None)
+        return entrada
+
+    def _guardar(self, clave, dia, version):
+        with self._lock:
+            if version != self._version:
+                return
+            self._quitar(clave)
+            self._dias[clave] = (time.monotonic() + self._ttl(), dia)
+            for id_agenda in dia.posiciones:
+                self._agendas[id_agenda] = clave
+            while len(self._dias) > self._max_entradas():
+                self._quitar(next(iter(self._dias)))
+
+    def obtener(self, id_doctor: int, dia: date) -> Optional[_Dia]:
+        if self._ttl() <= 0:
+            return _construir(id_doctor, dia)
+
+        clave = (id_doctor, dia)
+        ahora = time.monotonic()
+        verificar = False
+        with self._lock:
+            entrada = self._dias.get(clave)
+            if entrada is not None and entrada[0] <= ahora:
+                self._quitar(clave)
+                self.expiradas += 1
+                entrada = None
+
+            if entrada is not None:
+                self._dias.move_to_end(clave)
+                self.hits += 1
+                cada = self._verificar_cada()
+                verificar = cada > 0 and self.hits % cada == 0
+                if not verificar:
+                    return entrada[1]
+            else:
+                self.misses += 1
+            version = self._version
+
+        nuevo = _construir(id_doctor, dia)
+        if verificar:
+            with self._lock:
+                self.verificaciones += 1
+                if nuevo is None or nuevo.filas != entrada[1].filas or nuevo.ocupados != entrada[1].ocupados:
+                    self.inconsistencias += 1
+        if nuevo is not None:
+            self._guardar(clave, nuevo, version)
+        return nuevo
+
+    def marcar(self, id_agenda: int, ocupado: bool):
+        with self._lock:
+            self._version += 1
+            clave = self._agendas.get(id_agenda)
+            if clave is None:
+                return
+            dia = self._dias[clave][1]
+            bit = 1 << dia.posiciones[id_agenda]
+            dia.ocupados = dia.ocupados | bit if ocupado else dia.ocupados & ~bit
+            self.actualizaciones += 1
+
+    def invalidar(self, claves: Iterable[tuple] = None, doctores: Iterable[int] = None):
+        with self._lock:
+            self._version += 1
+            claves = set(claves or ())
+            doctores = set(doctores or ())
+            if doctores:
+                claves.update(c for c in self._dias if c[0] in doctores)
+            for clave in claves:
+                if self._quitar(clave) is not None:
+                    self.invalidaciones += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._version += 1
+            self._dias.clear()
+            self._agendas.clear()
+            self.hits = self.misses = self.expiradas = self.actualizaciones = 0
+            self.invalidaciones = self.verificaciones = self.inconsistencias = 0
+
+    def estadisticas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entradas": len(self._dias),
+                "bloques": len(self._agendas),
+                "max_entradas": self._max_entradas(),
+                "ttl_segundos": self._ttl(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expiradas": self.expiradas,
+                "actualizaciones": self.actualizaciones,
+                "invalidaciones": self.invalidaciones,
+                "verificaciones": self.verificaciones,
+                "inconsistencias": self.inconsistencias,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+ocupacion = _Ocupacion()
+
+
+def bloques_del_dia(id_doctor: int, dia: date, con_ocupado: bool = True) -> Optional[List[dict]]:
+    """Agendas del doctor ese día (AgendaSerializer + 'ocupado'). None si el doctor no existe."""
+    entrada = ocupacion.obtener(id_doctor, dia)
+    return entrada.datos(con_ocupado) if entrada is not None else None
+
+
+# Los avisos se aplican al hacer commit: si la transacción se deshace la
+# cache no se entera, y nadie ve antes de tiempo un cambio sin confirmar
+def turno_reservado(id_agenda: int):
+    transaction.on_commit(lambda: ocupacion.marcar(id_agenda, True))
+
+
+def turno_cancelado(id_agenda: int):
+    transaction.on_commit(lambda: ocupacion.marcar(id_agenda, False))
+
+
+def agenda_cambiada(id_doctor: int, dias: Iterable[date]):
+    claves = [(id_doctor, d) for d in dias]
+    transaction.on_commit(lambda: ocupacion.invalidar(claves=claves))
+
+
+def doctores_cambiados(doctores: Iterable[int]):
+    doctores = list(doctores)
+    transaction.on_commit(lambda: ocupacion.invalidar(doctores=doctores))
+
+
+def estadisticas_ocupacion():
+    return ocupacion.estadisticas()
@@ -0,0 +1,179 @@
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, check_password
+
+
+class HashingSaturado(Exception):
+    """
+    El pool de hashing no admite más trabajo (cola llena o timeout).
+    Los controllers lo traducen a 503 para no bloquear al worker.
+    """
+
+
+def _inicializar_worker(settings_module):
+    # Los procesos del pool arrancan con "spawn": configuramos Django
+    # para que make_password/check_password usen los mismos hashers
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    import django
+    django.setup()
+
+
+def _hashear(contrasena):
+    return make_password(contrasena)
+
+
+def _verificar(contrasena, encriptada):
+    return check_password(contrasena, encriptada)
+
+
+class _PoolHashing:
+    """
+    Pool de procesos de tamaño fijo para el PBKDF2 de login/registro.
+    - PASSWORD_HASH_WORKERS: procesos del pool (0 = hashear en el propio hilo)
+    - PASSWORD_HASH_MAX_PENDIENTES: trabajos en cola + en curso por proceso
+      web; por encima se rechaza con HashingSaturado (fail fast)
+    - PASSWORD_HASH_TIMEOUT: segundos máximos esperando un resultado
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.pendientes = 0
+        self.max_pendientes_visto = 0
+        self.completados = 0
+        self.rechazados = 0
+        self.timeouts = 0
+        self.latencia_total = 0.0
+        self.latencia_max = 0.0
+        self._latencias = deque(maxlen=1024)
+
+    @staticmethod
+    def _workers():
+        return getattr(settings, "PASSWORD_HASH_WORKERS", 2)
+
+    @staticmethod
+    def _max_pendientes():
+        return getattr(settings, "PASSWORD_HASH_MAX_PENDIENTES", 16)
+
+    @staticmethod
+    def _timeout():
+        return getattr(settings, "PASSWORD_HASH_TIMEOUT", 10)
+
+    def _obtener_executor(self):
+        # Se crea bajo demanda y se recrea si el proceso fue forkeado
+        # (gunicorn --preload) o si un worker del pool murió
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._workers(),
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_inicializar_worker,
+                    initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings"),),
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _descartar_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _registrar_latencia(self, segundos):
+        with self._lock:
+            self.completados += 1
+            self.latencia_total += segundos
+            self.latencia_max = max(self.latencia_max, segundos)
+            self._latencias.append(segundos)
+
+    def ejecutar(self, funcion, *args):
+        if self._workers() <= 0:
+            inicio = time.monotonic()
+            resultado = funcion(*args)
+            self._registrar_latencia(time.monotonic() - inicio)
+            return resultado
+
+        with self._lock:
+            if self.pendientes >= self._max_pendientes():
+                self.rechazados += 1
+                raise HashingSaturado("Servicio de autenticación saturado")
+            self.pendientes += 1
+            self.max_pendientes_visto = max(self.max_pendientes_visto, self.pendientes)
+
+        inicio = time.monotonic()
+        try:
+            executor = self._obtener_executor()
+            try:
+                futuro = executor.submit(funcion, *args)
+                resultado = futuro.result(timeout=self._timeout())
+            except BrokenProcessPool:
+                self._descartar_executor(executor)
+                raise HashingSaturado("Servicio de autenticación no disponible")
+            except FuturesTimeoutError:
+                futuro.cancel()
+                with self._lock:
+                    self.timeouts += 1
+                raise HashingSaturado("Servicio de autenticación saturado")
+        finally:
+            with self._lock:
+                self.pendientes -= 1
+
+        self._registrar_latencia(time.monotonic() - inicio)
+        return resultado
+
+    def cerrar(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def estadisticas(self):
+        with self._lock:
+            latencias = sorted(self._latencias)
+            completados = self.completados
+
+            def percentil(p):
+                if not latencias:
+                    return 0.0
+                return round(latencias[min(len(latencias) - 1, int(len(latencias) * p))] * 1000, 2)
+
+            return {
+                "workers": self._workers(),
+                "max_pendientes": self._max_pendientes(),
+                "pendientes": self.pendientes,
+                "max_pendientes_visto": self.max_pendientes_visto,
+                "completados": completados,
+                "rechazados": self.rechazados,
+                "timeouts": self.timeouts,
+                "latencia_media_ms": round(self.latencia_total / completados * 1000, 2) if completados else 0.0,
+                "latencia_p50_ms": percentil(0.50),
+                "latencia_p95_ms": percentil(0.95),
+                "latencia_max_ms": round(self.latencia_max * 1000, 2),
+            }
+
+
+pool_hashing = _PoolHashing()
+atexit.register(pool_hashing.cerrar)
+
+
+def hashear(contrasena: str) -> str:
+    """make_password() ejecutado en el pool. Lanza HashingSaturado."""
+    return pool_hashing.ejecutar(_hashear, contrasena)
+
+
+def verificar(contrasena: str, encriptada: str) -> bool:
+    """check_password() ejecutado en el pool. Lanza HashingSaturado."""
+    return pool_hashing.ejecutar(_verificar, contrasena, encriptada)
+
+
+def estadisticas_hashing():
+    return pool_hashing.estadisticas()
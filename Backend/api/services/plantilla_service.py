@@ -0,0 +1,217 @@
+import datetime
+from typing import Dict, Iterable, List, Optional
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from ..models import Agenda, ExcepcionHorario, PlantillaHorario, Turno, Usuario
+from .agenda_service import borrar_sin_turnos
+from .copy_service import Copia, texto_copy
+from .replica_sync_service import marca_actualizacion
+from . import ocupacion_service
+
+LOTE_COPY = 10000
+
+
+# ---------- PLANTILLAS ----------
+def listar_plantillas(id_doctor: Optional[int] = None) -> List[PlantillaHorario]:
+    plantillas = PlantillaHorario.objects.all()
+    if id_doctor is not None:
+        plantillas = plantillas.filter(id_usuario_id=id_doctor)
+    return plantillas
+
+
+def obtener_plantilla_por_id(id_plantilla: int) -> Optional[PlantillaHorario]:
+    try:
+        return PlantillaHorario.objects.get(pk=id_plantilla)
+    except PlantillaHorario.DoesNotExist:
+        return None
+
+
+def crear_plantilla(data: dict) -> PlantillaHorario:
+    return PlantillaHorario.objects.create(**data)
+
+
+def eliminar_plantilla(plantilla: PlantillaHorario) -> None:
+    plantilla.delete()
+
+
+# ---------- EXCEPCIONES ----------
+def listar_excepciones(id_doctor: Optional[int] = None) -> List[ExcepcionHorario]:
+    excepciones = ExcepcionHorario.objects.all()
+    if id_doctor is not None:
+        # Las de toda la clínica también le afectan
+        excepciones = excepciones.filter(Q(id_usuario_id=id_doctor) | Q(id_usuario__isnull=True))
+    return excepciones
+
+
+def obtener_excepcion_por_id(id_excepcion: int) -> Optional[ExcepcionHorario]:
+    try:
+        return ExcepcionHorario.objects.get(pk=id_excepcion)
+    except ExcepcionHorario.DoesNotExist:
+        return None
+
+
+def crear_excepcion(data: dict) -> ExcepcionHorario:
+    return ExcepcionHorario.objects.create(**data)
+
+
+def eliminar_excepcion(excepcion: ExcepcionHorario) -> None:
+    excepcion.delete()
+
+
+# ---------- MATERIALIZACIÓN ----------
+def _bloques(inicio: datetime.time, fin: datetime.time, duracion: datetime.timedelta):
+    """Horas de inicio de los bloques que caben enteros entre inicio y fin."""
+    base = datetime.date.min
+    actual = datetime.datetime.combine(base, inicio)
+    limite = datetime.datetime.combine(base, fin)
+    while actual + duracion <= limite:
+        yield actual.time()
+        actual += duracion
+
+
+def _dias_cerrados(desde, hasta, doctores) -> Dict[Optional[int], set]:
+    """{id_doctor | None (toda la clínica): días sin atención dentro del rango}."""
+    cerrados = {}
+    for id_doctor, inicio, fin in ExcepcionHorario.objects.filter(
+        Q(id_usuario_id__in=doctores) | Q(id_usuario__isnull=True),
+        fecha_inicio__lte=hasta,
+        fecha_fin__gte=desde,
+    ).values_list("id_usuario_id", "fecha_inicio", "fecha_fin"):
+        dias = cerrados.setdefault(id_doctor, set())
+        dia = max(inicio, desde)
+        while dia <= min(fin, hasta):
+            dias.add(dia)
+            dia += datetime.timedelta(days=1)
+    return cerrados
+
+
+@transaction.atomic
+def materializar(
+    desde: datetime.date,
+    hasta: datetime.date,
+    doctores: Optional[Iterable[int]] = None,
+    realizado_por: Optional[int] = None,
+) -> dict:
+    """
+    Deja la Agenda de desde a hasta (incluidos) igual a lo que dicen las
+    plantillas menos las excepciones, para los doctores con plantilla
+    (o solo los de `doctores`). Idempotente: una segunda pasada no cambia nada.
+    - Crea con COPY los bloques que faltan (de_plantilla=True).
+    - Borra con un solo DELETE los de_plantilla que sobran, salvo los que
+      tienen turnos (cancelados incluidos: borrar la agenda borraría su
+      historial).
+    - Ajusta duracion_turno de los de_plantilla con otra duración.
+    - Los bloques guardados a mano no se borran ni se cambian ("manuales"):
+      si coinciden con la plantilla, cuentan como ya creados.
+    Quien llama valida que desde no sea un día pasado.
+    Todo en una transacción y con los doctores bloqueados: dos pasadas a la
+    vez sobre el mismo doctor no duplican bloques.
+    """
+    plantillas = PlantillaHorario.objects.all()
+    if doctores is not None:
+        plantillas = plantillas.filter(id_usuario_id__in=list(doctores))
+
+    semana = {}  # id_doctor -> dia_semana -> {hora: duracion}
+    for id_doctor, dia_semana, inicio, fin, duracion in plantillas.values_list(
+        "id_usuario_id", "dia_semana", "hora_inicio", "hora_fin", "duracion_turno"
+    ):
+        horas = semana.setdefault(id_doctor, {}).setdefault(dia_semana, {})
+        for hora in _bloques(inicio, fin, duracion):
+            horas[hora] = duracion
+
+    resultado = {
+        "doctores": len(semana), "creados": 0, "borrados": 0, "actualizados": 0, "conservados": 0, "manuales": 0,
+    }
+    if not semana:
+        return resultado
+
+    # Bloquea los doctores (orden fijo para no cruzarse con otra pasada)
+    list(
+        Usuario.objects.select_for_update()
+        .filter(id_usuario__in=semana)
+        .order_by("id_usuario")
+        .values_list("id_usuario", flat=True)
+    )
+
+    cerrados = _dias_cerrados(desde, hasta, list(semana))
+    cerrados_clinica = cerrados.get(None, set())
+
+    deseados = {}  # (id_doctor, dia, hora) -> duracion
+    dia = desde
+    while dia <= hasta:
+        if dia not in cerrados_clinica:
+            for id_doctor, dias_semana in semana.items():
+                if dia in cerrados.get(id_doctor, ()):
+                    continue
+                for hora, duracion in dias_semana.get(dia.weekday(), {}).items():
+                    deseados[(id_doctor, dia, hora)] = duracion
+        dia += datetime.timedelta(days=1)
+
+    existentes = (
+        Agenda.objects.filter(id_usuario_id__in=semana, dia_atencion__range=(desde, hasta))
+        .annotate(con_turnos=Exists(Turno.objects.filter(id_agenda=OuterRef("pk"))))
+        .order_by("id_agenda")
+        .values_list(
+            "id_agenda", "id_usuario_id", "dia_atencion", "hora_atencion", "duracion_turno",
+            "de_plantilla", "con_turnos",
+        )
+    )
+    vistos = set()
+    borrar = []
+    actualizar = {}  # duracion -> [id_agenda]
+    for id_agenda, id_doctor, dia, hora, duracion, de_plantilla, con_turnos in existentes:
+        clave = (id_doctor, dia, hora)
+        if clave in deseados and clave not in vistos:
+            vistos.add(clave)
+            if de_plantilla and duracion != deseados[clave]:
+                actualizar.setdefault(deseados[clave], []).append(id_agenda)
+        elif not de_plantilla:
+            resultado["manuales"] += 1
+        elif con_turnos:
+            vistos.add(clave)
+            resultado["conservados"] += 1
+        else:
+            borrar.append(id_agenda)
+
+    ahora = timezone.now()
+    texto = {}  # días, horas y doctores se repiten: se pasan a texto una sola vez
+
+    def t(valor):
+        if valor not in texto:
+            texto[valor] = texto_copy(valor)
+        return texto[valor]
+
+    with connection.cursor() as cursor:
+        if borrar:
+            resultado["borrados"] = borrar_sin_turnos(borrar)
+            resultado["conservados"] += len(borrar) - resultado["borrados"]
+
+        for duracion, ids in actualizar.items():
+            resultado["actualizados"] += Agenda.objects.filter(id_agenda__in=ids).update(
+                duracion_turno=duracion,
+                **marca_actualizacion(Agenda, realizado_por, ahora),
+            )
+
+        # COPY en vez de bulk_create: con un año de agenda (decenas de miles de
+        # filas) lo que pesa es preparar cada instancia del modelo, no el INSERT
+        nuevas = Copia(cursor, Agenda, LOTE_COPY, ahora, omitir=("id_agenda",))
+        autor = t(realizado_por)
+        for clave, duracion in deseados.items():
+            if clave in vistos:
+                continue
+            id_doctor, dia, hora = clave
+            nuevas.agregar_texto(
+                id_usuario_id=t(id_doctor),
+                dia_atencion=t(dia),
+                hora_atencion=t(hora),
+                duracion_turno=t(duracion),
+                de_plantilla=t(True),
+                id_usuario_creacion_agenda=autor,
+                id_usuario_actualizacion_agenda=autor,
+            )
+        resultado["creados"] = nuevas.enviar()
+    ocupacion_service.doctores_cambiados(semana)
+    return resultado
@@ -1,8 +1,26 @@
+from django.db.models import Q
+
 from ..models import Producto
 
-def productos_publicos():
+def productos_publicos(q: str = "", categoria: str = ""):
     # ✅ Público (usuarios logueados): ver TODOS, incluso stock 0 (para que se vea “Agotado”)
-    return Producto.objects.all().order_by("-fecha_creacion_producto")
+    # La búsqueda y la categoría se filtran aquí, antes de paginar, para que
+    # la tienda no tenga que bajar el catálogo entero para buscar
+    qs = Producto.objects.all().order_by("-fecha_creacion_producto")
+    if q:
+        qs = qs.filter(Q(nombre_producto__icontains=q) | Q(descripcion_producto__icontains=q))
+    if categoria:
+        qs = qs.filter(categoria_producto=categoria)
+    return qs
+
+def categorias_productos():
+    # Categorías distintas para el filtro de la tienda
+    return list(
+        Producto.objects.exclude(categoria_producto="")
+        .order_by("categoria_producto")
+        .values_list("categoria_producto", flat=True)
+        .distinct()
+    )
 
 def productos_admin():
     # ✅ Admin/Recepcionista: ver TODOS
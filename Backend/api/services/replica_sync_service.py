@@ -0,0 +1,280 @@
+import datetime
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from ..db_router import REPLICA, replica_configurada
+from .copy_service import copiar_salida, copiar_entrada
+from ..models import (
+    Estado,
+    Rol,
+    Usuario,
+    HistorialUsuario,
+    Mascota,
+    Agenda,
+    PlantillaHorario,
+    ExcepcionHorario,
+    Turno,
+    HistorialTurno,
+    Consulta,
+    Producto,
+    Compra,
+    Detalle_compra,
+    Actividad,
+    DoctorActividad,
+    Reserva,
+    DetalleReserva,
+    ReplicaBorrado,
+    ReplicaSync,
+)
+
+# Modelo -> columna que cambia en cada INSERT/UPDATE (auto_now / auto_now_add).
+# Toda escritura con update_fields o QuerySet.update() debe tocarla también
+# (para update(), con marca_actualizacion).
+# Las tablas nuevas necesitan además su trigger replica_borrado (ver 0013).
+# Cada pasada filtra por esa columna: en las tablas que crecen con el uso
+# tiene que estar indexada (ver 0022), si no es un Seq Scan en cada --loop.
+TABLAS = (
+    (Estado, "fecha_actualizacion_estado"),
+    (Rol, "fecha_actualizacion_rol"),
+    (Usuario, "fecha_actualizacion_usuario"),
+    (HistorialUsuario, "fecha"),
+    (Mascota, "fecha_actualizacion_mascota"),
+    (Agenda, "fecha_actualizacion_agenda"),
+    (PlantillaHorario, "fecha_actualizacion_plantilla"),
+    (ExcepcionHorario, "fecha_actualizacion_excepcion"),
+    (Turno, "fecha_actualizacion_turno"),
+    (HistorialTurno, "fecha"),
+    (Consulta, "fecha_actualizacion_consulta"),
+    (Producto, "fecha_actualizacion_producto"),
+    (Compra, "fecha_actualizacion_compra"),
+    (Detalle_compra, "fecha_actualizacion_detallecompra"),
+    (Actividad, "fecha_actualizacion"),
+    (DoctorActividad, "fecha_asignacion"),
+    (Reserva, "fecha_actualizacion"),
+    (DetalleReserva, "fecha_actualizacion"),
+)
+
+_COLUMNA_MARCA = dict(TABLAS)
+
+MARCA_BORRADOS = ReplicaBorrado._meta.db_table
+
+
+def marca_actualizacion(modelo, realizado_por, ahora=None) -> dict:
+    """
+    Campos a pasar a QuerySet.update() sobre `modelo`: su columna de TABLAS
+    (update() no aplica auto_now y sin ella la fila no llega a la réplica)
+    y el usuario de auditoría id_usuario_actualizacion_*.
+    """
+    columna = _COLUMNA_MARCA[modelo]
+    return {
+        columna: ahora or timezone.now(),
+        columna.replace("fecha_", "id_usuario_", 1): realizado_por,
+    }
+
+
+class ReplicaNoConfigurada(Exception):
+    """No hay alias 'replica' en DATABASES (falta DB_REPLICA_HOST)."""
+
+
+def _margen():
+    # Solape de cada pasada: cubre transacciones que hacen commit
+    # después de la marca con fechas anteriores a ella
+    return datetime.timedelta(seconds=getattr(settings, "REPLICA_SYNC_MARGEN", 60))
+
+
+def _qn(nombre):
+    return connections["default"].ops.quote_name(nombre)
+
+
+def _columnas(modelo):
+    # Las columnas generadas (GENERATED ALWAYS) no se pueden insertar:
+    # la réplica las recalcula sola
+    return [
+        f.column
+        for f in modelo._meta.concrete_fields
+        if not getattr(f, "generated", False)
+    ]
+
+
+def _sincronizar_tabla(cur_pri, cur_rep, modelo, columna_marca, desde, lote):
+    """
+    Copia de la primaria a la réplica las filas con columna_marca >= desde
+    (todas si desde es None), en lotes de `lote` filas por clave primaria.
+    Devuelve (filas, bytes).
+    """
+    componer = connections["default"].ops.compose_sql
+    tabla = _qn(modelo._meta.db_table)
+    pk = _qn(modelo._meta.pk.column)
+    columnas = _columnas(modelo)
+    lista = ", ".join(_qn(c) for c in columnas)
+    temporal = _qn(f"_sync_{modelo._meta.db_table.lower()}")
+
+    cur_rep.execute(
+        f"CREATE TEMP TABLE {temporal} (LIKE {tabla}) ON COMMIT DROP"
+    )
+
+    actualizar = ", ".join(
+        f"{_qn(c)} = EXCLUDED.{_qn(c)}" for c in columnas if c != modelo._meta.pk.column
+    )
+    # En orden de pk: un turno cancelado (pk menor) libera su bloque en la
+    # réplica antes de que llegue el que lo ocupa ahora, y el índice único
+    # parcial de Turno no salta a mitad del lote
+    upsert = (
+        f"INSERT INTO {tabla} ({lista}) SELECT {lista} FROM {temporal} ORDER BY {pk} "
+        f"ON CONFLICT ({pk}) "
+        + (f"DO UPDATE SET {actualizar}" if actualizar else "DO NOTHING")
+    )
+
+    filas = 0
+    total_bytes = 0
+    ultimo = None
+    while True:
+        condiciones = []
+        params = []
+        if desde is not None:
+            condiciones.append(f"{_qn(columna_marca)} >= %s")
+            params.append(desde)
+        if ultimo is not None:
+            condiciones.append(f"{pk} > %s")
+            params.append(ultimo)
+        where = " AND ".join(condiciones) or "TRUE"
+
+        # Límite superior del lote (keyset por pk, sin OFFSET creciente)
+        cur_pri.execute(
+            f"SELECT {pk} FROM {tabla} WHERE {where} ORDER BY {pk} OFFSET %s LIMIT 1",
+            params + [lote - 1],
+        )
+        fila = cur_pri.fetchone()
+        tope = fila[0] if fila else None
+
+        params_lote = list(params)
+        where_lote = where
+        if tope is not None:
+            where_lote += f" AND {pk} <= %s"
+            params_lote.append(tope)
+
+        datos = copiar_salida(
+            cur_pri,
+            componer(
+                f"COPY (SELECT {lista} FROM {tabla} WHERE {where_lote}) TO STDOUT",
+                params_lote,
+            ),
+        )
+        if datos:
+            cur_rep.execute(f"TRUNCATE {temporal}")
+            copiar_entrada(cur_rep, f"COPY {temporal} ({lista}) FROM STDIN", datos)
+            cur_rep.execute(upsert)
+            filas += cur_rep.rowcount
+            total_bytes += len(datos)
+
+        if tope is None:
+            break
+        ultimo = tope
+
+    return filas, total_bytes
+
+
+def _aplicar_borrados(cur_pri, cur_rep, desde):
+    """Borra en la réplica las filas registradas en ReplicaBorrado desde `desde`."""
+    sql = f"SELECT tabla, id_fila FROM {_qn(MARCA_BORRADOS)}"
+    params = []
+    if desde is not None:
+        sql += " WHERE fecha >= %s"
+        params.append(desde)
+    cur_pri.execute(sql, params)
+
+    por_tabla = {}
+    for tabla, id_fila in cur_pri.fetchall():
+        por_tabla.setdefault(tabla, set()).add(id_fila)
+
+    pks = {m._meta.db_table: m._meta.pk.column for m, _ in TABLAS}
+    borradas = {}
+    for tabla, ids in por_tabla.items():
+        if tabla not in pks:
+            continue
+        cur_rep.execute(
+            f"DELETE FROM {_qn(tabla)} WHERE {_qn(pks[tabla])} = ANY(%s)",
+            [sorted(ids)],
+        )
+        borradas[tabla] = cur_rep.rowcount
+    return borradas
+
+
+def sincronizar(lote=None, completo=False):
+    """
+    Una pasada de sincronización primaria -> réplica.
+    - Lee la primaria en una sola transacción REPEATABLE READ (foto
+      coherente de todas las tablas) y toma su now() como nueva marca.
+    - Escribe la réplica en una sola transacción: los lectores ven la
+      versión anterior completa hasta el commit (las FK de Django son
+      DEFERRABLE, el orden de las tablas no importa).
+    - Sin marcas previas (o con completo=True) vacía y copia todo.
+    Devuelve una lista de dicts con filas/borradas/bytes por tabla.
+    """
+    if not replica_configurada():
+        raise ReplicaNoConfigurada("No hay base de datos 'replica' configurada (DB_REPLICA_HOST)")
+
+    lote = lote or getattr(settings, "REPLICA_SYNC_LOTE", 5000)
+    tablas = [m._meta.db_table for m, _ in TABLAS]
+
+    with transaction.atomic(using="default"), transaction.atomic(using=REPLICA):
+        with connections["default"].cursor() as cur_pri, connections[REPLICA].cursor() as cur_rep:
+            cur_pri.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+            cur_pri.execute("SELECT now()")
+            marca = cur_pri.fetchone()[0]
+
+            marcas = dict(
+                ReplicaSync.objects.using(REPLICA)
+                .filter(tabla__in=tablas + [MARCA_BORRADOS])
+                .values_list("tabla", "marca")
+            )
+            completo = completo or any(t not in marcas for t in tablas)
+
+            if completo:
+                # CASCADE solo alcanza a tablas que no se copian (RefreshToken)
+                cur_rep.execute(
+                    "TRUNCATE " + ", ".join(_qn(t) for t in tablas) + " CASCADE"
+                )
+                borradas = {}
+            else:
+                desde_borrados = marcas.get(MARCA_BORRADOS)
+                borradas = _aplicar_borrados(
+                    cur_pri, cur_rep, desde_borrados - _margen() if desde_borrados else None
+                )
+
+            informe = []
+            for modelo, columna in TABLAS:
+                tabla = modelo._meta.db_table
+                desde = None if completo else marcas[tabla] - _margen()
+                filas, total_bytes = _sincronizar_tabla(
+                    cur_pri, cur_rep, modelo, columna, desde, lote
+                )
+                informe.append(
+                    {
+                        "tabla": tabla,
+                        "filas": filas,
+                        "borradas": borradas.get(tabla, 0),
+                        "bytes": total_bytes,
+                        "completa": completo,
+                    }
+                )
+
+        for fila in informe + [{"tabla": MARCA_BORRADOS, "filas": 0, "bytes": 0}]:
+            ReplicaSync.objects.using(REPLICA).update_or_create(
+                tabla=fila["tabla"],
+                defaults={"marca": marca, "filas": fila["filas"], "bytes": fila["bytes"]},
+            )
+
+    _purgar_borrados(marca)
+    return informe
+
+
+def _purgar_borrados(marca):
+    """Quita de la primaria los borrados que ya no hacen falta."""
+    dias = getattr(settings, "REPLICA_BORRADOS_RETENCION_DIAS", 7)
+    return ReplicaBorrado.objects.filter(
+        fecha__lt=marca - datetime.timedelta(days=dias)
+    ).delete()[0]
+
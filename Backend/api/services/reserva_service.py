@@ -2,46 +2,23 @@ from decimal import Decimal
 from django.db import transaction
 from django.db.utils import IntegrityError
 
-from ..models import Reserva, DetalleReserva, Producto, Estado
-
-ROLE_ADMIN = 1
-ROLE_RECEPCIONISTA = 3
-
-
-def es_admin(user):
-    return getattr(user, "id_rol", None) and user.id_rol.id_rol == ROLE_ADMIN
-
-
-def es_gestor_reservas(user):
-    """
-    Permisos tipo 'admin' SOLO para RESERVAS/FACTURAS:
-    Admin (1) y Recepcionista (3)
-    """
-    return (
-        getattr(user, "id_rol", None)
-        and user.id_rol.id_rol in (ROLE_ADMIN, ROLE_RECEPCIONISTA)
-    )
-
-
-def _get_estado_por_nombre(nombre: str):
-    return Estado.objects.filter(descripcion_estado__iexact=nombre).first()
+from ..models import Reserva, DetalleReserva, Producto
+from ..permissions import es_gestor_reservas
+from .estado_service import estado_por_id, estado_por_nombre
 
 
+# Desde el registro de Estados: sin consultas (mayúsculas, tildes y
+# Cancelada/Cancelado ya los resuelve el registro)
 def _estado_pendiente():
-    return _get_estado_por_nombre("Pendiente") or _get_estado_por_nombre("PENDIENTE")
+    return estado_por_nombre("Pendiente")
 
 
 def _estado_entregado():
-    return _get_estado_por_nombre("Entregado") or _get_estado_por_nombre("ENTREGADO")
+    return estado_por_nombre("Entregado")
 
 
 def _estado_cancelado():
-    return (
-        _get_estado_por_nombre("Cancelada")
-        or _get_estado_por_nombre("Cancelado")
-        or _get_estado_por_nombre("CANCELADA")
-        or _get_estado_por_nombre("CANCELADO")
-    )
+    return estado_por_nombre("Cancelada")
 
 
 @transaction.atomic
@@ -111,26 +88,29 @@ def crear_reserva_desde_carrito(usuario, items, observaciones=""):
         detalles.append(det)
 
         p.stock_producto = int(p.stock_producto) - cant
-        p.save(update_fields=["stock_producto"])
+        p.save(update_fields=["stock_producto", "fecha_actualizacion_producto"])
 
     DetalleReserva.objects.bulk_create(detalles)
     return reserva
 
 
+# Orden de los listados (y claves de la paginación): id_reserva desempata
+ORDEN_RESERVAS = ("-fecha_reserva", "id_reserva")
+
+
+# Los listados usan ReservaListSerializer (sin detalles): no se prefetchean
 def listar_reservas_usuario(usuario):
     return (
         Reserva.objects.filter(id_usuario=usuario)
         .select_related("id_usuario", "id_estado")
-        .prefetch_related("detalles__id_producto")
-        .order_by("-fecha_reserva")
+        .order_by(*ORDEN_RESERVAS)
     )
 
 
 def listar_reservas_admin():
     return (
         Reserva.objects.select_related("id_usuario", "id_estado")
-        .prefetch_related("detalles__id_producto")
-        .order_by("-fecha_reserva")
+        .order_by(*ORDEN_RESERVAS)
     )
 
 
@@ -153,7 +133,7 @@ def cancelar_reserva(usuario, reserva: Reserva):
     for d in detalles:
         p = d.id_producto
         p.stock_producto = int(getattr(p, "stock_producto", 0) or 0) + int(d.cantidad)
-        p.save(update_fields=["stock_producto"])
+        p.save(update_fields=["stock_producto", "fecha_actualizacion_producto"])
 
     est_cancel = _estado_cancelado()
     if est_cancel:
@@ -172,9 +152,9 @@ def actualizar_estado_reserva(usuario, reserva: Reserva, *, estado_nombre=None,
 
     est = None
     if id_estado:
-        est = Estado.objects.filter(id_estado=id_estado).first()
+        est = estado_por_id(id_estado)
     elif estado_nombre:
-        est = _get_estado_por_nombre(estado_nombre)
+        est = estado_por_nombre(estado_nombre)
 
     if not est:
         raise ValueError("Estado inválido.")
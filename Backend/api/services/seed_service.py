@@ -0,0 +1,365 @@
+import datetime
+import random
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ..models import (
+    Estado,
+    Rol,
+    Usuario,
+    Mascota,
+    Agenda,
+    Turno,
+    Consulta,
+    Producto,
+    Reserva,
+    DetalleReserva,
+)
+from ..permissions import ROLE_ADMIN, ROLE_CLIENTE, ROLE_RECEPCIONISTA, ROLE_VETERINARIO
+from .copy_service import Copia
+
+# Todos los usuarios sembrados comparten contraseña (un solo hash PBKDF2)
+CONTRASENA_PERF = "pozovet-perf"
+DOMINIO_PERF = "perf.pozovet.com"
+
+# Filas por unidad de --scale (con escala 20 se pasa del millón de filas)
+POR_ESCALA = {
+    ROLE_ADMIN: 1,
+    ROLE_RECEPCIONISTA: 2,
+    ROLE_VETERINARIO: 8,
+    ROLE_CLIENTE: 400,
+    "productos": 80,
+}
+HORAS_AGENDA = range(8, 18)  # bloques de una hora, de 08:00 a 17:00
+PROB_TURNO = 0.6  # bloques con un turno vigente
+PROB_CANCELADO = 0.08  # bloques con un turno cancelado (haya o no uno vigente)
+PROB_CONSULTA = 0.7  # turnos pasados que ya tienen consulta
+RESERVAS_POR_CLIENTE = 1.5
+
+ROLES = (
+    (ROLE_ADMIN, "Administrador"),
+    (ROLE_CLIENTE, "Cliente"),
+    (ROLE_RECEPCIONISTA, "Recepcionista"),
+    (ROLE_VETERINARIO, "Veterinario"),
+)
+ESTADOS = ("Activo", "Pendiente", "Cancelada", "Entregado")
+
+NOMBRES = (
+    "Ana", "Luis", "María", "José", "Carmen", "Jorge", "Lucía", "Pedro", "Sofía", "Diego",
+    "Valeria", "Andrés", "Camila", "Miguel", "Paula", "Carlos", "Daniela", "Javier",
+)
+APELLIDOS = (
+    "Pozo", "García", "Mendoza", "Zambrano", "Vera", "Cedeño", "Moreira", "Bravo",
+    "Loor", "Intriago", "Macías", "Alcívar", "Vélez", "Chávez", "Delgado", "Mero",
+)
+ESPECIES = {
+    "Perro": ("Mestizo", "Labrador", "Poodle", "Pastor Alemán", "Shih Tzu", "Beagle"),
+    "Gato": ("Mestizo", "Siamés", "Persa", "Angora"),
+    "Conejo": ("Mestizo", "Belier"),
+}
+NOMBRES_MASCOTA = (
+    "Firulais", "Luna", "Max", "Kira", "Rocky", "Nala", "Toby", "Milo", "Lola", "Simba",
+    "Coco", "Bruno", "Canela", "Thor", "Mía", "Oreo",
+)
+CATEGORIAS = ("Alimento", "Accesorios", "Higiene", "Medicamentos", "Juguetes")
+DIAGNOSTICOS = ("Control general", "Vacunación", "Desparasitación", "Otitis", "Dermatitis", "Gastroenteritis")
+
+
+def _siguiente_id(cursor, modelo):
+    qn = connection.ops.quote_name
+    cursor.execute(
+        f"SELECT COALESCE(MAX({qn(modelo._meta.pk.column)}), 0) + 1 FROM {qn(modelo._meta.db_table)}"
+    )
+    return cursor.fetchone()[0]
+
+
+def _quitar_claves_foraneas(cursor, modelos):
+    """Borra las FK de las tablas de `modelos` y devuelve cómo recrearlas."""
+    tablas = [m._meta.db_table for m in modelos]
+    cursor.execute(
+        "SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) "
+        "FROM pg_constraint WHERE contype = 'f' AND conrelid::regclass::text = ANY(%s)",
+        [[connection.ops.quote_name(t) for t in tablas]],
+    )
+    claves = [(tabla.strip('"'), nombre, definicion) for tabla, nombre, definicion in cursor.fetchall()]
+    for tabla, nombre, _ in claves:
+        cursor.execute(
+            f"ALTER TABLE {connection.ops.quote_name(tabla)} DROP CONSTRAINT {connection.ops.quote_name(nombre)}"
+        )
+    return claves
+
+
+def _estados():
+    estados = {}
+    for nombre in ESTADOS:
+        estado = Estado.objects.filter(descripcion_estado__iexact=nombre).order_by("id_estado").first()
+        estados[nombre] = estado or Estado.objects.create(descripcion_estado=nombre)
+    return estados
+
+
+def _roles(activo):
+    for id_rol, nombre in ROLES:
+        Rol.objects.get_or_create(id_rol=id_rol, defaults={"descripcion_rol": nombre, "id_estado": activo})
+
+
+def _contadores_factura():
+    """Último número de factura por día (FAC-AAAAMMDD-NNN) ya usado."""
+    contadores = {}
+    codigos = Reserva.objects.filter(codigo_factura__regex=r"^FAC-\d{8}-\d+$").values_list(
+        "codigo_factura", flat=True
+    )
+    for codigo in codigos.iterator():
+        _, dia, numero = codigo.split("-")
+        contadores[dia] = max(contadores.get(dia, 0), int(numero))
+    return contadores
+
+
+@transaction.atomic
+def sembrar(escala=1, semilla=42, desde=None, dias=365, limpiar=False, lote=50000):
+    """
+    Genera un conjunto de datos de la clínica proporcional a `escala`:
+    usuarios de los cuatro roles, mascotas, `dias` días de agenda por
+    veterinario (bloques de una hora, lunes a sábado), turnos vigentes y
+    cancelados, consultas de los turnos pasados, productos y reservas con
+    sus líneas.
+    - Misma semilla, escala y `desde` => mismos datos.
+    - Las filas van por COPY con ids explícitos, sin FK durante la carga;
+      al final se recrean las FK (validándolas), se ajustan las
+      secuencias y se hace ANALYZE.
+    - limpiar=True vacía antes Usuario y todo lo que cuelga de él.
+    Devuelve {tabla: filas insertadas}.
+    """
+    rnd = random.Random(semilla)
+    ahora = timezone.now()
+    hoy = timezone.localdate()
+    desde = desde or hoy - datetime.timedelta(days=dias // 2)
+    contrasena = make_password(CONTRASENA_PERF)
+
+    estados = _estados()
+    _roles(estados["Activo"])
+
+    with connection.cursor() as cursor:
+        qn = connection.ops.quote_name
+        if limpiar:
+            tablas = (Usuario, Producto, Reserva)
+            cursor.execute(
+                "TRUNCATE "
+                + ", ".join(qn(m._meta.db_table) for m in tablas)
+                + " RESTART IDENTITY CASCADE"
+            )
+
+        # Como pg_restore: las FK se quitan durante la carga y se vuelven a
+        # crear al final (una validación por tabla en vez de una por fila)
+        modelos = (Usuario, Mascota, Producto, Agenda, Turno, Consulta, Reserva, DetalleReserva)
+        claves_foraneas = _quitar_claves_foraneas(cursor, modelos)
+
+        def copia(modelo):
+            return Copia(cursor, modelo, lote, ahora)
+
+        # ---------- USUARIOS ----------
+        usuarios = copia(Usuario)
+        siguiente = _siguiente_id(cursor, Usuario)
+        por_rol = {}
+        for id_rol, _ in ROLES:
+            ids = por_rol.setdefault(id_rol, [])
+            for _ in range(POR_ESCALA[id_rol] * escala):
+                nombre = rnd.choice(NOMBRES)
+                usuarios.agregar(
+                    id_usuario=siguiente,
+                    cedula=f"P{siguiente:09d}",
+                    nombre=nombre,
+                    apellido=f"{rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}",
+                    correo=f"u{siguiente}@{DOMINIO_PERF}",
+                    telefono=f"09{rnd.randrange(10**8):08d}",
+                    direccion=f"Calle {rnd.randint(1, 120)} y Av. {rnd.choice(APELLIDOS)}",
+                    contrasena=contrasena,
+                    id_rol_id=id_rol,
+                )
+                ids.append(siguiente)
+                siguiente += 1
+        usuarios.enviar()
+        clientes = por_rol[ROLE_CLIENTE]
+        veterinarios = por_rol[ROLE_VETERINARIO]
+        administrador = por_rol[ROLE_ADMIN][0]
+
+        # ---------- MASCOTAS (1 a 3 por cliente) ----------
+        mascotas = copia(Mascota)
+        siguiente = _siguiente_id(cursor, Mascota)
+        lista_mascotas = []  # (id_mascota, id_dueño)
+        for id_cliente in clientes:
+            for _ in range(rnd.choice((1, 1, 2, 2, 3))):
+                especie = rnd.choice(tuple(ESPECIES))
+                edad = rnd.randint(0, 15)
+                mascotas.agregar(
+                    id_mascota=siguiente,
+                    nombre_mascota=rnd.choice(NOMBRES_MASCOTA),
+                    sexo=rnd.choice(("Macho", "Hembra")),
+                    especie=especie,
+                    raza_mascota=rnd.choice(ESPECIES[especie]),
+                    edad_mascota=edad,
+                    edad_meses=rnd.randint(0, 11),
+                    id_usuario_creacion_mascota=id_cliente,
+                    id_usuario_actualizacion_mascota=id_cliente,
+                    id_usuario_id=id_cliente,
+                )
+                lista_mascotas.append((siguiente, id_cliente))
+                siguiente += 1
+        mascotas.enviar()
+
+        # ---------- PRODUCTOS ----------
+        productos = copia(Producto)
+        siguiente = _siguiente_id(cursor, Producto)
+        lista_productos = []  # (id_producto, precio)
+        for n in range(POR_ESCALA["productos"] * escala):
+            categoria = rnd.choice(CATEGORIAS)
+            precio = Decimal(rnd.randint(150, 9000)) / 100
+            productos.agregar(
+                id_producto=siguiente,
+                nombre_producto=f"{categoria} {n + 1}",
+                descripcion_producto=f"Producto de {categoria.lower()}",
+                categoria_producto=categoria,
+                precio_producto=precio,
+                stock_producto=rnd.randint(0, 200),
+                id_usuario_creacion_producto=administrador,
+                id_usuario_actualizacion_producto=administrador,
+                id_usuario_id=administrador,
+            )
+            lista_productos.append((siguiente, precio))
+            siguiente += 1
+        productos.enviar()
+
+        # ---------- AGENDA + TURNOS + CONSULTAS ----------
+        agendas, turnos, consultas = copia(Agenda), copia(Turno), copia(Consulta)
+        id_agenda = _siguiente_id(cursor, Agenda)
+        id_turno = _siguiente_id(cursor, Turno)
+        id_consulta = _siguiente_id(cursor, Consulta)
+        una_hora = datetime.timedelta(hours=1)
+        pendiente = estados["Pendiente"].id_estado
+        cancelada = estados["Cancelada"].id_estado
+
+        def turno(dia, hora, estado):
+            nonlocal id_turno
+            id_mascota, id_dueño = rnd.choice(lista_mascotas)
+            turnos.agregar(
+                id_turno=id_turno,
+                fecha_turno=dia,
+                hora_turno=hora,
+                id_usuario_creacion_turno=id_dueño,
+                id_usuario_actualizacion_turno=id_dueño,
+                id_usuario_id=id_dueño,
+                id_mascota_id=id_mascota,
+                id_agenda_id=id_agenda,
+                id_estado_id=estado,
+                fecha_cancelacion_turno=ahora if estado == cancelada else None,
+            )
+            id_turno += 1
+            return id_turno - 1
+
+        for id_doctor in veterinarios:
+            for d in range(dias):
+                dia = desde + datetime.timedelta(days=d)
+                if dia.weekday() == 6:  # domingo sin atención
+                    continue
+                for h in HORAS_AGENDA:
+                    hora = datetime.time(h, 0)
+                    agendas.agregar(
+                        id_agenda=id_agenda,
+                        dia_atencion=dia,
+                        hora_atencion=hora,
+                        duracion_turno=una_hora,
+                        id_usuario_creacion_agenda=administrador,
+                        id_usuario_actualizacion_agenda=administrador,
+                        id_usuario_id=id_doctor,
+                    )
+                    # Como mucho un turno vigente por bloque (los cancelados no cuentan)
+                    if rnd.random() < PROB_CANCELADO:
+                        turno(dia, hora, cancelada)
+                    if rnd.random() < PROB_TURNO:
+                        vigente = turno(dia, hora, pendiente)
+                        if dia < hoy and rnd.random() < PROB_CONSULTA:
+                            consultas.agregar(
+                                id_consulta=id_consulta,
+                                diagnostico_consulta=rnd.choice(DIAGNOSTICOS),
+                                prescripcion_consulta="Según indicación",
+                                observacion_consulta="Sin novedades",
+                                id_usuario_creacion_consulta=id_doctor,
+                                id_usuario_actualizacion_consulta=id_doctor,
+                                id_turno_id=vigente,
+                            )
+                            id_consulta += 1
+                    id_agenda += 1
+        agendas.enviar()
+        turnos.enviar()
+        consultas.enviar()
+
+        # ---------- RESERVAS + DETALLES ----------
+        reservas, detalles = copia(Reserva), copia(DetalleReserva)
+        id_reserva = _siguiente_id(cursor, Reserva)
+        id_detalle = _siguiente_id(cursor, DetalleReserva)
+        contadores = _contadores_factura()
+        estados_reserva = (
+            [estados["Entregado"].id_estado] * 12
+            + [estados["Pendiente"].id_estado] * 5
+            + [cancelada] * 3
+        )
+        for _ in range(int(len(clientes) * RESERVAS_POR_CLIENTE)):
+            id_cliente = rnd.choice(clientes)
+            # Siempre antes de hoy: no choca con los códigos que genera Reserva.save()
+            fecha = ahora - datetime.timedelta(days=rnd.randint(1, 365), seconds=rnd.randrange(86400))
+            dia = fecha.strftime("%Y%m%d")
+            contadores[dia] = contadores.get(dia, 0) + 1
+
+            lineas = [
+                (id_producto, precio, rnd.randint(1, 3))
+                for id_producto, precio in rnd.sample(
+                    lista_productos, min(len(lista_productos), rnd.randint(1, 4))
+                )
+            ]
+            reservas.agregar(
+                id_reserva=id_reserva,
+                id_usuario_id=id_cliente,
+                fecha_reserva=fecha,
+                fecha_entrega_estimada=fecha + datetime.timedelta(days=2),
+                total_reserva=sum(precio * cantidad for _, precio, cantidad in lineas),
+                id_estado_id=rnd.choice(estados_reserva),
+                codigo_factura=f"FAC-{dia}-{contadores[dia]:03d}",
+                fecha_creacion=fecha,
+                id_usuario_creacion=id_cliente,
+                id_usuario_actualizacion=id_cliente,
+            )
+            for id_producto, precio, cantidad in lineas:
+                detalles.agregar(
+                    id_detalle=id_detalle,
+                    id_reserva_id=id_reserva,
+                    id_producto_id=id_producto,
+                    cantidad=cantidad,
+                    precio_unitario=precio,
+                    subtotal=precio * cantidad,
+                    id_usuario_creacion=id_cliente,
+                    id_usuario_actualizacion=id_cliente,
+                )
+                id_detalle += 1
+            id_reserva += 1
+        reservas.enviar()
+        detalles.enviar()
+
+        for tabla, nombre, definicion in claves_foraneas:
+            cursor.execute(f"ALTER TABLE {qn(tabla)} ADD CONSTRAINT {qn(nombre)} {definicion}")
+        for sql in connection.ops.sequence_reset_sql(no_style(), list(modelos) + [Rol]):
+            cursor.execute(sql)
+        cursor.execute("ANALYZE " + ", ".join(qn(m._meta.db_table) for m in modelos))
+
+    return {
+        "Usuario": usuarios.filas,
+        "Mascota": mascotas.filas,
+        "Producto": productos.filas,
+        "Agenda": agendas.filas,
+        "Turno": turnos.filas,
+        "Consulta": consultas.filas,
+        "Reserva": reservas.filas,
+        "DetalleReserva": detalles.filas,
+    }
@@ -0,0 +1,250 @@
+import datetime
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, IntegerField, Value
+from django.utils import timezone
+
+from ..models import Usuario, RefreshToken, ReplicaBorrado
+from ..authentication import invalidar_usuario
+
+
+def emitir_access_token(usuario: Usuario) -> str:
+    """
+    JWT de acceso. Lleva firmados el rol y la token_version del usuario,
+    así el modo claims-only (JWT_CLAIMS_ONLY) no necesita leer la BD.
+    """
+    rol = usuario.id_rol
+    ahora = datetime.datetime.utcnow()
+    payload = {
+        "user_id": usuario.id_usuario,
+        "correo": usuario.correo,
+        "rol_id": usuario.id_rol_id,
+        "rol": rol.descripcion_rol if rol else None,
+        "tv": usuario.token_version,
+        "exp": ahora + datetime.timedelta(hours=4),  # expira en 4h
+        "iat": ahora,
+    }
+
+    token = jwt.encode(payload, settings.SECRET_KEY, algorithm="HS256")
+
+    # PyJWT en versiones nuevas devuelve str, en viejas bytes -> por si acaso:
+    if isinstance(token, bytes):
+        token = token.decode("utf-8")
+    return token
+
+
+class _MapaVersiones:
+    """
+    Mapa en memoria id_usuario -> token_version para validar tokens sin
+    cargar la fila Usuario.
+    - Usuarios nuevos en el mapa: una consulta de una sola columna.
+    - Cada JWT_TOKEN_VERSION_REFRESH segundos: una consulta que trae solo las
+      versiones de los usuarios modificados desde el último refresco y los
+      borrados registrados en ReplicaBorrado (así se ven las revocaciones y
+      bajas hechas por otros procesos).
+    - LRU: como máximo JWT_TOKEN_VERSION_MAX usuarios.
+    """
+
+    # Solape del refresco incremental, por commits que llegan algo tarde
+    MARGEN = datetime.timedelta(seconds=2)
+
+    def __init__(self):
+        self._versiones = OrderedDict()  # id_usuario -> token_version
+        self._lock = threading.Lock()
+        self._ultimo_refresco = None  # (monotonic, datetime)
+        self.lecturas = 0
+        self.refrescos = 0
+
+    @staticmethod
+    def _intervalo():
+        return getattr(settings, "JWT_TOKEN_VERSION_REFRESH", 5)
+
+    @staticmethod
+    def _max_entradas():
+        return getattr(settings, "JWT_TOKEN_VERSION_MAX", 10000)
+
+    def _guardar(self, id_usuario, version):
+        # Con el lock tomado
+        self._versiones[id_usuario] = version
+        self._versiones.move_to_end(id_usuario)
+        while len(self._versiones) > self._max_entradas():
+            self._versiones.popitem(last=False)
+
+    def _refrescar_si_toca(self):
+        ahora_mono = time.monotonic()
+        with self._lock:
+            ultimo = self._ultimo_refresco
+            if ultimo and ahora_mono - ultimo[0] < self._intervalo():
+                return
+            # Marcamos ya el refresco para que otros hilos no lo repitan
+            self._ultimo_refresco = (ahora_mono, timezone.now())
+
+        if ultimo is None:
+            # Primer uso: el mapa está vacío, se irá llenando bajo demanda
+            return
+
+        desde = ultimo[1] - self.MARGEN
+        # Un usuario borrado no vuelve a aparecer en Usuario: sale del
+        # registro de borrados con versión None (y se quita del mapa)
+        cambios = (
+            Usuario.objects.filter(fecha_actualizacion_usuario__gte=desde)
+            .values_list("id_usuario", "token_version")
+            .union(
+                ReplicaBorrado.objects.filter(tabla=Usuario._meta.db_table, fecha__gte=desde).values_list(
+                    "id_fila", Value(None, output_field=IntegerField())
+                ),
+                all=True,
+            )
+        )
+
+        with self._lock:
+            self.refrescos += 1
+            for id_usuario, version in cambios:
+                if id_usuario not in self._versiones:
+                    continue
+                if version is None:
+                    del self._versiones[id_usuario]
+                else:
+                    self._versiones[id_usuario] = version
+
+    def version(self, id_usuario):
+        self._refrescar_si_toca()
+
+        with self._lock:
+            if id_usuario in self._versiones:
+                self._versiones.move_to_end(id_usuario)
+                return self._versiones[id_usuario]
+
+        version = (
+            Usuario.objects.filter(id_usuario=id_usuario)
+            .values_list("token_version", flat=True)
+            .first()
+        )
+        with self._lock:
+            self.lecturas += 1
+            if version is not None:
+                self._guardar(id_usuario, version)
+        return version
+
+    def fijar(self, id_usuario, version):
+        with self._lock:
+            if version is None:
+                self._versiones.pop(id_usuario, None)
+            else:
+                self._guardar(id_usuario, version)
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "usuarios": len(self._versiones),
+                "lecturas": self.lecturas,
+                "refrescos": self.refrescos,
+            }
+
+
+mapa_versiones = _MapaVersiones()
+
+
+def version_vigente(id_usuario):
+    """token_version actual del usuario (None si ya no existe)."""
+    return mapa_versiones.version(id_usuario)
+
+
+def incrementar_token_version(id_usuario) -> int:
+    """
+    Revoca todos los JWT emitidos al usuario (logout, cambio de rol o de
+    contraseña). Toca fecha_actualizacion_usuario para que el resto de
+    procesos lo vea en su siguiente refresco.
+    """
+    Usuario.objects.filter(id_usuario=id_usuario).update(
+        token_version=F("token_version") + 1,
+        fecha_actualizacion_usuario=timezone.now(),
+    )
+    version = (
+        Usuario.objects.filter(id_usuario=id_usuario)
+        .values_list("token_version", flat=True)
+        .first()
+    )
+    mapa_versiones.fijar(id_usuario, version)
+    invalidar_usuario(id_usuario)
+    return version
+
+
+def estadisticas_versiones():
+    return mapa_versiones.estadisticas()
+
+
+# ---------- REFRESH TOKENS ----------
+class RefreshTokenInvalido(Exception):
+    """Refresh token inexistente, expirado o revocado."""
+
+
+def _hash_refresh(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def emitir_refresh_token(usuario: Usuario, familia: str = None) -> str:
+    """
+    Crea un refresh token nuevo y devuelve el valor en claro
+    (es la única vez que existe: en la BD solo queda su hash).
+    """
+    token = secrets.token_urlsafe(48)
+    RefreshToken.objects.create(
+        id_usuario=usuario,
+        token_hash=_hash_refresh(token),
+        familia=familia or secrets.token_hex(16),
+        fecha_expiracion=timezone.now()
+        + datetime.timedelta(days=getattr(settings, "REFRESH_TOKEN_DIAS", 14)),
+    )
+    return token
+
+
+def rotar_refresh_token(token: str):
+    """
+    Canjea un refresh token por (usuario, nuevo_refresh_token).
+    El token usado queda revocado. Si llega un token YA revocado es que
+    alguien lo reutiliza: se revoca toda la familia (ese login completo).
+    """
+    ahora = timezone.now()
+    with transaction.atomic():
+        registro = (
+            RefreshToken.objects.select_for_update(of=("self",))
+            .select_related("id_usuario__id_rol")
+            .filter(token_hash=_hash_refresh(token or ""))
+            .first()
+        )
+        if registro is None:
+            raise RefreshTokenInvalido("Refresh token inválido")
+
+        if registro.fecha_expiracion <= ahora:
+            raise RefreshTokenInvalido("Refresh token expirado")
+
+        reutilizado = registro.fecha_revocacion is not None
+        if reutilizado:
+            # Se confirma la revocación antes de responder el error
+            RefreshToken.objects.filter(
+                familia=registro.familia, fecha_revocacion__isnull=True
+            ).update(fecha_revocacion=ahora)
+        else:
+            registro.fecha_revocacion = ahora
+            registro.save(update_fields=["fecha_revocacion"])
+            usuario = registro.id_usuario
+            nuevo = emitir_refresh_token(usuario, familia=registro.familia)
+
+    if reutilizado:
+        raise RefreshTokenInvalido("Refresh token revocado")
+    return usuario, nuevo
+
+
+def revocar_refresh_tokens(id_usuario) -> int:
+    """Revoca todos los refresh tokens vigentes del usuario."""
+    return RefreshToken.objects.filter(
+        id_usuario_id=id_usuario, fecha_revocacion__isnull=True
+    ).update(fecha_revocacion=timezone.now())
@@ -1,12 +1,132 @@
-from typing import List
+from typing import List, Optional
 from datetime import date
-from ..models import Turno
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.db.utils import IntegrityError
+from django.utils import timezone
+from ..models import Consulta, Estado, HistorialTurno, Turno
+from . import ocupacion_service
+from .estado_service import estado_por_nombre
+from .replica_sync_service import marca_actualizacion
+
+# Orden de los listados (y claves de la paginación): id_turno desempata
+ORDEN_TURNOS = ("-fecha_turno", "-hora_turno", "id_turno")
+
+# Índice único parcial de Turno: un solo turno vigente por bloque de agenda
+RESTRICCION_BLOQUE = "turno_bloque_vigente_unico"
+
+
+# Estados a los que pasa un turno pendiente cuando su día ya pasó
+ESTADO_ATENDIDO = "Atendido"
+ESTADO_NO_ASISTIO = "No asistió"
+
+
+class BloqueOcupado(Exception):
+    """El bloque de agenda ya tiene un turno vigente."""
+
 
 def listar_turnos_por_usuario(id_usuario: int) -> List[Turno]:
-    return Turno.objects.filter(id_usuario_id=id_usuario).order_by("-fecha_turno", "-hora_turno")
+    return Turno.objects.filter(id_usuario_id=id_usuario).order_by(*ORDEN_TURNOS)
 
 def listar_turnos_del_dia(fecha: date) -> List[Turno]:
     return Turno.objects.filter(fecha_turno=fecha).order_by("hora_turno")
 
+def _restriccion(error: IntegrityError):
+    diag = getattr(error.__cause__, "diag", None)
+    return getattr(diag, "constraint_name", None)
+
 def crear_turno(data: dict) -> Turno:
-    return Turno.objects.create(**data)
+    """
+    El INSERT es la reserva: si otra petición ya tomó el bloque el índice
+    único lo rechaza y se lanza BloqueOcupado (sin comprobar antes, que
+    dejaría una ventana entre la comprobación y el INSERT).
+    """
+    try:
+        # Savepoint propio: el error no deja rota la transacción de fuera
+        with transaction.atomic():
+            turno = Turno.objects.create(**data)
+    except IntegrityError as e:
+        if _restriccion(e) == RESTRICCION_BLOQUE:
+            raise BloqueOcupado() from e
+        raise
+    ocupacion_service.turno_reservado(turno.id_agenda_id)
+    return turno
+
+def cancelar_turno(turno: Turno, estado_cancelada, id_usuario: int) -> Turno:
+    """Marca el turno como cancelado; su bloque vuelve a quedar libre."""
+    turno.id_estado = estado_cancelada
+    turno.fecha_cancelacion_turno = timezone.now()
+    turno.id_usuario_actualizacion_turno = id_usuario
+    turno.save(update_fields=[
+        "id_estado",
+        "fecha_cancelacion_turno",
+        "id_usuario_actualizacion_turno",
+        "fecha_actualizacion_turno",
+    ])
+    ocupacion_service.turno_cancelado(turno.id_agenda_id)
+    return turno
+
+
+def _estado_o_crear(nombre: str) -> Estado:
+    return estado_por_nombre(nombre) or Estado.objects.create(descripcion_estado=nombre)
+
+
+def transicionar_pasados(hasta: date, lote: int = 5000, realizado_por: Optional[int] = None) -> dict:
+    """
+    Pasa los turnos pendientes (no cancelados) de hasta `hasta` incluido a
+    Atendido si tienen consulta o a No asistió si no, con un HistorialTurno
+    por cambio. Por lotes de `lote` turnos, cada uno en su transacción y
+    con un número fijo de consultas: SELECT ... FOR UPDATE SKIP LOCKED
+    (por turno_estado_fecha_idx), un UPDATE por estado nuevo y un INSERT
+    del historial. Los que pasan dejan de ser pendientes, así que cada
+    lote toma los siguientes sin OFFSET ni cursor. Los bloqueados por otra
+    petición (p. ej. cancelándose) se saltan: quedan para la próxima pasada.
+    """
+    resultado = {"atendidos": 0, "no_asistio": 0, "lotes": 0}
+    pendiente = estado_por_nombre("Pendiente")
+    if pendiente is None:
+        return resultado
+    atendido = _estado_o_crear(ESTADO_ATENDIDO)
+    no_asistio = _estado_o_crear(ESTADO_NO_ASISTIO)
+
+    while True:
+        with transaction.atomic():
+            filas = list(
+                Turno.objects.select_for_update(skip_locked=True, of=("self",))
+                .filter(
+                    id_estado=pendiente.id_estado,
+                    fecha_turno__lte=hasta,
+                    fecha_cancelacion_turno__isnull=True,
+                )
+                .annotate(con_consulta=Exists(Consulta.objects.filter(id_turno=OuterRef("pk"))))
+                .order_by("fecha_turno")
+                .values_list("id_turno", "con_consulta")[:lote]
+            )
+            if not filas:
+                return resultado
+
+            ahora = timezone.now()
+            historial = []
+            for nuevo, motivo, clave, con_consulta in (
+                (atendido, "con_consulta", "atendidos", True),
+                (no_asistio, "sin_consulta", "no_asistio", False),
+            ):
+                ids = [id_turno for id_turno, tiene in filas if tiene is con_consulta]
+                if not ids:
+                    continue
+                resultado[clave] += Turno.objects.filter(id_turno__in=ids).update(
+                    id_estado=nuevo,
+                    **marca_actualizacion(Turno, realizado_por, ahora),
+                )
+                historial += [
+                    HistorialTurno(
+                        id_turno_id=id_turno,
+                        id_estado_anterior_id=pendiente.id_estado,
+                        id_estado_nuevo_id=nuevo.id_estado,
+                        motivo=motivo,
+                        realizado_por=realizado_por,
+                    )
+                    for id_turno in ids
+                ]
+            HistorialTurno.objects.bulk_create(historial)
+            resultado["lotes"] += 1
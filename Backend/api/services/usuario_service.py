@@ -1,6 +1,8 @@
 from typing import List, Optional
-from django.contrib.auth.hashers import make_password
 from ..models import Usuario
+from ..authentication import invalidar_usuario
+from .token_service import incrementar_token_version, mapa_versiones, revocar_refresh_tokens
+from .password_service import hashear
 
 
 def listar_usuarios() -> List[Usuario]:
@@ -15,13 +17,14 @@ def obtener_usuario_por_id(id_usuario: int) -> Optional[Usuario]:
 
 
 def crear_usuario(data: dict) -> Usuario:
+    """Puede lanzar password_service.HashingSaturado."""
 
     data = dict(data)
 
     # Manejo de contraseña
     contrasena = data.get("contrasena")
     if contrasena:
-        data["contrasena"] = make_password(contrasena)
+        data["contrasena"] = hashear(contrasena)
 
     # Si viene info de auditoría desde el controller (admin), la respetamos
     creador_id = data.get("id_usuario_creacion")
@@ -44,12 +47,14 @@ def crear_usuario(data: dict) -> Usuario:
 
 
 def actualizar_usuario(usuario: Usuario, data: dict) -> Usuario:
+    """Puede lanzar password_service.HashingSaturado."""
     data = dict(data)
 
     # Manejo de contraseña
     contrasena = data.pop("contrasena", None)
     if contrasena:
-        usuario.contrasena = make_password(contrasena)
+        usuario.contrasena = hashear(contrasena)
+    rol_anterior = usuario.id_rol_id
 
     # Otros campos (incluyendo auditoría si vienen)
     for campo, valor in data.items():
@@ -57,8 +62,20 @@ def actualizar_usuario(usuario: Usuario, data: dict) -> Usuario:
             setattr(usuario, campo, valor)
 
     usuario.save()
+    invalidar_usuario(usuario.id_usuario)
+
+    # Cambio de contraseña o de rol (va firmado en el JWT): se revocan los
+    # JWT y refresh tokens emitidos
+    if contrasena or usuario.id_rol_id != rol_anterior:
+        revocar_refresh_tokens(usuario.id_usuario)
+        incrementar_token_version(usuario.id_usuario)
     return usuario
 
 
 def eliminar_usuario(usuario: Usuario) -> None:
+    id_usuario = usuario.id_usuario
     usuario.delete()
+    invalidar_usuario(id_usuario)
+    # Sus JWT dejan de valer ya en este proceso; los demás lo ven en su
+    # siguiente refresco del mapa (por ReplicaBorrado)
+    mapa_versiones.fijar(id_usuario, None)
@@ -1,3 +1,1603 @@
-from django.test import TestCase
+import csv
+import datetime
+import itertools
+import json
+import re
+import threading
+from collections import Counter
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.core.management import CommandError, call_command
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .authentication import JWTAuthentication, invalidar_usuario, principal_cache
+from .models import (
+    Estado,
+    Rol,
+    Usuario,
+    Mascota,
+    Agenda,
+    PlantillaHorario,
+    ExcepcionHorario,
+    Turno,
+    HistorialTurno,
+    Consulta,
+    HistorialUsuario,
+    Producto,
+    Actividad,
+    DoctorActividad,
+    Reserva,
+    DetalleReserva,
+    RefreshToken,
+)
+from .permissions import ROLE_ADMIN, ROLE_CLIENTE, ROLE_RECEPCIONISTA, ROLE_VETERINARIO
+from . import db_router
+from .pagination import CABECERA_SIGUIENTE
+from .services import (
+    agenda_service,
+    calendario_service,
+    estado_service,
+    ocupacion_service,
+    plantilla_service,
+    turno_service,
+    usuario_service,
+)
+from .services.actividad_service import obtener_doctores_por_actividad
+from .services.password_service import pool_hashing
+from .services.token_service import emitir_access_token, emitir_refresh_token
+from .urls import urlpatterns
+
+
+# ---------- DATOS DE PRUEBA ----------
+# Cada prueba pasa solo lo que mira; cédula, correo, contraseña, duración
+# del bloque y demás campos obligatorios salen de aquí.
+
+ROLES_PRUEBA = {
+    "admin": ROLE_ADMIN,
+    "cliente": ROLE_CLIENTE,
+    "recepcionista": ROLE_RECEPCIONISTA,
+    "veterinario": ROLE_VETERINARIO,
+}
+
+_serie = itertools.count(1)
+
+
+def crear_estados(*nombres):
+    """Un Estado por nombre, en el mismo orden."""
+    return [Estado.objects.create(descripcion_estado=nombre) for nombre in nombres]
+
+
+def crear_rol(id_rol, estado):
+    """Rol con el id fijo que miran los permisos (ROLE_*)."""
+    nombre = next(nombre for nombre, id_fijo in ROLES_PRUEBA.items() if id_fijo == id_rol)
+    return Rol.objects.create(id_rol=id_rol, descripcion_rol=nombre.capitalize(), id_estado=estado)
+
+
+def crear_usuario(rol, nombre="Prueba", **campos):
+    """Usuario con cédula y correo únicos; `campos` pisa los demás valores."""
+    n = next(_serie)
+    return Usuario.objects.create(
+        **{
+            "cedula": f"{n:010d}",
+            "nombre": nombre,
+            "apellido": "Prueba",
+            "correo": f"{nombre.lower()}{n}@pozovet.com",
+            "contrasena": "x",
+            "id_rol": rol,
+            **campos,
+        }
+    )
+
+
+def crear_mascota(duena, nombre="Firulais", **campos):
+    return Mascota.objects.create(
+        **{"nombre_mascota": nombre, "sexo": "H", "especie": "Perro", "id_usuario": duena, **campos}
+    )
+
+
+def crear_agenda(doctor, dia, hora, duracion=datetime.timedelta(hours=1)):
+    return Agenda.objects.create(id_usuario=doctor, dia_atencion=dia, hora_atencion=hora, duracion_turno=duracion)
+
+
+def crear_turno(mascota, agenda, estado, **campos):
+    """Turno de la mascota en el bloque `agenda`, a nombre de su dueño salvo otro id_usuario en `campos`."""
+    return Turno.objects.create(
+        **{
+            "fecha_turno": agenda.dia_atencion,
+            "hora_turno": agenda.hora_atencion,
+            "id_usuario": mascota.id_usuario,
+            "id_mascota": mascota,
+            "id_agenda": agenda,
+            "id_estado": estado,
+            **campos,
+        }
+    )
+
+
+class IndicesConsultasTests(TestCase):
+    """
+    Cada consulta caliente debe poder usar su índice (migración 0014).
+    Con pocas filas PostgreSQL prefiere un seq scan, así que se desactiva
+    para ver qué índice elegiría con la tabla grande.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        [cls.estado] = crear_estados("Pendiente")
+        rol = crear_rol(ROLE_VETERINARIO, cls.estado)
+        cls.doctor = crear_usuario(rol)
+        cls.mascota = crear_mascota(cls.doctor)
+        cls.dia = datetime.date(2026, 3, 2)
+        cls.agenda = crear_agenda(cls.doctor, cls.dia, datetime.time(9, 0))
+        # Varios doctores con los mismos horarios, un turno en cada uno y
+        # estadísticas al día: así el planner compara índices con datos reales
+        doctores = [cls.doctor] + [crear_usuario(rol) for _ in range(4)]
+        agendas = Agenda.objects.bulk_create(
+            Agenda(
+                id_usuario=doctor,
+                dia_atencion=cls.dia + datetime.timedelta(days=d),
+                hora_atencion=datetime.time(h, 0),
+                duracion_turno=datetime.timedelta(hours=1),
+            )
+            for doctor in doctores
+            for d in range(30)
+            for h in range(8, 18)
+            if (doctor, d, h) != (cls.doctor, 0, 9)
+        )
+        Turno.objects.bulk_create(
+            Turno(
+                fecha_turno=a.dia_atencion,
+                hora_turno=a.hora_atencion,
+                id_usuario=cls.doctor,
+                id_mascota=cls.mascota,
+                id_agenda=a,
+                id_estado=cls.estado,
+            )
+            for a in [cls.agenda] + agendas
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE "Agenda", "Turno"')
+        HistorialUsuario.objects.create(usuario=cls.doctor, tipo="cambio_rol", detalle="x")
+        Reserva.objects.create(id_usuario=cls.doctor, total_reserva=10, id_estado=cls.estado)
+
+    def _plan(self, queryset):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def assertUsaIndice(self, queryset, indice):
+        plan = self._plan(queryset)
+        self.assertIn(indice, plan, f"No se usa {indice}:\n{plan}")
+
+    def test_turno_por_agenda_fecha_hora(self):
+        qs = Turno.objects.filter(
+            id_agenda=self.agenda, fecha_turno=self.dia, hora_turno=datetime.time(9, 0)
+        )
+        self.assertUsaIndice(qs, "turno_agenda_fecha_hora_idx")
+
+    def test_turnos_del_dia_por_hora(self):
+        qs = Turno.objects.filter(fecha_turno=self.dia).order_by("hora_turno")
+        self.assertUsaIndice(qs, "turno_fecha_hora_idx")
+
+    def test_turnos_recientes_primero(self):
+        qs = Turno.objects.order_by("-fecha_turno", "-hora_turno")[:50]
+        self.assertUsaIndice(qs, "turno_fecha_hora_idx")
+
+    def test_agenda_doctor_dia(self):
+        qs = Agenda.objects.filter(id_usuario=self.doctor, dia_atencion=self.dia).order_by("hora_atencion")
+        self.assertUsaIndice(qs, "agenda_doctor_dia_hora_idx")
+
+    def test_login_por_correo(self):
+        self.assertUsaIndice(Usuario.objects.filter(correo=self.doctor.correo), "usuario_correo_idx")
+
+    def test_historial_global(self):
+        self.assertUsaIndice(HistorialUsuario.objects.order_by("-fecha")[:100], "historial_fecha_desc_idx")
+
+    def test_reservas_admin(self):
+        self.assertUsaIndice(Reserva.objects.order_by("-fecha_reserva")[:50], "reserva_fecha_desc_idx")
+
+    def test_reservas_de_un_usuario(self):
+        qs = Reserva.objects.filter(id_usuario=self.doctor).order_by("-fecha_reserva")
+        self.assertUsaIndice(qs, "reserva_usuario_fecha_idx")
+
+    def test_codigo_factura_por_prefijo(self):
+        # El índice *_like (varchar_pattern_ops) lo crea Django por ser unique,
+        # con un hash en el nombre: se busca en el catálogo
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE tablename = 'Reserva' AND indexname LIKE %s",
+                ["Reserva_codigo_factura_%_like"],
+            )
+            (indice,) = cursor.fetchone()
+        self.assertUsaIndice(Reserva.objects.filter(codigo_factura__startswith="FAC-20260302-"), indice)
+
+    def test_estado_por_descripcion_sin_mayusculas(self):
+        qs = Estado.objects.filter(descripcion_estado__iexact="pendiente")
+        self.assertUsaIndice(qs, "estado_descripcion_upper_idx")
+
+    def test_refresh_tokens_vigentes(self):
+        qs = RefreshToken.objects.filter(id_usuario=self.doctor, fecha_revocacion__isnull=True)
+        self.assertUsaIndice(qs, "refresh_activo_usuario_idx")
+
+
+# ---------- PRESUPUESTO DE CONSULTAS POR ENDPOINT ----------
+
+
+class Ruta:
+    """
+    Una petición a medir: patrón tal cual está en api/urls.py, método,
+    valores de la URL (claves de self.ids), cuerpo, consultas máximas y
+    el código HTTP que debe responder (esperado, o el de por_rol para ese rol).
+    """
+
+    def __init__(
+        self,
+        patron,
+        metodo,
+        presupuesto,
+        args=None,
+        datos=None,
+        query="",
+        roles=None,
+        multipart=False,
+        esperado=200,
+        por_rol=None,
+    ):
+        self.patron = patron
+        self.metodo = metodo
+        self.presupuesto = presupuesto
+        self.args = args or {}
+        self.datos = datos
+        self.query = query
+        # None => los cuatro roles; ("anonimo",) => sin token
+        self.roles = roles or tuple(ROLES_PRUEBA)
+        # Los productos solo aceptan multipart (subida de imagen)
+        self.multipart = multipart
+        self.esperado = esperado
+        self.por_rol = por_rol or {}
+
+    def __str__(self):
+        return f"{self.metodo} {self.patron}{'?' + self.query if self.query else ''}"
+
+    def esperado_para(self, rol):
+        return self.por_rol.get(rol, self.esperado)
+
+    def url(self, ids):
+        ruta = re.sub(r"<(?:\w+:)?(\w+)>", lambda m: str(ids[self.args[m.group(1)]]), self.patron)
+        query = self.query.format(**ids) if self.query else ""
+        return f"/api/{ruta}" + (f"?{query}" if query else "")
+
+    def cuerpo(self, ids):
+        """(contenido, content_type) listos para Client.generic."""
+        if self.datos is None:
+            return "", "application/json"
+        datos = self.datos(ids) if callable(self.datos) else self.datos
+        if self.multipart:
+            return encode_multipart(BOUNDARY, datos), MULTIPART_CONTENT
+        return json.dumps(datos), "application/json"
+
+
+# Códigos por rol de las rutas que no son para todos: 403 al rol sin permiso
+# y 404 a quien pide una fila de otro (mascota/turno del cliente de pruebas)
+SOLO_ADMIN = dict.fromkeys(("cliente", "recepcionista", "veterinario"), 403)
+GESTORES = dict.fromkeys(("cliente", "veterinario"), 403)  # admin y recepcionista
+DOCTORES = dict.fromkeys(("cliente", "recepcionista"), 403)  # admin y veterinario
+AJENAS = dict.fromkeys(("recepcionista", "veterinario"), 404)
+
+RUTAS = (
+    # ROL
+    Ruta("roles/", "GET", 2),
+    Ruta("roles/", "POST", 3, datos=lambda i: {"descripcion_rol": "Auxiliar", "id_estado": i["estado"]}, esperado=201),
+    Ruta("roles/<int:pk>/", "GET", 2, args={"pk": "rol_libre"}),
+    Ruta("roles/<int:pk>/", "PUT", 3, args={"pk": "rol_libre"}, datos={"descripcion_rol": "Auxiliar"}),
+    Ruta("roles/<int:pk>/", "DELETE", 4, args={"pk": "rol_libre"}, esperado=204),
+    # USUARIO
+    Ruta("usuarios/", "GET", 2),
+    Ruta(
+        "usuarios/",
+        "POST",
+        5,
+        datos={
+            "cedula": "0999999999",
+            "nombre": "Nuevo",
+            "apellido": "Usuario",
+            "correo": "nuevo@pozovet.com",
+            "contrasena": "clave-segura",
+            "id_rol": ROLE_CLIENTE,
+        },
+        esperado=201,
+    ),
+    Ruta("usuarios/<int:pk>/", "GET", 2, args={"pk": "cliente"}),
+    Ruta("usuarios/<int:pk>/", "PUT", 4, args={"pk": "cliente"}, datos={"nombre": "Renombrado"}),
+    Ruta("usuarios/<int:pk>/", "DELETE", 16, args={"pk": "usuario_libre"}, esperado=204),
+    Ruta("usuarios/tipo/<str:tipo>/", "GET", 2, args={"tipo": "tipo"}, por_rol={"cliente": 403}),
+    Ruta(
+        "usuarios/<int:id_usuario>/cambiar-rol/",
+        "PUT",
+        8,
+        args={"id_usuario": "usuario_libre"},
+        datos={"id_rol": ROLE_RECEPCIONISTA},
+        por_rol=SOLO_ADMIN,
+    ),
+    Ruta("usuarios/historial/", "GET", 2, por_rol=SOLO_ADMIN),
+    # ESTADO
+    Ruta("estados/", "GET", 2),
+    Ruta("estados/", "POST", 2, datos={"descripcion_estado": "Temporal"}, esperado=201),
+    Ruta("estados/<int:pk>/", "GET", 2, args={"pk": "estado_libre"}),
+    Ruta("estados/<int:pk>/", "PUT", 3, args={"pk": "estado_libre"}, datos={"descripcion_estado": "Otro"}),
+    Ruta("estados/<int:pk>/", "DELETE", 7, args={"pk": "estado_libre"}, esperado=204),
+    # MASCOTA
+    Ruta("mascotas/", "GET", 2),
+    Ruta("mascotas/", "POST", 4, datos={"nombre_mascota": "Luna", "sexo": "H", "especie": "Gato"}, esperado=201),
+    Ruta("mascotas/<int:pk>/", "GET", 2, args={"pk": "mascota"}),
+    Ruta("mascotas/<int:pk>/", "PUT", 3, args={"pk": "mascota"}, datos={"nombre_mascota": "Toby"}, por_rol=AJENAS),
+    Ruta("mascotas/<int:pk>/", "DELETE", 5, args={"pk": "mascota_libre"}, esperado=204, por_rol=AJENAS),
+    Ruta("mascotas/<int:pk>/historia/", "GET", 3, args={"pk": "mascota"}),
+    Ruta(
+        "mascotas/admin-create/",
+        "POST",
+        6,
+        datos=lambda i: {"nombre_mascota": "Kira", "sexo": "H", "especie": "Perro", "id_usuario": i["cliente"]},
+        esperado=201, por_rol=SOLO_ADMIN,
+    ),
+    Ruta("mascotas/por-usuario/<int:id_usuario>/", "GET", 2, args={"id_usuario": "cliente"}, por_rol=SOLO_ADMIN),
+    # AUTH
+    Ruta(
+        "login/",
+        "POST",
+        2,
+        datos=lambda i: {"correo": i["correo_cliente"], "contrasena": "clave"},
+        roles=("anonimo",),
+    ),
+    Ruta(
+        "register/",
+        "POST",
+        4,
+        datos={
+            "cedula": "0888888888",
+            "nombre": "Registro",
+            "apellido": "Nuevo",
+            "correo": "registro@pozovet.com",
+            "contrasena": "clave-segura",
+            "id_rol": ROLE_CLIENTE,
+        },
+        roles=("anonimo",),
+        esperado=201,
+    ),
+    Ruta("logout/", "POST", 4),
+    Ruta("token/refresh/", "POST", 5, datos=lambda i: {"refresh": i["refresh"]}, roles=("anonimo",)),
+    # TURNOS
+    Ruta("turnos/", "GET", 2),
+    Ruta(
+        "turnos/",
+        "POST",
+        11,
+        datos=lambda i: {
+            "id_mascota": i["mascota"],
+            "id_agenda": i["agenda_libre"],
+            "fecha_turno": i["dia"],
+            "hora_turno": "23:00",
+        },
+        esperado=201, por_rol=dict.fromkeys(("admin", "recepcionista", "veterinario"), 403),
+    ),
+    Ruta("turnos/dia/", "GET", 2, query="fecha={dia}", por_rol=SOLO_ADMIN),
+    # AGENDA
+    Ruta(
+        "agenda/horarios/doctor/<int:id_doctor>/",
+        "GET",
+        3,
+        args={"id_doctor": "veterinario"},
+        query="dia={dia}",
+        por_rol={"cliente": 403},
+    ),
+    Ruta(
+        "agenda/horarios/doctor/<int:id_doctor>/toggle/",
+        "POST",
+        4,
+        args={"id_doctor": "veterinario"},
+        datos=lambda i: {"dia": i["dia"], "hora": "22:00"},
+        esperado=201, por_rol=SOLO_ADMIN,
+    ),
+    Ruta(
+        "agenda/horarios/doctor/<int:id_doctor>/guardar/",
+        "PUT",
+        9,
+        args={"id_doctor": "veterinario"},
+        datos=lambda i: {"dia": i["dia"], "horas": ["08:00", "22:00"]},
+        por_rol=SOLO_ADMIN,
+    ),
+    Ruta("usuarios/doctores/", "GET", 2),
+    Ruta(
+        "agenda/disponibilidad/<int:doctor_id>/",
+        "GET",
+        3,
+        args={"doctor_id": "veterinario"},
+        query="dia={dia}",
+    ),
+    Ruta("agenda/disponibilidad/", "GET", 2, query="doctores={veterinario}&desde={dia}&hasta={dia}"),
+    Ruta("agenda/disponibilidad/", "GET", 2, query="id_actividad={actividad}&desde={dia}&hasta={dia}"),
+    Ruta("agenda/plantillas/", "GET", 2, query="doctor={veterinario}", por_rol=SOLO_ADMIN),
+    Ruta(
+        "agenda/plantillas/",
+        "POST",
+        3,
+        datos=lambda i: {"id_usuario": i["veterinario"], "dia_semana": 1, "hora_inicio": "08:00", "hora_fin": "12:00"},
+        esperado=201, por_rol=SOLO_ADMIN,
+    ),
+    Ruta("agenda/plantillas/<int:id_plantilla>/", "GET", 2, args={"id_plantilla": "plantilla"}, por_rol=SOLO_ADMIN),
+    Ruta(
+        "agenda/plantillas/<int:id_plantilla>/",
+        "PUT",
+        3,
+        args={"id_plantilla": "plantilla"},
+        datos={"hora_fin": "13:00"},
+        por_rol=SOLO_ADMIN,
+    ),
+    Ruta(
+        "agenda/plantillas/<int:id_plantilla>/",
+        "DELETE",
+        3,
+        args={"id_plantilla": "plantilla"},
+        esperado=204,
+        por_rol=SOLO_ADMIN,
+    ),
+    Ruta(
+        "agenda/plantillas/materializar/",
+        "POST",
+        8,
+        datos=lambda i: {"desde": i["dia"], "hasta": i["dia"], "doctores": [i["veterinario"]]},
+        por_rol=SOLO_ADMIN,
+    ),
+    Ruta("agenda/excepciones/", "GET", 2, query="doctor={veterinario}", por_rol=SOLO_ADMIN),
+    Ruta(
+        "agenda/excepciones/",
+        "POST",
+        2,
+        datos=lambda i: {"fecha_inicio": i["dia"], "fecha_fin": i["dia"], "motivo": "Feriado"},
+        esperado=201, por_rol=SOLO_ADMIN,
+    ),
+    Ruta("agenda/excepciones/<int:id_excepcion>/", "GET", 2, args={"id_excepcion": "excepcion"}, por_rol=SOLO_ADMIN),
+    Ruta(
+        "agenda/excepciones/<int:id_excepcion>/",
+        "PUT",
+        3,
+        args={"id_excepcion": "excepcion"},
+        datos={"motivo": "Vacaciones"},
+        por_rol=SOLO_ADMIN,
+    ),
+    Ruta(
+        "agenda/excepciones/<int:id_excepcion>/",
+        "DELETE",
+        3,
+        args={"id_excepcion": "excepcion"},
+        esperado=204,
+        por_rol=SOLO_ADMIN,
+    ),
+    Ruta("agenda/calendario/doctor/<int:id_doctor>/", "GET", 2, args={"id_doctor": "veterinario"}, por_rol=DOCTORES),
+    Ruta("agenda/calendario/doctor/<int:id_doctor>/", "POST", 4, args={"id_doctor": "veterinario"}, por_rol=DOCTORES),
+    Ruta("agenda/calendario/<str:token>.ics", "GET", 4, args={"token": "calendario"}, roles=("anonimo",)),
+    # CONSULTAS
+    Ruta("consultas/turnos/", "GET", 2, query="desde={dia}&hasta={dia}"),
+    Ruta("consultas/turnos/", "GET", 2, query="desde={dia}&hasta={dia}&doctor={veterinario}&estado={estado}"),
+    Ruta("consultas/buscar/", "GET", 2, query="q=ok"),
+    Ruta("consultas/por-turno/<int:id_turno>/", "GET", 2, args={"id_turno": "turno"}),
+    Ruta(
+        "consultas/por-turno/<int:id_turno>/",
+        "POST",
+        4,
+        args={"id_turno": "turno_libre"},
+        datos={"diagnostico_consulta": "Sano"},
+        esperado=201, por_rol=DOCTORES,
+    ),
+    Ruta(
+        "consultas/por-turno/<int:id_turno>/",
+        "PUT",
+        3,
+        args={"id_turno": "turno"},
+        datos={"diagnostico_consulta": "Revisado"},
+        por_rol=DOCTORES,
+    ),
+    Ruta("turnos/<int:id_turno>/cancelar/", "PATCH", 4, args={"id_turno": "turno_libre"}, por_rol=AJENAS),
+    # ACTIVIDADES
+    Ruta("actividades/", "GET", 2),
+    Ruta("actividades/", "POST", 3, datos={"nombre": "Vacunación", "descripcion": "Vacunas"}, esperado=201),
+    Ruta("doctores/<int:id_doctor>/actividades/", "GET", 2, args={"id_doctor": "veterinario"}),
+    Ruta(
+        "doctores/<int:id_doctor>/asignar-actividad/",
+        "POST",
+        7,
+        args={"id_doctor": "veterinario"},
+        datos=lambda i: {"actividades": [i["actividad"]]},
+    ),
+    Ruta("actividades/<int:id_actividad>/", "DELETE", 4, args={"id_actividad": "actividad_libre"}),
+    Ruta("actividades/<int:id_actividad>/doctores/", "GET", 2, args={"id_actividad": "actividad"}),
+    # PRODUCTOS
+    Ruta("productos/", "GET", 2),
+    Ruta("productos/", "GET", 2, query="q=comida&categoria=Alimentos"),
+    Ruta(
+        "productos/",
+        "POST",
+        2,
+        datos={"nombre_producto": "Collar", "categoria_producto": "Accesorios", "precio_producto": "5.00"},
+        multipart=True,
+        esperado=201, por_rol=GESTORES,
+    ),
+    Ruta("productos/admin/", "GET", 2, por_rol=GESTORES),
+    Ruta("productos/categorias/", "GET", 2),
+    Ruta("productos/<int:pk>/", "GET", 2, args={"pk": "producto"}),
+    Ruta(
+        "productos/<int:pk>/",
+        "PUT",
+        3,
+        args={"pk": "producto"},
+        datos={"precio_producto": "7.50"},
+        multipart=True,
+        por_rol=GESTORES,
+    ),
+    Ruta("productos/<int:pk>/", "DELETE", 5, args={"pk": "producto_libre"}, esperado=204, por_rol=GESTORES),
+    # RESERVAS
+    Ruta("reservas/", "GET", 2),
+    Ruta(
+        "reservas/",
+        "POST",
+        11,
+        datos=lambda i: {"items": [{"id_producto": i["producto"], "cantidad": 1}]},
+        esperado=201,
+    ),
+    Ruta("reservas/admin/", "GET", 2, por_rol=GESTORES),
+    Ruta("reservas/admin/", "GET", 2, query="q=fac", por_rol=GESTORES),
+    Ruta(
+        "reservas/<int:id_reserva>/estado/",
+        "PUT",
+        8,
+        args={"id_reserva": "reserva"},
+        datos={"estado": "Entregado"},
+        por_rol=GESTORES,
+    ),
+    Ruta("reservas/<int:id_reserva>/factura/", "GET", 4, args={"id_reserva": "reserva"}, por_rol={"veterinario": 404}),
+    Ruta("reservas/<int:id_reserva>/", "DELETE", 8, args={"id_reserva": "reserva"}, por_rol={"veterinario": 404}),
+    # EXPORTACIONES
+    # usuario + DECLARE del cursor (+ SAVEPOINT/RELEASE de su transacción)
+    Ruta("exportar/turnos/", "GET", 4, query="desde={dia}&hasta={dia}", por_rol=SOLO_ADMIN),
+    Ruta("exportar/turnos/", "GET", 4, query="desde={dia}&hasta={dia}&formato=ndjson", por_rol=SOLO_ADMIN),
+    # MÉTRICAS
+    Ruta("metricas/", "GET", 1, por_rol=SOLO_ADMIN),
+)
+
+# Rutas que todavía hacen una consulta por fila: su número de consultas
+# crece con N. Si una deja de crecer, el test avisa para quitarla de aquí.
+RUTAS_PENDIENTES = {}
+
+# Tiempo máximo de SQL por petición (ms). Holgado: solo caza consultas
+# patológicas (seq scans sobre tablas grandes, productos cartesianos...)
+PRESUPUESTO_TIEMPO_SQL_MS = 250
+
+
+@override_settings(
+    AUTH_USER_CACHE_TTL=0,  # sin cache: la autenticación siempre consulta
+    OCUPACION_CACHE_TTL=0,  # ni la disponibilidad
+    JWT_CLAIMS_ONLY=False,
+    PASSWORD_HASH_WORKERS=0,
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+class PresupuestoConsultasTests(TestCase):
+    """
+    Llama cada ruta de api/urls.py como cada rol, con N_INICIAL filas por
+    tabla y de nuevo con N_INICIAL + N_EXTRA. El número de consultas no
+    puede cambiar con N (sin N+1) ni pasar del presupuesto de la ruta.
+    Cada petición corre en un savepoint que se deshace al terminar.
+    """
+
+    N_INICIAL = 2
+    N_EXTRA = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        # crear_actividad busca el Estado 1 y los roles van por id fijo:
+        # se crean con pk explícita y se ajustan las secuencias
+        cls.activo = Estado.objects.create(id_estado=1, descripcion_estado="Activo")
+        cls.roles = {id_rol: crear_rol(id_rol, cls.activo) for id_rol in ROLES_PRUEBA.values()}
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Estado, Rol]):
+                cursor.execute(sql)
+        cls.pendiente = Estado.objects.create(descripcion_estado="Pendiente")
+        Estado.objects.create(descripcion_estado="Cancelada")
+        Estado.objects.create(descripcion_estado="Entregado")
+        estado_libre = Estado.objects.create(descripcion_estado="Sin uso")
+
+        rol_libre = Rol.objects.create(descripcion_rol="Sin uso", id_estado=cls.activo)
+
+        cls.usuarios = {
+            nombre: cls._crear_usuario(nombre, id_rol) for nombre, id_rol in ROLES_PRUEBA.items()
+        }
+        cliente = cls.usuarios["cliente"]
+        veterinario = cls.usuarios["veterinario"]
+        usuario_libre = cls._crear_usuario("libre", ROLE_CLIENTE)
+
+        cls.dia = datetime.date.today() + datetime.timedelta(days=30)
+        cls.actividad = Actividad.objects.create(nombre_actividad="Consulta general", id_estado=cls.activo)
+        actividad_libre = Actividad.objects.create(nombre_actividad="Sin uso", id_estado=cls.activo)
+
+        mascota = crear_mascota(cliente)
+        mascota_libre = crear_mascota(cliente, "Sin uso")
+        producto_libre = cls._crear_producto("Sin uso")
+        agenda_libre = crear_agenda(veterinario, cls.dia, datetime.time(23, 0))
+        turno_libre = crear_turno(mascota, crear_agenda(veterinario, cls.dia, datetime.time(21, 0)), cls.pendiente)
+        plantilla = PlantillaHorario.objects.create(
+            id_usuario=veterinario,
+            dia_semana=cls.dia.weekday(),
+            hora_inicio=datetime.time(8, 0),
+            hora_fin=datetime.time(10, 0),
+        )
+        excepcion = ExcepcionHorario.objects.create(
+            id_usuario=veterinario, fecha_inicio=cls.dia, fecha_fin=cls.dia, motivo="Congreso"
+        )
+
+        cls.ids = {
+            "estado": cls.activo.id_estado,
+            "estado_libre": estado_libre.id_estado,
+            "rol_libre": rol_libre.id_rol,
+            "cliente": cliente.id_usuario,
+            "correo_cliente": cliente.correo,
+            "veterinario": veterinario.id_usuario,
+            "usuario_libre": usuario_libre.id_usuario,
+            "tipo": "clientes",
+            "mascota": mascota.id_mascota,
+            "mascota_libre": mascota_libre.id_mascota,
+            "dia": cls.dia.isoformat(),
+            "agenda_libre": agenda_libre.id_agenda,
+            "turno_libre": turno_libre.id_turno,
+            "plantilla": plantilla.id_plantilla,
+            "excepcion": excepcion.id_excepcion,
+            "calendario": calendario_service.firmar(veterinario),
+            "actividad": cls.actividad.id_actividad,
+            "actividad_libre": actividad_libre.id_actividad,
+            "producto_libre": producto_libre.id_producto,
+        }
+        cls.sembrados = 0
+        cls._sembrar(cls.N_INICIAL)
+
+    @classmethod
+    def _crear_usuario(cls, nombre, id_rol):
+        # Con contraseña real: la ruta de login entra como el cliente
+        return crear_usuario(cls.roles[id_rol], nombre.capitalize(), contrasena=make_password("clave"))
+
+    @classmethod
+    def _crear_producto(cls, nombre):
+        return Producto.objects.create(
+            nombre_producto=nombre,
+            categoria_producto="Alimento",
+            precio_producto=Decimal("10.00"),
+            stock_producto=100,
+            id_usuario=cls.usuarios["admin"],
+        )
+
+    @classmethod
+    def _sembrar(cls, n):
+        """
+        Añade n unidades de datos que aparecen en todos los listados:
+        un cliente y un veterinario nuevos, una agenda+turno+consulta del
+        cliente de pruebas con el veterinario de pruebas, un producto, una
+        reserva con dos líneas, historial y actividades asignadas.
+        """
+        cliente = cls.usuarios["cliente"]
+        veterinario = cls.usuarios["veterinario"]
+        mascota = Mascota.objects.get(id_mascota=cls.ids["mascota"])
+        for i in range(cls.sembrados, cls.sembrados + n):
+            otro_cliente = cls._crear_usuario(f"cliente{i}", ROLE_CLIENTE)
+            otro_veterinario = cls._crear_usuario(f"vet{i}", ROLE_VETERINARIO)
+            crear_mascota(cliente, f"M{i}")
+            HistorialUsuario.objects.create(
+                usuario=otro_cliente, realizado_por=cls.usuarios["admin"], tipo="registro", detalle="x"
+            )
+
+            agenda = crear_agenda(veterinario, cls.dia, datetime.time(8 + i // 60, i % 60))
+            turno = crear_turno(mascota, agenda, cls.pendiente)
+            Consulta.objects.create(id_turno=turno, diagnostico_consulta="ok")
+
+            actividad = Actividad.objects.create(nombre_actividad=f"Actividad {i}", id_estado=cls.activo)
+            DoctorActividad.objects.create(doctor=veterinario, actividad=actividad)
+            DoctorActividad.objects.create(doctor=otro_veterinario, actividad=cls.actividad)
+
+            producto = cls._crear_producto(f"Producto {i}")
+            cls.ids.setdefault("producto", producto.id_producto)
+            reserva = Reserva.objects.create(
+                id_usuario=cliente, total_reserva=Decimal("20.00"), id_estado=cls.pendiente
+            )
+            for p in (producto, Producto.objects.get(id_producto=cls.ids["producto"])):
+                DetalleReserva.objects.create(
+                    id_reserva=reserva,
+                    id_producto=p,
+                    cantidad=1,
+                    precio_unitario=p.precio_producto,
+                    subtotal=p.precio_producto,
+                )
+
+            cls.ids.setdefault("turno", turno.id_turno)
+            cls.ids.setdefault("reserva", reserva.id_reserva)
+        cls.sembrados += n
+
+    def _medir(self, ruta, rol):
+        """Ejecuta la petición en un savepoint, comprueba el código y devuelve las consultas capturadas."""
+        cliente = Client(HTTP_HOST="localhost")
+        cabeceras = {}
+        if rol != "anonimo":
+            usuario = Usuario.objects.select_related("id_rol").get(id_usuario=self.usuarios[rol].id_usuario)
+            cabeceras["HTTP_AUTHORIZATION"] = f"Bearer {emitir_access_token(usuario)}"
+
+        with transaction.atomic():
+            ids = dict(self.ids, refresh=emitir_refresh_token(self.usuarios["cliente"]))
+            contenido, content_type = ruta.cuerpo(ids)
+            # Registro de Estados ya cargado, como en un proceso en marcha
+            # (una ruta anterior pudo vaciarlo al escribir un Estado)
+            estado_service.estado_por_id(self.activo.id_estado)
+            with CaptureQueriesContext(connection) as consultas:
+                respuesta = cliente.generic(
+                    ruta.metodo, ruta.url(ids), contenido, content_type=content_type, **cabeceras
+                )
+                if respuesta.streaming:
+                    # Las consultas de un StreamingHttpResponse corren al leerlo
+                    b"".join(respuesta.streaming_content)
+            transaction.set_rollback(True)
+
+        self.assertEqual(
+            respuesta.status_code,
+            ruta.esperado_para(rol),
+            f"{ruta} como {rol}: {b'' if respuesta.streaming else respuesta.content[:200]}",
+        )
+        return list(consultas.captured_queries)
+
+    def _medir_todo(self):
+        return {
+            (str(ruta), rol): self._medir(ruta, rol)
+            for ruta in RUTAS
+            for rol in ruta.roles
+        }
+
+    @staticmethod
+    def _sql(consultas):
+        """Listado numerado de las consultas y las que se repiten (N+1)."""
+        lineas = [f"  {n}. {q['sql']}" for n, q in enumerate(consultas, 1)]
+        repetidas = Counter(re.sub(r"\b\d+\b", "?", q["sql"]) for q in consultas)
+        lineas += [f"  x{veces}: {sql}" for sql, veces in repetidas.items() if veces > 1]
+        return "\n".join(lineas)
+
+    def test_doctores_por_actividad_sin_consultas_por_doctor(self):
+        # obtener_doctores_por_actividad no tiene ruta propia: se mide directo
+        for i in range(3):
+            admin = self._crear_usuario(f"admin{i}", ROLE_ADMIN)
+            DoctorActividad.objects.create(doctor=admin, actividad=self.actividad)
+            crear_agenda(admin, self.dia, datetime.time(12, 0))
+
+        with self.assertNumQueries(2):
+            doctores = obtener_doctores_por_actividad(self.actividad.id_actividad)
+        self.assertEqual(len(doctores), 3)
+        self.assertTrue(all(d["tiene_agenda"] for d in doctores))
+        self.assertTrue(all(d["especialidades"] == ["Consulta general"] for d in doctores))
+
+    def test_todas_las_rutas_tienen_presupuesto(self):
+        patrones = {str(p.pattern) for p in urlpatterns}
+        medidos = {ruta.patron for ruta in RUTAS}
+        self.assertEqual(patrones - medidos, set(), "Rutas sin presupuesto en RUTAS")
+        self.assertEqual(medidos - patrones, set(), "RUTAS con patrones que ya no existen")
+
+    def test_consultas_no_crecen_con_n(self):
+        antes = self._medir_todo()
+        self._sembrar(self.N_EXTRA)
+        despues = self._medir_todo()
+
+        for ruta in RUTAS:
+            pendiente = f"{ruta.metodo} {ruta.patron}" in RUTAS_PENDIENTES
+            crece = False
+            for rol in ruta.roles:
+                clave = (str(ruta), rol)
+                n_antes, n_despues = len(antes[clave]), len(despues[clave])
+                crece = crece or n_despues > n_antes
+                if pendiente:
+                    continue
+
+                with self.subTest(ruta=str(ruta), rol=rol):
+                    self.assertEqual(
+                        n_antes,
+                        n_despues,
+                        f"{ruta} como {rol}: {n_antes} consultas con N={self.N_INICIAL} y "
+                        f"{n_despues} con N={self.N_INICIAL + self.N_EXTRA}\n{self._sql(despues[clave])}",
+                    )
+                    self.assertLessEqual(
+                        n_despues,
+                        ruta.presupuesto,
+                        f"{ruta} como {rol}: {n_despues} consultas (presupuesto {ruta.presupuesto})\n"
+                        f"{self._sql(despues[clave])}",
+                    )
+                    tiempo_ms = sum(float(q["time"]) for q in despues[clave]) * 1000
+                    self.assertLessEqual(
+                        tiempo_ms,
+                        PRESUPUESTO_TIEMPO_SQL_MS,
+                        f"{ruta} como {rol}: {tiempo_ms:.1f} ms de SQL\n{self._sql(despues[clave])}",
+                    )
+
+            if pendiente:
+                with self.subTest(ruta=str(ruta)):
+                    self.assertTrue(crece, f"{ruta} ya no crece con N: quítala de RUTAS_PENDIENTES")
+
+
+
+class LecturaPrimariaTests(SimpleTestCase):
+    """Lectura de lo propio: la marca firmada que reenvía el cliente manda a la primaria hasta que caduca."""
+
+    def test_marca_firmada_y_caducidad(self):
+        def fijado(marca):
+            cabeceras = {"HTTP_X_LEER_PRIMARIA": marca} if marca else {}
+            return db_router._fijado_a_primaria(RequestFactory().get("/", **cabeceras))
+
+        marca = db_router.marca_primaria()
+        self.assertTrue(fijado(marca))
+        self.assertFalse(fijado(None))
+        self.assertFalse(fijado(marca[:-1] + ("A" if marca[-1] != "A" else "B")))  # firma alterada
+        with override_settings(REPLICA_PIN_SEGUNDOS=-1):
+            self.assertFalse(fijado(marca))  # caducada
+
+
+@override_settings(JWT_CLAIMS_ONLY=True, JWT_TOKEN_VERSION_REFRESH=0)
+class TokensClaimsOnlyTests(TestCase):
+    """Claims-only: el token deja de valer si se borra el usuario (aunque lo borre otro proceso) o cambia su rol."""
+
+    def test_usuario_borrado(self):
+        rol = crear_rol(ROLE_CLIENTE, *crear_estados("Activo"))
+        uno, otro = crear_usuario(rol), crear_usuario(rol)
+
+        tokens = {u.id_usuario: emitir_access_token(u) for u in (uno, otro)}
+        id_uno, id_otro = uno.id_usuario, otro.id_usuario
+
+        def estado_http(id_usuario):
+            return self.client.get("/api/mascotas/", HTTP_AUTHORIZATION=f"Bearer {tokens[id_usuario]}").status_code
+
+        self.assertEqual(estado_http(id_uno), 200)
+        self.assertEqual(estado_http(id_otro), 200)  # las dos versiones quedan en el mapa
+
+        # Borrado en este proceso: el mapa se actualiza al momento
+        usuario_service.eliminar_usuario(uno)
+        self.assertEqual(estado_http(id_uno), 401)
+
+        # Borrado por otro proceso (sin pasar por el servicio): lo trae el
+        # refresco del mapa desde ReplicaBorrado
+        Usuario.objects.filter(id_usuario=id_otro).delete()
+        self.assertEqual(estado_http(id_otro), 401)
+
+    def test_cambio_de_rol(self):
+        activo = crear_estados("Activo")[0]
+        rol_cliente, rol_admin = crear_rol(ROLE_CLIENTE, activo), crear_rol(ROLE_ADMIN, activo)
+        usuario = crear_usuario(rol_cliente)
+        cabeceras = {"HTTP_AUTHORIZATION": f"Bearer {emitir_access_token(usuario)}"}
+        refresh = emitir_refresh_token(usuario)
+
+        # PUT /usuarios/<id>/ no cambia el rol: eso es de /cambiar-rol/ (admin)
+        respuesta = self.client.put(
+            f"/api/usuarios/{usuario.id_usuario}/", {"id_rol": ROLE_ADMIN, "nombre": "Nuevo"},
+            content_type="application/json", **cabeceras,
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        usuario.refresh_from_db()
+        self.assertEqual((usuario.id_rol_id, usuario.nombre), (ROLE_CLIENTE, "Nuevo"))
+        self.assertEqual(self.client.get("/api/mascotas/", **cabeceras).status_code, 200)
+
+        # Si el servicio cambia el rol, el JWT y el refresh anteriores dejan de valer
+        usuario_service.actualizar_usuario(usuario, {"id_rol": rol_admin})
+        self.assertEqual(self.client.get("/api/mascotas/", **cabeceras).status_code, 401)
+        self.assertEqual(
+            self.client.post("/api/token/refresh/", {"refresh": refresh}, content_type="application/json").status_code,
+            401,
+        )
+
+
+@override_settings(AUTH_USER_CACHE_TTL=60, JWT_CLAIMS_ONLY=False)
+class CachePrincipalesTests(TestCase):
+    """authentication.principal_cache: caliente no consulta la BD; caduca con el TTL y se invalida al escribir."""
+
+    def setUp(self):
+        principal_cache.limpiar()
+        self.addCleanup(principal_cache.limpiar)
+        self.usuario = crear_usuario(crear_rol(ROLE_CLIENTE, *crear_estados("Activo")))
+        self.request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {emitir_access_token(self.usuario)}")
+
+    def _autenticar(self):
+        """(usuario, consultas hechas para autenticarlo y leer su rol)"""
+        with CaptureQueriesContext(connection) as ctx:
+            usuario, _ = JWTAuthentication().authenticate(self.request)
+            usuario.id_rol.descripcion_rol
+        return usuario, len(ctx)
+
+    def test_caliente_sin_consultas(self):
+        self.assertEqual(self._autenticar()[1], 1)
+        usuario, consultas = self._autenticar()
+        self.assertEqual(consultas, 0)
+        self.assertEqual(usuario.id_usuario, self.usuario.id_usuario)
+        self.assertEqual(principal_cache.estadisticas()["hits"], 1)
+
+    def test_caduca_con_el_ttl(self):
+        with mock.patch("api.authentication.time.monotonic", return_value=1000.0):
+            self.assertEqual(self._autenticar()[1], 1)
+        with mock.patch("api.authentication.time.monotonic", return_value=1059.0):
+            self.assertEqual(self._autenticar()[1], 0)
+        with mock.patch("api.authentication.time.monotonic", return_value=1060.0):
+            self.assertEqual(self._autenticar()[1], 1)
+        self.assertEqual(principal_cache.estadisticas()["expiradas"], 1)
+
+    def test_invalidar_usuario_quita_la_entrada(self):
+        self._autenticar()
+        invalidar_usuario(self.usuario.id_usuario)
+        self.assertEqual(self._autenticar()[1], 1)
+
+        # Los servicios que escriben la fila invalidan: no se sirve el dato viejo
+        usuario_service.actualizar_usuario(self.usuario, {"nombre": "Otro"})
+        usuario, consultas = self._autenticar()
+        self.assertEqual((usuario.nombre, consultas), ("Otro", 1))
+
+
+@override_settings(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_PENDIENTES=0)
+class HashingSaturadoTests(TestCase):
+    """password_service: con la cola de hashing llena, login, registro y cambio de contraseña dan 503 al momento."""
+
+    def test_503_con_retry_after(self):
+        rol = crear_rol(ROLE_CLIENTE, *crear_estados("Activo"))
+        usuario = crear_usuario(rol, contrasena=make_password("clave"))
+        cabeceras = {"HTTP_AUTHORIZATION": f"Bearer {emitir_access_token(usuario)}"}
+        rechazados = pool_hashing.rechazados
+
+        respuestas = [
+            self.client.post(
+                "/api/login/", {"correo": usuario.correo, "contrasena": "clave"}, content_type="application/json"
+            ),
+            self.client.post(
+                "/api/register/",
+                {
+                    "cedula": "0999999999", "nombre": "Nuevo", "apellido": "Registro",
+                    "correo": "nuevo@prueba.ec", "contrasena": "clave", "id_rol": ROLE_CLIENTE,
+                },
+                content_type="application/json",
+            ),
+            self.client.put(
+                f"/api/usuarios/{usuario.id_usuario}/", {"contrasena": "otra"},
+                content_type="application/json", **cabeceras,
+            ),
+        ]
+
+        for respuesta in respuestas:
+            self.assertEqual(respuesta.status_code, 503, respuesta.content)
+            self.assertEqual(respuesta.headers["Retry-After"], "1")
+        self.assertEqual(pool_hashing.rechazados - rechazados, 3)
+        self.assertFalse(Usuario.objects.filter(correo="nuevo@prueba.ec").exists())
+
+
+class RotacionRefreshTests(TestCase):
+    """token_service.rotar_refresh_token: cada canje da un par nuevo; reutilizar un refresh canjeado revoca el login."""
+
+    def _refrescar(self, refresh):
+        return self.client.post("/api/token/refresh/", {"refresh": refresh}, content_type="application/json")
+
+    def test_rota_y_la_reutilizacion_revoca_la_familia(self):
+        usuario = crear_usuario(crear_rol(ROLE_CLIENTE, *crear_estados("Activo")))
+        primero = emitir_refresh_token(usuario)
+        otro_login = emitir_refresh_token(usuario)
+
+        respuesta = self._refrescar(primero)
+        self.assertEqual(respuesta.status_code, 200)
+        segundo = respuesta.json()["refresh"]
+        self.assertNotEqual(segundo, primero)
+        cabeceras = {"HTTP_AUTHORIZATION": f"Bearer {respuesta.json()['access']}"}
+        self.assertEqual(self.client.get("/api/mascotas/", **cabeceras).status_code, 200)
+
+        # El refresh canjeado ya no vale, y usarlo revoca también el que lo sustituyó
+        self.assertEqual(self._refrescar(primero).status_code, 401)
+        self.assertEqual(self._refrescar(segundo).status_code, 401)
+        self.assertEqual(RefreshToken.objects.filter(id_usuario=usuario, fecha_revocacion__isnull=True).count(), 1)
+
+        # Los otros logins del usuario (otra familia) siguen funcionando
+        self.assertEqual(self._refrescar(otro_login).status_code, 200)
+
+
+class MaterializarPlantillasTests(TestCase):
+    """plantilla_service.materializar: plantillas - excepciones = Agenda, idempotente."""
+
+    @classmethod
+    def setUpTestData(cls):
+        activo, cls.pendiente = crear_estados("Activo", "Pendiente")
+        cls.doctor = crear_usuario(crear_rol(ROLE_VETERINARIO, activo))
+        hoy = datetime.date.today()
+        cls.lunes = hoy + datetime.timedelta(days=7 - hoy.weekday())
+        cls.hasta = cls.lunes + datetime.timedelta(days=13)  # dos semanas
+        # Lunes 08:00-10:00 en bloques de 1 h; miércoles 08:00-09:30 en bloques de 30 min
+        PlantillaHorario.objects.create(
+            id_usuario=cls.doctor, dia_semana=0,
+            hora_inicio=datetime.time(8, 0), hora_fin=datetime.time(10, 0),
+        )
+        PlantillaHorario.objects.create(
+            id_usuario=cls.doctor, dia_semana=2,
+            hora_inicio=datetime.time(8, 0), hora_fin=datetime.time(9, 30),
+            duracion_turno=datetime.timedelta(minutes=30),
+        )
+        # Vacaciones del doctor el segundo lunes; feriado de la clínica el primer miércoles
+        ExcepcionHorario.objects.create(
+            id_usuario=cls.doctor,
+            fecha_inicio=cls.lunes + datetime.timedelta(days=7),
+            fecha_fin=cls.lunes + datetime.timedelta(days=7),
+        )
+        ExcepcionHorario.objects.create(
+            fecha_inicio=cls.lunes + datetime.timedelta(days=2),
+            fecha_fin=cls.lunes + datetime.timedelta(days=2),
+            motivo="Feriado",
+        )
+
+    def _bloques(self):
+        return list(
+            Agenda.objects.filter(id_usuario=self.doctor)
+            .order_by("dia_atencion", "hora_atencion")
+            .values_list("dia_atencion", "hora_atencion", "duracion_turno")
+        )
+
+    def test_genera_la_agenda_y_es_idempotente(self):
+        resultado = plantilla_service.materializar(self.lunes, self.hasta)
+        self.assertEqual(resultado["creados"], 5)
+
+        media_hora = datetime.timedelta(minutes=30)
+        miercoles = self.lunes + datetime.timedelta(days=9)
+        self.assertEqual(
+            self._bloques(),
+            [
+                (self.lunes, datetime.time(8, 0), datetime.timedelta(hours=1)),
+                (self.lunes, datetime.time(9, 0), datetime.timedelta(hours=1)),
+                (miercoles, datetime.time(8, 0), media_hora),
+                (miercoles, datetime.time(8, 30), media_hora),
+                (miercoles, datetime.time(9, 0), media_hora),
+            ],
+        )
+
+        # savepoint, plantillas, bloqueo, excepciones, agenda actual y release: nada por bloque
+        with self.assertNumQueries(6):
+            resultado = plantilla_service.materializar(self.lunes, self.hasta)
+        self.assertEqual(
+            resultado,
+            {"doctores": 1, "creados": 0, "borrados": 0, "actualizados": 0, "conservados": 0, "manuales": 0},
+        )
+
+    def test_no_borra_bloques_con_turnos(self):
+        plantilla_service.materializar(self.lunes, self.hasta)
+        agenda = Agenda.objects.get(id_usuario=self.doctor, dia_atencion=self.lunes, hora_atencion=datetime.time(8, 0))
+        crear_turno(crear_mascota(self.doctor), agenda, self.pendiente)
+
+        PlantillaHorario.objects.filter(dia_semana=0).delete()
+        resultado = plantilla_service.materializar(self.lunes, self.hasta)
+
+        self.assertEqual((resultado["borrados"], resultado["conservados"]), (1, 1))
+        self.assertTrue(Agenda.objects.filter(id_agenda=agenda.id_agenda).exists())
+
+    def test_no_toca_lo_guardado_a_mano_ni_dias_pasados(self):
+        # 12:00 fuera de la plantilla y 08:00 dentro, guardadas a mano
+        agenda_service.guardar_horarios(
+            self.doctor.id_usuario, {self.lunes: {datetime.time(12, 0), datetime.time(8, 0)}}
+        )
+
+        resultado = plantilla_service.materializar(self.lunes, self.hasta)
+        self.assertEqual((resultado["creados"], resultado["borrados"], resultado["manuales"]), (4, 0, 1))
+        self.assertEqual(
+            [hora for dia, hora, _ in self._bloques() if dia == self.lunes],
+            [datetime.time(8, 0), datetime.time(9, 0), datetime.time(12, 0)],
+        )
+
+        ayer = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
+        with self.assertRaisesMessage(CommandError, "pasado"):
+            call_command("materializar_agenda", desde=ayer, dias=1)
+
+
+class GuardarHorariosTests(TestCase):
+    """agenda_service.guardar_horarios: varios días de una vez, sin tocar bloques con turnos."""
+
+    def test_guarda_varios_dias_y_conserva_los_bloques_con_turnos(self):
+        activo, pendiente = crear_estados("Activo", "Pendiente")
+        doctor = crear_usuario(crear_rol(ROLE_VETERINARIO, activo))
+        lunes = datetime.date.today() + datetime.timedelta(days=7)
+        martes = lunes + datetime.timedelta(days=1)
+        ocho, nueve, diez = datetime.time(8, 0), datetime.time(9, 0), datetime.time(10, 0)
+        con_turno, sin_turno = crear_agenda(doctor, lunes, ocho), crear_agenda(doctor, lunes, nueve)
+        crear_turno(crear_mascota(doctor), con_turno, pendiente)
+
+        # El lunes pasa a solo las 10:00 y el martes a 08:00 y 09:00, todo de una vez:
+        # savepoint, bloqueo, agenda actual, DELETE, INSERT, resultado y release
+        with self.assertNumQueries(7):
+            agendas = agenda_service.guardar_horarios(
+                doctor.id_usuario, {lunes: {diez}, martes: {ocho, nueve}}, realizado_por=7
+            )
+
+        self.assertEqual(
+            [(a.dia_atencion, a.hora_atencion) for a in agendas],
+            [(lunes, ocho), (lunes, diez), (martes, ocho), (martes, nueve)],
+        )
+        self.assertFalse(Agenda.objects.filter(id_agenda=sin_turno.id_agenda).exists())
+        self.assertIsNone(agenda_service.guardar_horarios(999999, {lunes: set()}))
+
+
+class TransicionarTurnosTests(TestCase):
+    """turno_service.transicionar_pasados: cierra los pendientes pasados por lotes y deja historial."""
+
+    def test_atendido_con_consulta_y_no_asistio_sin_ella(self):
+        activo, pendiente = crear_estados("Activo", "Pendiente")
+        doctor = crear_usuario(crear_rol(ROLE_VETERINARIO, activo))
+        mascota = crear_mascota(doctor)
+        ayer = datetime.date.today() - datetime.timedelta(days=1)
+        manana = datetime.date.today() + datetime.timedelta(days=1)
+
+        def turno(dia, hora, **extra):
+            return crear_turno(mascota, crear_agenda(doctor, dia, hora), pendiente, **extra)
+
+        atendido = turno(ayer, datetime.time(8, 0))
+        Consulta.objects.create(id_turno=atendido, diagnostico_consulta="ok")
+        faltas = [turno(ayer, datetime.time(h, 0)) for h in (9, 10)]
+        cancelado = turno(ayer, datetime.time(11, 0), fecha_cancelacion_turno=timezone.now())
+        futuro = turno(manana, datetime.time(8, 0))
+
+        # lote=1: tres lotes, cada uno en su transacción
+        resultado = turno_service.transicionar_pasados(ayer, lote=1, realizado_por=7)
+        self.assertEqual(resultado, {"atendidos": 1, "no_asistio": 2, "lotes": 3})
+
+        estados = dict(Turno.objects.values_list("id_turno", "id_estado__descripcion_estado"))
+        self.assertEqual(estados[atendido.id_turno], turno_service.ESTADO_ATENDIDO)
+        self.assertEqual({estados[t.id_turno] for t in faltas}, {turno_service.ESTADO_NO_ASISTIO})
+        self.assertEqual(estados[cancelado.id_turno], "Pendiente")
+        self.assertEqual(estados[futuro.id_turno], "Pendiente")
+        self.assertEqual(
+            sorted(HistorialTurno.objects.values_list("id_turno_id", "motivo", "realizado_por")),
+            sorted([(atendido.id_turno, "con_consulta", 7)] + [(t.id_turno, "sin_consulta", 7) for t in faltas]),
+        )
+
+        # Una segunda pasada no encuentra nada
+        self.assertEqual(
+            turno_service.transicionar_pasados(ayer), {"atendidos": 0, "no_asistio": 0, "lotes": 0}
+        )
+
+
+@override_settings(OCUPACION_CACHE_TTL=60, OCUPACION_VERIFICAR_CADA=0)
+class OcupacionCacheTests(TestCase):
+    """ocupacion_service: el día se lee una vez y los turnos lo actualizan al hacer commit."""
+
+    @classmethod
+    def setUpTestData(cls):
+        activo, cls.pendiente, cls.cancelada = crear_estados("Activo", "Pendiente", "Cancelada")
+        cls.doctor = crear_usuario(crear_rol(ROLE_VETERINARIO, activo))
+        cls.mascota = crear_mascota(cls.doctor)
+        cls.dia = datetime.date.today() + datetime.timedelta(days=3)
+        cls.agenda = crear_agenda(cls.doctor, cls.dia, datetime.time(9, 0))
+
+    def setUp(self):
+        ocupacion_service.ocupacion.limpiar()
+
+    def _ocupados(self):
+        return [b["ocupado"] for b in ocupacion_service.bloques_del_dia(self.doctor.id_usuario, self.dia)]
+
+    def test_reservar_y_cancelar_actualizan_la_cache_sin_consultas(self):
+        self.assertEqual(self._ocupados(), [False])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            turno = turno_service.crear_turno(
+                {
+                    "fecha_turno": self.dia, "hora_turno": self.agenda.hora_atencion, "id_usuario": self.doctor,
+                    "id_mascota": self.mascota, "id_agenda": self.agenda, "id_estado": self.pendiente,
+                }
+            )
+        with self.assertNumQueries(0):
+            self.assertEqual(self._ocupados(), [True])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            turno_service.cancelar_turno(turno, self.cancelada, self.doctor.id_usuario)
+        with self.assertNumQueries(0):
+            self.assertEqual(self._ocupados(), [False])
+        self.assertEqual(ocupacion_service.estadisticas_ocupacion()["actualizaciones"], 2)
+
+    def test_la_verificacion_detecta_cambios_hechos_por_fuera(self):
+        self.assertEqual(self._ocupados(), [False])
+        # Un turno que no pasa por turno_service: la cache no se entera...
+        crear_turno(self.mascota, self.agenda, self.pendiente)
+        self.assertEqual(self._ocupados(), [False])
+
+        # ...hasta que le toca verificar contra la BD
+        with self.settings(OCUPACION_VERIFICAR_CADA=1):
+            self.assertEqual(self._ocupados(), [True])
+        self.assertEqual(ocupacion_service.estadisticas_ocupacion()["inconsistencias"], 1)
+
+
+class RegistroEstadosTests(TestCase):
+    """estado_service: una consulta para todos los nombres, sinónimos incluidos, y se vacía al escribir."""
+
+    def test_resuelve_sin_consultas_y_se_invalida_al_escribir(self):
+        cancelada = Estado.objects.create(descripcion_estado="CANCELADO")
+        Estado.objects.create(descripcion_estado="Pendiente")
+
+        with self.assertNumQueries(1):
+            self.assertEqual(estado_service.estado_por_nombre(" cancelada ").id_estado, cancelada.id_estado)
+            self.assertEqual(estado_service.estado_por_nombre("Canceladó").id_estado, cancelada.id_estado)
+            self.assertEqual(estado_service.estado_por_nombre("PENDIENTE").descripcion_estado, "Pendiente")
+            self.assertIsNone(estado_service.estado_por_nombre("Entregado"))
+
+        entregado = Estado.objects.create(descripcion_estado="Entregado")
+        self.assertEqual(estado_service.estado_por_nombre("entregado").id_estado, entregado.id_estado)
+
+
+@override_settings(AUTH_USER_CACHE_TTL=0, JWT_CLAIMS_ONLY=False)
+class PaginacionCursorTests(TestCase):
+    """api.pagination: recorrer las páginas da cada fila una vez, en orden, aunque haya empates."""
+
+    @classmethod
+    def setUpTestData(cls):
+        activo, pendiente = crear_estados("Activo", "Pendiente")
+        cls.cliente = crear_usuario(crear_rol(ROLE_CLIENTE, activo))
+        mascota = crear_mascota(cls.cliente)
+        hoy = datetime.date.today()
+        # Tres días x dos horas, y tres turnos empatados en cada (día, hora)
+        for dias in range(3):
+            for hora in (datetime.time(9, 0), datetime.time(10, 0)):
+                for _ in range(3):
+                    agenda = crear_agenda(cls.cliente, hoy + datetime.timedelta(days=dias), hora)
+                    crear_turno(mascota, agenda, pendiente)
+
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        cabeceras = {"HTTP_AUTHORIZATION": f"Bearer {emitir_access_token(self.cliente)}"}
+        esperados = list(Turno.objects.order_by(*turno_service.ORDEN_TURNOS).values_list("id_turno", flat=True))
+
+        vistos, cursor, consultas = [], None, set()
+        while True:
+            parametros = {"limite": 4, **({"cursor": cursor} if cursor else {})}
+            with CaptureQueriesContext(connection) as ctx:
+                respuesta = self.client.get("/api/turnos/", parametros, **cabeceras)
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertLessEqual(len(respuesta.json()), 4)
+            vistos += [t["id_turno"] for t in respuesta.json()]
+            consultas.add(len(ctx))
+            cursor = respuesta.headers.get("X-Cursor-Siguiente")
+            if not cursor:
+                break
+
+        self.assertEqual(vistos, esperados)
+        self.assertEqual(len(consultas), 1)  # la última página cuesta lo mismo que la primera
+        self.assertEqual(
+            self.client.get("/api/turnos/", {"cursor": "no-es-un-cursor"}, **cabeceras).status_code, 400
+        )
+
+    def test_productos_se_filtran_antes_de_paginar(self):
+        cabeceras = {"HTTP_AUTHORIZATION": f"Bearer {emitir_access_token(self.cliente)}"}
+        productos = (("Croquetas", "Alimento"), ("Collar", "Accesorio"), ("Lata de croquetas", "Alimento"))
+        for nombre, categoria in productos:
+            Producto.objects.create(
+                nombre_producto=nombre, categoria_producto=categoria, precio_producto=Decimal("5.00"),
+                id_usuario=self.cliente,
+            )
+
+        respuesta = self.client.get("/api/productos/", {"q": "CROQUETA", "limite": 1}, **cabeceras)
+        self.assertEqual([p["nombre_producto"] for p in respuesta.json()], ["Lata de croquetas"])
+        self.assertTrue(respuesta.headers.get("X-Cursor-Siguiente"))
+
+        respuesta = self.client.get("/api/productos/", {"categoria": "Accesorio"}, **cabeceras)
+        self.assertEqual([p["nombre_producto"] for p in respuesta.json()], ["Collar"])
+        self.assertEqual(self.client.get("/api/productos/categorias/", **cabeceras).json(), ["Accesorio", "Alimento"])
+
+
+@override_settings(AUTH_USER_CACHE_TTL=0, JWT_CLAIMS_ONLY=False)
+class TurnosParaConsultaTests(TestCase):
+    """GET /consultas/turnos/: rango obligatorio, filtros y tiene_consulta sin una consulta por turno."""
+
+    def test_rango_filtros_y_tiene_consulta(self):
+        activo, pendiente = crear_estados("Activo", "Pendiente")
+        admin = crear_usuario(crear_rol(ROLE_ADMIN, activo))
+        mascotas = [crear_mascota(admin, n) for n in ("A", "B")]
+        hoy = datetime.date.today()
+        turnos = [
+            crear_turno(mascota, crear_agenda(admin, hoy, datetime.time(8 + i, 0)), pendiente)
+            for i, mascota in enumerate(mascotas)
+        ]
+        Consulta.objects.create(id_turno=turnos[0], diagnostico_consulta="ok")
+        cabeceras = {"HTTP_AUTHORIZATION": f"Bearer {emitir_access_token(admin)}"}
+        rango = {"desde": hoy.isoformat(), "hasta": hoy.isoformat()}
+
+        self.assertEqual(self.client.get("/api/consultas/turnos/", **cabeceras).status_code, 400)
+        with self.assertNumQueries(2):  # usuario + página
+            respuesta = self.client.get("/api/consultas/turnos/", rango, **cabeceras)
+        self.assertEqual(
+            {t["id_turno"]: t["tiene_consulta"] for t in respuesta.json()},
+            {turnos[0].id_turno: True, turnos[1].id_turno: False},
+        )
+        filtrado = self.client.get(
+            "/api/consultas/turnos/", {**rango, "mascota": mascotas[1].id_mascota}, **cabeceras
+        )
+        self.assertEqual([t["id_turno"] for t in filtrado.json()], [turnos[1].id_turno])
+
+
+@override_settings(AUTH_USER_CACHE_TTL=0, JWT_CLAIMS_ONLY=False)
+class AlcanceFilasTests(TestCase):
+    """api.scoping: lo ajeno no se lee; da 404 con una sola consulta (además de la del usuario)."""
+
+    def test_el_cliente_ve_los_turnos_de_sus_mascotas(self):
+        # Turno de la mascota de la dueña reservado por otro: lo ve la
+        # dueña (y su consulta), no quien lo reservó
+        activo, pendiente = crear_estados("Activo", "Pendiente")
+        rol_cliente = crear_rol(ROLE_CLIENTE, activo)
+        duena, otro = crear_usuario(rol_cliente), crear_usuario(rol_cliente)
+        vet = crear_usuario(crear_rol(ROLE_VETERINARIO, activo))
+        hoy = datetime.date.today()
+        turno = crear_turno(
+            crear_mascota(duena), crear_agenda(vet, hoy, datetime.time(9, 0)), pendiente, id_usuario=otro
+        )
+        Consulta.objects.create(id_turno=turno, diagnostico_consulta="ok")
+
+        def ve(usuario):
+            cabeceras = {"HTTP_AUTHORIZATION": f"Bearer {emitir_access_token(usuario)}"}
+            rango = {"desde": hoy.isoformat(), "hasta": hoy.isoformat()}
+            turnos = self.client.get("/api/consultas/turnos/", rango, **cabeceras).json()
+            consulta = self.client.get(f"/api/consultas/por-turno/{turno.id_turno}/", **cabeceras)
+            return [t["id_turno"] for t in turnos], consulta.status_code
+
+        self.assertEqual(ve(duena), ([turno.id_turno], 200))
+        self.assertEqual(ve(otro), ([], 404))
+
+    def test_ajeno_404_sin_cargar_la_fila(self):
+        activo, pendiente = crear_estados("Activo", "Pendiente")
+        rol_cliente = crear_rol(ROLE_CLIENTE, activo)
+        duena, otro = crear_usuario(rol_cliente), crear_usuario(rol_cliente)
+        vet = crear_usuario(crear_rol(ROLE_VETERINARIO, activo))
+        mascota = crear_mascota(duena, "Pipa")
+        reserva = Reserva.objects.create(id_usuario=duena, total_reserva=Decimal("5.00"), id_estado=pendiente)
+
+        def cabeceras(usuario):
+            return {"HTTP_AUTHORIZATION": f"Bearer {emitir_access_token(usuario)}"}
+
+        with self.assertNumQueries(2):
+            ajena = self.client.get(f"/api/mascotas/{mascota.id_mascota}/", **cabeceras(otro))
+        self.assertEqual(ajena.status_code, 404)
+        self.assertEqual(
+            self.client.put(
+                f"/api/mascotas/{mascota.id_mascota}/", {"nombre_mascota": "X"},
+                content_type="application/json", **cabeceras(otro),
+            ).status_code,
+            404,
+        )
+        with self.assertNumQueries(2):  # sin leer los detalles de la reserva ajena
+            factura = self.client.get(f"/api/reservas/{reserva.id_reserva}/factura/", **cabeceras(otro))
+        self.assertEqual(factura.status_code, 404)
+
+        # El veterinario ve la mascota pero no puede editarla; la dueña sí
+        self.assertEqual(self.client.get(f"/api/mascotas/{mascota.id_mascota}/", **cabeceras(vet)).status_code, 200)
+        self.assertEqual(
+            self.client.delete(f"/api/mascotas/{mascota.id_mascota}/", **cabeceras(vet)).status_code, 404
+        )
+        self.assertEqual(
+            self.client.put(
+                f"/api/mascotas/{mascota.id_mascota}/", {"nombre_mascota": "Pipa II"},
+                content_type="application/json", **cabeceras(duena),
+            ).status_code,
+            200,
+        )
+
+
+class HistoriaClinicaTests(TestCase):
+    """Historia de una mascota en orden cronológico y búsqueda de texto en español sobre las consultas."""
+
+    def test_historia_y_busqueda(self):
+        activo, pendiente = crear_estados("Activo", "Pendiente")
+        rol_cliente = crear_rol(ROLE_CLIENTE, activo)
+        duena, otro = crear_usuario(rol_cliente), crear_usuario(rol_cliente)
+        vet = crear_usuario(crear_rol(ROLE_VETERINARIO, activo), "Vet")
+        mascota = crear_mascota(duena, "Pipa")
+        dia = datetime.date(2026, 3, 2)
+        textos = ("Vómitos desde ayer", "Otitis externa", "Control: ya no vomita")
+        # Creadas en otro orden que el de los turnos: la historia va por fecha del turno
+        for offset, texto in zip((2, 0, 5), textos):
+            agenda = crear_agenda(vet, dia + datetime.timedelta(days=offset), datetime.time(9, 0))
+            Consulta.objects.create(id_turno=crear_turno(mascota, agenda, pendiente), diagnostico_consulta=texto)
+
+        def get(url, usuario):
+            return self.client.get(url, HTTP_AUTHORIZATION=f"Bearer {emitir_access_token(usuario)}")
+
+        historia = get(f"/api/mascotas/{mascota.id_mascota}/historia/?limite=2", vet)
+        self.assertEqual(historia.status_code, 200)
+        self.assertEqual(
+            [c["diagnostico_consulta"] for c in historia.json()], ["Otitis externa", "Vómitos desde ayer"]
+        )
+        self.assertEqual(historia.json()[0]["doctor_nombre"], "Vet")
+        resto = get(
+            f"/api/mascotas/{mascota.id_mascota}/historia/?limite=2&cursor={historia[CABECERA_SIGUIENTE]}", vet
+        )
+        self.assertEqual([c["diagnostico_consulta"] for c in resto.json()], ["Control: ya no vomita"])
+        self.assertEqual(get(f"/api/mascotas/{mascota.id_mascota}/historia/", otro).status_code, 404)
+
+        # "vomitar" encuentra "vómitos" y "vomita" por la raíz en español
+        encontradas = get("/api/consultas/buscar/?q=vomitar", duena)
+        self.assertEqual(
+            [c["diagnostico_consulta"] for c in encontradas.json()], ["Control: ya no vomita", "Vómitos desde ayer"]
+        )
+        self.assertEqual(get("/api/consultas/buscar/?q=vomitar", otro).json(), [])
+        self.assertEqual(get("/api/consultas/buscar/?q=v", duena).status_code, 400)
+
+
+class ExportacionTurnosTests(TestCase):
+    """Exportación CSV/NDJSON en streaming: turnos con y sin consulta, solo para el admin."""
+
+    @override_settings(EXPORTACION_LOTE=1)  # un FETCH y un bloque por fila
+    def test_csv_y_ndjson(self):
+        activo, pendiente = crear_estados("Activo", "Pendiente")
+        admin = crear_usuario(crear_rol(ROLE_ADMIN, activo))
+        vet = crear_usuario(crear_rol(ROLE_VETERINARIO, activo), "Vet")
+        mascota = crear_mascota(admin, "Ñata")
+        dia = datetime.date(2026, 3, 2)
+        for hora in (datetime.time(10, 0), datetime.time(9, 0)):
+            turno = crear_turno(mascota, crear_agenda(vet, dia, hora), pendiente)
+        Consulta.objects.create(id_turno=turno, diagnostico_consulta="Otitis, oído derecho")
+
+        def get(query, usuario):
+            return self.client.get(
+                f"/api/exportar/turnos/?desde={dia}&hasta={dia}{query}",
+                HTTP_AUTHORIZATION=f"Bearer {emitir_access_token(usuario)}",
+            )
+
+        respuesta = get("", admin)
+        self.assertTrue(respuesta.streaming)
+        self.assertIn('filename="turnos_2026-03-02_2026-03-02.csv"', respuesta["Content-Disposition"])
+        filas = list(csv.DictReader(b"".join(respuesta.streaming_content).decode("utf-8-sig").splitlines()))
+        self.assertEqual([f["hora_turno"] for f in filas], ["09:00:00", "10:00:00"])
+        self.assertEqual(filas[0]["diagnostico"], "Otitis, oído derecho")
+        self.assertEqual((filas[1]["mascota_nombre"], filas[1]["id_consulta"]), ("Ñata", ""))
+
+        respuesta = get("&formato=ndjson", admin)
+        lineas = [json.loads(l) for l in b"".join(respuesta.streaming_content).decode().splitlines()]
+        self.assertEqual([l["doctor_nombre"] for l in lineas], ["Vet", "Vet"])
+        self.assertIsNone(lineas[1]["diagnostico"])
+
+        self.assertEqual(get("", vet).status_code, 403)
+        self.assertEqual(get("&formato=xml", admin).status_code, 400)
+
+
+class CalendarioDoctorTests(TestCase):
+    """Feed .ics: token firmado y revocable, bloques y turnos del doctor, y 304 sin leerlos si no cambió."""
+
+    def test_feed_con_etag_y_304(self):
+        activo, pendiente = crear_estados("Activo", "Pendiente")
+        doctor = crear_usuario(crear_rol(ROLE_VETERINARIO, activo), "Iris", apellido="Sol")
+        mascota = crear_mascota(doctor, "Coco, el gato")
+        manana = datetime.date.today() + datetime.timedelta(days=1)
+        reservada, libre = (crear_agenda(doctor, manana, datetime.time(h, 0)) for h in (8, 9))
+        crear_turno(mascota, reservada, pendiente)
+        url = f"/api/agenda/calendario/{calendario_service.firmar(doctor)}.ics"
+
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta["Content-Type"], "text/calendar; charset=utf-8")
+        ics = respuesta.content.decode()
+        self.assertTrue(ics.startswith("BEGIN:VCALENDAR\r\n"))
+        self.assertEqual(ics.count("BEGIN:VEVENT"), 2)
+        self.assertIn("SUMMARY:Turno: Coco\\, el gato (Iris Sol)", ics)
+        self.assertIn(f"UID:agenda-{libre.id_agenda}@pozovet", ics)
+
+        # Sin cambios: 304 con solo la comprobación del token y los validadores
+        with self.assertNumQueries(2):
+            otra = self.client.get(url, HTTP_IF_NONE_MATCH=respuesta["ETag"])
+        self.assertEqual(otra.status_code, 304)
+
+        # Un bloque nuevo cambia el ETag
+        crear_agenda(doctor, manana, datetime.time(10, 0))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=respuesta["ETag"]).status_code, 200)
+        self.assertEqual(self.client.get("/api/agenda/calendario/manipulado.ics").status_code, 404)
+
+    def test_solo_el_doctor_o_un_admin_y_revocable(self):
+        activo = crear_estados("Activo")[0]
+        doctor = crear_usuario(crear_rol(ROLE_VETERINARIO, activo))
+        admin = crear_usuario(crear_rol(ROLE_ADMIN, activo))
+        recepcionista = crear_usuario(crear_rol(ROLE_RECEPCIONISTA, activo))
+        cliente = crear_usuario(crear_rol(ROLE_CLIENTE, activo))
+
+        def pedir(metodo, id_doctor, usuario):
+            return getattr(self.client, metodo)(
+                f"/api/agenda/calendario/doctor/{id_doctor}/",
+                HTTP_AUTHORIZATION=f"Bearer {emitir_access_token(usuario)}",
+            )
+
+        self.assertEqual(pedir("get", doctor.id_usuario, recepcionista).status_code, 403)
+        self.assertEqual(pedir("get", cliente.id_usuario, admin).status_code, 404)  # no es doctor
+        vieja = pedir("get", doctor.id_usuario, doctor).json()["url"]
+        self.assertEqual(self.client.get(vieja).status_code, 200)
+
+        # Revocar: la URL anterior da 404 y la nueva vale
+        nueva = pedir("post", doctor.id_usuario, admin).json()["url"]
+        self.assertEqual(self.client.get(vieja).status_code, 404)
+        self.assertEqual(self.client.get(nueva).status_code, 200)
+
+
+class ReservaTurnoConcurrenteTests(TransactionTestCase):
+    """
+    Muchas reservas a la vez del mismo bloque: el índice único parcial
+    (migración 0016) deja pasar exactamente una y el resto recibe 409.
+    TransactionTestCase: cada hilo tiene su conexión y ve los commits reales.
+    """
+
+    RESERVAS = 200
+
+    def setUp(self):
+        activo, _, _ = crear_estados("Activo", "Pendiente", "Cancelada")
+        self.cliente = crear_usuario(crear_rol(ROLE_CLIENTE, activo))
+        doctor = crear_usuario(crear_rol(ROLE_VETERINARIO, activo))
+        self.mascota = crear_mascota(self.cliente)
+        self.agenda = crear_agenda(doctor, datetime.date.today() + datetime.timedelta(days=7), datetime.time(9, 0))
+        self.cabeceras = {"HTTP_AUTHORIZATION": f"Bearer {emitir_access_token(self.cliente)}"}
+        self.cuerpo = json.dumps({
+            "id_mascota": self.mascota.id_mascota,
+            "id_agenda": self.agenda.id_agenda,
+            "fecha_turno": self.agenda.dia_atencion.isoformat(),
+            "hora_turno": "09:00",
+        })
+
+    def _reservar(self):
+        return Client(HTTP_HOST="localhost").post(
+            "/api/turnos/", self.cuerpo, content_type="application/json", **self.cabeceras
+        )
+
+    def _reservar_a_la_vez(self, n):
+        salida = threading.Barrier(n)
+        codigos = []
+        candado = threading.Lock()
+
+        def reservar():
+            try:
+                salida.wait()
+                codigo = self._reservar().status_code
+            finally:
+                connection.close()  # devuelve la conexión del hilo
+            with candado:
+                codigos.append(codigo)
+
+        hilos = [threading.Thread(target=reservar) for _ in range(n)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        return Counter(codigos)
+
+    def test_un_solo_ganador_por_bloque(self):
+        codigos = self._reservar_a_la_vez(self.RESERVAS)
+
+        self.assertEqual(codigos, Counter({201: 1, 409: self.RESERVAS - 1}))
+        self.assertEqual(Turno.objects.filter(id_agenda=self.agenda).count(), 1)
+
+    def test_cancelar_libera_el_bloque(self):
+        respuesta = self._reservar()
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(self._reservar().status_code, 409)
+
+        id_turno = respuesta.json()["id_turno"]
+        cancelada = Client(HTTP_HOST="localhost").patch(
+            f"/api/turnos/{id_turno}/cancelar/", **self.cabeceras
+        )
+        self.assertEqual(cancelada.status_code, 200)
+        self.assertIsNotNone(Turno.objects.get(id_turno=id_turno).fecha_cancelacion_turno)
+
+        disponibilidad = Client(HTTP_HOST="localhost").get(
+            f"/api/agenda/disponibilidad/{self.agenda.id_usuario_id}/",
+            {"dia": self.agenda.dia_atencion.isoformat()},
+            **self.cabeceras,
+        )
+        self.assertFalse(disponibilidad.json()[0]["ocupado"])
+        self.assertEqual(self._reservar().status_code, 201)
+
+        dia = self.agenda.dia_atencion.isoformat()
+        calendario = Client(HTTP_HOST="localhost").get(
+            "/api/agenda/disponibilidad/",
+            {"doctores": self.agenda.id_usuario_id, "desde": dia, "hasta": dia},
+            **self.cabeceras,
+        )
+        self.assertEqual(
+            calendario.json()["doctores"],
+            {str(self.agenda.id_usuario_id): {dia: [
+                {"id_agenda": self.agenda.id_agenda, "hora": "09:00", "ocupado": True}
+            ]}},
+        )
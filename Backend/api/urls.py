@@ -6,16 +6,23 @@ from .controllers.mascota_controller import mascotas_admin_create
 from .controllers.mascota_controller import mascotas_por_usuario
 from .controllers.turno_controller import turnos_list_create, turnos_del_dia
 from .controllers import reserva_controller
+from .controllers import metricas_controller
+from .controllers import plantilla_controller
+from .controllers import calendario_controller
+from .controllers import exportacion_controller
 from api.controllers.agenda_controller import (
     horarios_doctor_por_dia,
     toggle_horario_doctor,
     guardar_horarios_doctor,
-    agenda_disponibilidad_doctor
+    agenda_disponibilidad_doctor,
+    agenda_disponibilidad,
 )
 
 from .controllers.consulta_controller import (
     turnos_para_consulta,
     consulta_por_turno,
+    historia_mascota,
+    buscar_consultas,
 )
 from .controllers.turno_controller import cancelar_turno
 
@@ -58,6 +65,8 @@ urlpatterns = [
     # AUTH
     path("login/", auth_controller.login, name="login"),
     path("register/", auth_controller.register, name="register"),
+    path("logout/", auth_controller.logout, name="logout"),
+    path("token/refresh/", auth_controller.token_refresh, name="token_refresh"),
   
     #TURNOS  
     path("turnos/", turnos_list_create),
@@ -75,11 +84,28 @@ urlpatterns = [
     path("agenda/horarios/doctor/<int:id_doctor>/", horarios_doctor_por_dia),
     path("agenda/horarios/doctor/<int:id_doctor>/toggle/", toggle_horario_doctor),
     path("agenda/horarios/doctor/<int:id_doctor>/guardar/", guardar_horarios_doctor),
+    path("agenda/disponibilidad/", agenda_disponibilidad),
     path("agenda/disponibilidad/<int:doctor_id>/", agenda_disponibilidad_doctor),
 
+    # Plantillas semanales y excepciones -> Agenda (materializar)
+    path("agenda/plantillas/", plantilla_controller.plantillas_list_create),
+    path("agenda/plantillas/materializar/", plantilla_controller.materializar_plantillas),
+    path("agenda/plantillas/<int:id_plantilla>/", plantilla_controller.plantillas_detail),
+    path("agenda/excepciones/", plantilla_controller.excepciones_list_create),
+    path("agenda/excepciones/<int:id_excepcion>/", plantilla_controller.excepciones_detail),
+
+    # Feed iCalendar por doctor (token firmado en la URL, con ETag/Last-Modified)
+    path("agenda/calendario/doctor/<int:id_doctor>/", calendario_controller.calendario_doctor_token),
+    path("agenda/calendario/<str:token>.ics", calendario_controller.calendario_doctor_ics),
+
     # CONSULTAS
     path("consultas/turnos/", turnos_para_consulta),
     path("consultas/por-turno/<int:id_turno>/", consulta_por_turno),
+    path("consultas/buscar/", buscar_consultas),
+    path("mascotas/<int:pk>/historia/", historia_mascota),
+
+    # EXPORTACIONES (reportes)
+    path("exportar/turnos/", exportacion_controller.exportar_turnos),
     path("turnos/<int:id_turno>/cancelar/", cancelar_turno),
 
     #ACTIVIDADES
@@ -93,6 +119,7 @@ urlpatterns = [
     # PRODUCTOS (TIENDA)
     path("productos/", producto_controller.productos_list_create),
     path("productos/admin/", producto_controller.productos_admin_list),
+    path("productos/categorias/", producto_controller.productos_categorias),
     path("productos/<int:pk>/", producto_controller.productos_detail),
     
     # RESERVAS
@@ -102,4 +129,7 @@ urlpatterns = [
     path("reservas/<int:id_reserva>/factura/", reserva_controller.reserva_factura_pdf),
     path("reservas/<int:id_reserva>/", reserva_controller.reserva_cancelar),
 
+    # MÉTRICAS (solo admin)
+    path("metricas/", metricas_controller.metricas),
+
 ]
\ No newline at end of file
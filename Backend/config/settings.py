@@ -50,6 +50,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     "corsheaders",
     'api',
@@ -57,6 +58,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    "api.middleware.ReplicaMiddleware",
     "django.middleware.common.CommonMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -81,10 +83,15 @@ CORS_ALLOW_HEADERS = [
     "user-agent",
     "x-csrftoken",
     "x-requested-with",
+    "x-leer-primaria",
 ]
 
 CORS_ALLOW_CREDENTIALS = True
 
+# El front lee el cursor de la página siguiente de los listados y la marca
+# de lectura en la primaria tras escribir (api.db_router.CABECERA_PIN)
+CORS_EXPOSE_HEADERS = ["X-Cursor-Siguiente", "X-Leer-Primaria"]
+
 
 ROOT_URLCONF = 'config.urls'
 
@@ -120,6 +127,57 @@ DATABASES = {
     }
 }
 
+# Réplica de solo lectura (servicio db_replica de docker-compose).
+# Sin DB_REPLICA_HOST todo va a "default". En tests apunta a la misma BD.
+if os.environ.get("DB_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.environ.get("DB_REPLICA_NAME", DATABASES["default"]["NAME"]),
+        "USER": os.environ.get("DB_REPLICA_USER", DATABASES["default"]["USER"]),
+        "PASSWORD": os.environ.get("DB_REPLICA_PASSWORD", DATABASES["default"]["PASSWORD"]),
+        "HOST": os.environ.get("DB_REPLICA_HOST"),
+        "PORT": os.environ.get("DB_REPLICA_PORT", "5432"),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["api.db_router.ReplicaRouter"]
+
+# Conexiones a PostgreSQL
+# - DB_POOL=True (por defecto, requiere psycopg 3 + psycopg_pool): pool por
+#   worker con comprobación de la conexión al sacarla del pool, así un
+#   reinicio de PostgreSQL solo descarta las conexiones muertas.
+# - DB_POOL=False: conexiones persistentes DB_CONN_MAX_AGE segundos con
+#   health check al reutilizarlas (0 = una conexión nueva por request).
+try:
+    from psycopg_pool import ConnectionPool
+except ImportError:
+    ConnectionPool = None
+
+DB_POOL = os.getenv("DB_POOL", "True") == "True" and ConnectionPool is not None
+
+for _alias in DATABASES.values():
+    # Con pool, Django lo traduce en ConnectionPool(check=check_connection)
+    _alias["CONN_HEALTH_CHECKS"] = True
+    if DB_POOL:
+        _alias["OPTIONS"] = {
+            "pool": {
+                "min_size": int(os.getenv("DB_POOL_MIN", "2")),
+                "max_size": int(os.getenv("DB_POOL_MAX", "10")),
+                "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),  # espera máx. por una conexión
+                "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", "300")),  # cierra las ociosas
+                "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", "3600")),
+            }
+        }
+    else:
+        _alias["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", "60"))
+
+# Lag máximo (segundos) de la réplica; por encima las lecturas van a la primaria.
+# REPLICA_PIN_SEGUNDOS: tras escribir, el cliente lee de la primaria ese tiempo
+# (reenvía la cabecera firmada X-Leer-Primaria; no hace falta cache compartida).
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "30"))
+REPLICA_PIN_SEGUNDOS = float(os.getenv("REPLICA_PIN_SEGUNDOS", str(REPLICA_MAX_LAG)))
+REPLICA_LAG_CHECK_SEGUNDOS = float(os.getenv("REPLICA_LAG_CHECK_SEGUNDOS", "5"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -174,3 +232,75 @@ REST_FRAMEWORK = {
 ),
 }
 
+# Cache de usuarios autenticados (api.authentication)
+# TTL en segundos (0 = desactivada) y máximo de usuarios por proceso
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+AUTH_USER_CACHE_MAX = int(os.getenv("AUTH_USER_CACHE_MAX", "1024"))
+
+# Modo JWT "claims-only": el rol firmado en el token se usa sin leer Usuario.
+# Solo se valida la token_version contra un mapa en memoria que se refresca
+# cada JWT_TOKEN_VERSION_REFRESH segundos.
+JWT_CLAIMS_ONLY = os.getenv("JWT_CLAIMS_ONLY", "False") == "True"
+JWT_TOKEN_VERSION_REFRESH = int(os.getenv("JWT_TOKEN_VERSION_REFRESH", "5"))
+# Máximo de usuarios en ese mapa por proceso (LRU)
+JWT_TOKEN_VERSION_MAX = int(os.getenv("JWT_TOKEN_VERSION_MAX", "10000"))
+
+# Pool de procesos para make_password/check_password (api.services.password_service)
+# WORKERS=0 hashea en el propio hilo; con la cola llena el login responde 503
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDIENTES = int(os.getenv("PASSWORD_HASH_MAX_PENDIENTES", "16"))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+
+# Duración de los refresh tokens (rotativos) emitidos en el login
+REFRESH_TOKEN_DIAS = int(os.getenv("REFRESH_TOKEN_DIAS", "14"))
+
+# manage.py sync_replica: filas por lote de COPY, solape (segundos) de cada
+# pasada incremental y días que se guarda el registro de borrados
+REPLICA_SYNC_LOTE = int(os.getenv("REPLICA_SYNC_LOTE", "5000"))
+REPLICA_SYNC_MARGEN = int(os.getenv("REPLICA_SYNC_MARGEN", "60"))
+REPLICA_BORRADOS_RETENCION_DIAS = int(os.getenv("REPLICA_BORRADOS_RETENCION_DIAS", "7"))
+
+# /api/agenda/disponibilidad/: días máximos del rango y doctores por petición
+DISPONIBILIDAD_MAX_DIAS = int(os.getenv("DISPONIBILIDAD_MAX_DIAS", "42"))
+DISPONIBILIDAD_MAX_DOCTORES = int(os.getenv("DISPONIBILIDAD_MAX_DOCTORES", "50"))
+
+# GET /consultas/turnos/: días máximos del rango desde/hasta (obligatorio)
+CONSULTAS_MAX_DIAS = int(os.getenv("CONSULTAS_MAX_DIAS", "366"))
+
+# GET /exportar/turnos/: filas por FETCH del cursor de servidor y por bloque
+# escrito en la respuesta (la memoria depende de esto, no del rango)
+EXPORTACION_LOTE = int(os.getenv("EXPORTACION_LOTE", "2000"))
+
+# Listados paginados por cursor (api.pagination): filas por página por
+# defecto y máximo que se puede pedir con ?limite=
+PAGINA_TAMANO = int(os.getenv("PAGINA_TAMANO", "50"))
+PAGINA_MAX = int(os.getenv("PAGINA_MAX", "200"))
+
+# Registro de Estados por proceso (api.services.estado_service): cada cuántos
+# segundos se relee aunque nadie lo haya invalidado (cambios de otro worker)
+ESTADOS_CACHE_TTL = int(os.getenv("ESTADOS_CACHE_TTL", "300"))
+
+# Cache de ocupación de la agenda por (doctor, día) (api.services.ocupacion_service)
+# TTL en segundos (0 = desactivada), máximo de días por proceso y cada cuántos
+# aciertos se vuelve a comparar una entrada con la BD (0 = nunca)
+OCUPACION_CACHE_TTL = int(os.getenv("OCUPACION_CACHE_TTL", "30"))
+OCUPACION_CACHE_MAX = int(os.getenv("OCUPACION_CACHE_MAX", "4096"))
+OCUPACION_VERIFICAR_CADA = int(os.getenv("OCUPACION_VERIFICAR_CADA", "200"))
+
+# Días distintos que acepta de una vez POST /agenda/horarios/doctor/<id>/guardar/
+HORARIOS_MAX_DIAS = int(os.getenv("HORARIOS_MAX_DIAS", "366"))
+
+# Días máximos que materializa de una vez POST /agenda/plantillas/materializar/
+# (y el comando materializar_agenda con --dias)
+PLANTILLA_MAX_DIAS = int(os.getenv("PLANTILLA_MAX_DIAS", "366"))
+
+# Feed .ics por doctor (api.services.calendario_service): días de validez del
+# token de la URL, ventana que cubre (hacia atrás y hacia adelante desde hoy),
+# zona horaria de las horas de la agenda, cada cuánto se sugiere al cliente
+# volver a pedirlo (REFRESH-INTERVAL) y max-age de la respuesta HTTP
+CALENDARIO_TOKEN_DIAS = int(os.getenv("CALENDARIO_TOKEN_DIAS", "365"))
+CALENDARIO_DIAS_ATRAS = int(os.getenv("CALENDARIO_DIAS_ATRAS", "7"))
+CALENDARIO_DIAS_ADELANTE = int(os.getenv("CALENDARIO_DIAS_ADELANTE", "60"))
+CALENDARIO_ZONA_HORARIA = os.getenv("CALENDARIO_ZONA_HORARIA", "America/Guayaquil")
+CALENDARIO_REFRESCO_MINUTOS = int(os.getenv("CALENDARIO_REFRESCO_MINUTOS", "15"))
+CALENDARIO_MAX_AGE = int(os.getenv("CALENDARIO_MAX_AGE", "60"))
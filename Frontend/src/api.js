@@ -10,4 +10,116 @@ if (token) {
   api.defaults.headers.common["Authorization"] = `Bearer ${token}`;
 }
 
+// Lectura de lo propio: tras una escritura el backend responde con
+// X-Leer-Primaria (firmada, caduca sola). Se reenvía en las peticiones
+// siguientes para que los listados salgan de la BD primaria y no de una
+// réplica que todavía no tiene el cambio.
+const MARCA_PRIMARIA = "leerPrimaria";
+
+api.interceptors.request.use((config) => {
+  const marca = localStorage.getItem(MARCA_PRIMARIA);
+  if (marca) {
+    config.headers["X-Leer-Primaria"] = marca;
+  }
+  return config;
+});
+
+const guardarMarcaPrimaria = (response) => {
+  const marca = response?.headers?.["x-leer-primaria"];
+  if (marca) {
+    localStorage.setItem(MARCA_PRIMARIA, marca);
+  }
+};
+
+// Renovación del access token con el refresh token (sin volver a loguear).
+// Si varias peticiones reciben 401 a la vez, se hace UN solo refresh.
+let renovando = null;
+
+const renovarToken = async () => {
+  const refresh = localStorage.getItem("refresh");
+  if (!refresh) {
+    throw new Error("No hay refresh token");
+  }
+
+  const { data } = await axios.post(
+    `${import.meta.env.VITE_API_URL}/token/refresh/`,
+    { refresh }
+  );
+
+  localStorage.setItem("token", data.access);
+  localStorage.setItem("refresh", data.refresh);
+  api.defaults.headers.common["Authorization"] = `Bearer ${data.access}`;
+  return data.access;
+};
+
+api.interceptors.response.use(
+  (response) => {
+    guardarMarcaPrimaria(response);
+    return response;
+  },
+  async (error) => {
+    guardarMarcaPrimaria(error.response);
+    const original = error.config;
+    const url = original?.url || "";
+
+    if (
+      error.response?.status !== 401 ||
+      !original ||
+      original._reintento ||
+      url.includes("/login/") ||
+      url.includes("/token/refresh/")
+    ) {
+      return Promise.reject(error);
+    }
+
+    original._reintento = true;
+
+    try {
+      if (!renovando) {
+        renovando = renovarToken().finally(() => {
+          renovando = null;
+        });
+      }
+      const access = await renovando;
+      original.headers["Authorization"] = `Bearer ${access}`;
+      return api(original);
+    } catch {
+      // Refresh inválido o expirado: sesión terminada
+      localStorage.removeItem("token");
+      localStorage.removeItem("refresh");
+      localStorage.removeItem("usuario");
+      delete api.defaults.headers.common["Authorization"];
+      window.location.href = "/login";
+      return Promise.reject(error);
+    }
+  }
+);
+
+// Listados paginados por cursor: el backend devuelve la página como lista y,
+// si hay más, el cursor de la siguiente en la cabecera X-Cursor-Siguiente.
+export const cargarPagina = async (url, { params, cursor } = {}) => {
+  const res = await api.get(url, {
+    params: { ...params, ...(cursor ? { cursor } : {}) },
+  });
+  return { datos: res.data || [], siguiente: res.headers["x-cursor-siguiente"] || null };
+};
+
+// Mensaje de un error de la API: las vistas responden {"error": ...} y los
+// permisos de DRF (api/permissions.py) y validaciones {"detail": ...}.
+export const mensajeError = (err, porDefecto) =>
+  err?.response?.data?.error || err?.response?.data?.detail || porDefecto;
+
+// GET /consultas/turnos/ exige un rango desde/hasta (como mucho 366 días).
+// Por defecto: los últimos 9 meses y los próximos 3, en fecha local.
+const fechaLocal = (d) =>
+  `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, "0")}-${String(d.getDate()).padStart(2, "0")}`;
+
+export const ventanaTurnos = (diasAtras = 270, diasAdelante = 90) => {
+  const desde = new Date();
+  desde.setDate(desde.getDate() - diasAtras);
+  const hasta = new Date();
+  hasta.setDate(hasta.getDate() + diasAdelante);
+  return { desde: fechaLocal(desde), hasta: fechaLocal(hasta) };
+};
+
 export default api;
@@ -1,5 +1,5 @@
 import { useState } from "react";
-import api from "../api";
+import api, { mensajeError } from "../api";
 import { useCart } from "../context/CartContext";
 import "./CartModal.css";
 
@@ -49,10 +49,7 @@ const CartModal = () => {
       clearCart();
     } catch (err) {
       console.error(err);
-      const detail =
-        err?.response?.data?.detail ||
-        "No se pudo confirmar la reserva. Revisa stock/campos.";
-      setMsgError(detail);
+      setMsgError(mensajeError(err, "No se pudo confirmar la reserva. Revisa stock/campos."));
     } finally {
       setConfirming(false);
     }
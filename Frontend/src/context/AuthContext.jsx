@@ -1,5 +1,5 @@
 import { createContext, useContext, useEffect, useState } from "react";
-import api from "../api";
+import api, { mensajeError } from "../api";
 
 const AuthContext = createContext();
 
@@ -45,6 +45,7 @@ const updateUsuario = (nuevoUsuario) => {
 
       // Guardar en localStorage
       localStorage.setItem("token", accessToken);
+      localStorage.setItem("refresh", data.refresh);
       localStorage.setItem("usuario", JSON.stringify(userData));
 
       // Configurar header por defecto
@@ -55,9 +56,7 @@ const updateUsuario = (nuevoUsuario) => {
       console.error(error);
       return {
         ok: false,
-        mensaje:
-          error.response?.data?.detail ||
-          "Error al iniciar sesión. Revisa tus credenciales.",
+        mensaje: mensajeError(error, "Error al iniciar sesión. Revisa tus credenciales."),
       };
     }
   };
@@ -78,9 +77,20 @@ const updateUsuario = (nuevoUsuario) => {
   };
 
   const logout = () => {
+    // Revoca los tokens en el backend (si falla, igual cerramos sesión local)
+    const tokenActual = localStorage.getItem("token");
+    if (tokenActual) {
+      api
+        .post("/logout/", null, {
+          headers: { Authorization: `Bearer ${tokenActual}` },
+        })
+        .catch(() => {});
+    }
+
     setToken(null);
     setUsuario(null);
     localStorage.removeItem("token");
+    localStorage.removeItem("refresh");
     localStorage.removeItem("usuario");
     delete api.defaults.headers.common["Authorization"];
   };
@@ -1,5 +1,5 @@
 import { useEffect, useState } from "react";
-import api from "../api";
+import api, { cargarPagina, mensajeError, ventanaTurnos } from "../api";
 import Navbar from "../components/Navbar";
 import Footer from "../components/Footer";
 import "../styles/ConsultasAdmin.css";
@@ -15,6 +15,7 @@ const ConsultasAdminPage = () => {
   const [turnos, setTurnos] = useState([]);
   const [filteredTurnos, setFilteredTurnos] = useState([]);
   const [loadingTurnos, setLoadingTurnos] = useState(false);
+  const [siguienteTurnos, setSiguienteTurnos] = useState(null); // cursor de la página siguiente
   const [turnosError, setTurnosError] = useState("");
 
   // Modal y consulta
@@ -52,12 +53,23 @@ const ConsultasAdminPage = () => {
     cargarDoctores();
   }, []);
 
+  // Doctor y fecha se filtran en el backend (con índice); sin fecha, la
+  // ventana por defecto. El estado se sigue filtrando aquí: "pendiente" y
+  // "atendido" dependen de si el turno tiene consulta.
+  const filtrosTurnos = () => ({
+    ...(selectedDate ? { desde: selectedDate, hasta: selectedDate } : ventanaTurnos()),
+    ...(selectedDoctorId ? { doctor: selectedDoctorId } : {}),
+  });
+
   const cargarTurnos = async () => {
     try {
       setLoadingTurnos(true);
       setTurnosError("");
-      const res = await api.get("/consultas/turnos/");
-      setTurnos(res.data || []);
+      const { datos, siguiente } = await cargarPagina("/consultas/turnos/", {
+        params: filtrosTurnos(),
+      });
+      setTurnos(datos);
+      setSiguienteTurnos(siguiente);
     } catch (err) {
       console.error(err);
       setTurnosError("No se pudieron cargar los turnos.");
@@ -66,33 +78,32 @@ const ConsultasAdminPage = () => {
     }
   };
 
+  // Siguiente página de turnos (más antiguos)
+  const cargarMasTurnos = async () => {
+    try {
+      setLoadingTurnos(true);
+      const { datos, siguiente } = await cargarPagina("/consultas/turnos/", {
+        params: filtrosTurnos(),
+        cursor: siguienteTurnos,
+      });
+      setTurnos((prev) => [...prev, ...datos]);
+      setSiguienteTurnos(siguiente);
+    } catch (err) {
+      console.error(err);
+      setTurnosError("No se pudieron cargar más turnos.");
+    } finally {
+      setLoadingTurnos(false);
+    }
+  };
+
   useEffect(() => {
     cargarTurnos();
-  }, []);
+  }, [selectedDoctorId, selectedDate]);
 
-  // Aplicar filtros combinados cuando cambien los filtros
+  // Aplicar el filtro de estado cuando cambien los turnos o el filtro
   useEffect(() => {
     let result = [...turnos];
 
-    // Filtrar por doctor - busco por nombre y apellido si no hay id_doctor
-    if (selectedDoctorId) {
-      const doctorSeleccionado = doctores.find(d => d.id_usuario == selectedDoctorId);
-      if (doctorSeleccionado) {
-        result = result.filter(turno => {
-          // Intento varias formas de encontrar el doctor en el turno
-          const doctorNombreCompleto = `${turno.doctor_nombre || ""} ${turno.doctor_apellido || ""}`.toLowerCase().trim();
-          const doctorBusqueda = `${doctorSeleccionado.nombre || ""} ${doctorSeleccionado.apellido || ""}`.toLowerCase().trim();
-          
-          return doctorNombreCompleto === doctorBusqueda;
-        });
-      }
-    }
-
-    // Filtrar por fecha
-    if (selectedDate) {
-      result = result.filter(turno => turno.fecha_turno === selectedDate);
-    }
-
     // Filtrar por estado del turno
     if (selectedEstado && selectedEstado !== "todos") {
       result = result.filter(turno => {
@@ -111,7 +122,7 @@ const ConsultasAdminPage = () => {
     }
 
     setFilteredTurnos(result);
-  }, [turnos, selectedDoctorId, selectedDate, selectedEstado, doctores]);
+  }, [turnos, selectedEstado]);
 
   const abrirModalConsulta = async (turno) => {
     setSelectedTurno(turno);
@@ -213,7 +224,7 @@ const ConsultasAdminPage = () => {
       );
     } catch (err) {
       console.error(err);
-      setConsultaError(err?.response?.data?.error || "No se pudo cancelar el turno.");
+      setConsultaError(mensajeError(err, "No se pudo cancelar el turno."));
     } finally {
       setLoadingConsulta(false);
       setIsConfirmCancelOpen(false);
@@ -430,6 +441,16 @@ const ConsultasAdminPage = () => {
               );
             })}
           </div>
+
+          {!loadingTurnos && siguienteTurnos && (
+            <button
+              type="button"
+              onClick={cargarMasTurnos}
+              className="cp-btn cp-btn-outline"
+            >
+              Cargar más turnos
+            </button>
+          )}
         </section>
       </main>
 
@@ -3,14 +3,27 @@ import { useEffect, useState } from "react";
 import Navbar from "../components/Navbar";
 import Footer from "../components/Footer";
 import "../styles/Dashboard.css";
-import api from "../api";
+import api, { cargarPagina, mensajeError, ventanaTurnos } from "../api";
 import { useAuth } from "../context/AuthContext";
 
+// Días de disponibilidad que se piden de una vez al elegir fecha
+const DIAS_DISPONIBILIDAD = 14;
+
+// "YYYY-MM-DD" + n días, en hora local (toISOString cambiaría el día según la zona)
+const sumarDias = (dia, n) => {
+  const d = new Date(`${dia}T00:00:00`);
+  d.setDate(d.getDate() + n);
+  const mm = String(d.getMonth() + 1).padStart(2, "0");
+  const dd = String(d.getDate()).padStart(2, "0");
+  return `${d.getFullYear()}-${mm}-${dd}`;
+};
+
 const DashboardPage = () => {
   const { usuario } = useAuth();
 
   const [mascotas, setMascotas] = useState([]);
   const [turnos, setTurnos] = useState([]);
+  const [siguienteTurnos, setSiguienteTurnos] = useState(null); // cursor de la página siguiente
 
   // Modal turnos
   const [isTurnoModalOpen, setIsTurnoModalOpen] = useState(false);
@@ -26,6 +39,9 @@ const DashboardPage = () => {
 
   const [slots, setSlots] = useState([]);
   const [loadingSlots, setLoadingSlots] = useState(false);
+  // Disponibilidad de todos los doctores de la actividad para varios días
+  // { idActividad, desde, hasta, doctores: { id_doctor: { dia: [bloques] } } }
+  const [disponibilidad, setDisponibilidad] = useState(null);
 
   const [selectedAgendaId, setSelectedAgendaId] = useState(null);
   const [selectedHora, setSelectedHora] = useState("");
@@ -96,8 +112,25 @@ const getUserRoleId = () => {
 
   const fetchTurnos = async () => {
     try {
-      const { data } = await api.get("/consultas/turnos/");
-      setTurnos(data || []);
+      const { datos, siguiente } = await cargarPagina("/consultas/turnos/", {
+        params: ventanaTurnos(),
+      });
+      setTurnos(datos);
+      setSiguienteTurnos(siguiente);
+    } catch (error) {
+      console.error("Error al obtener turnos", error);
+    }
+  };
+
+  // Citas más antiguas del historial (siguiente página)
+  const cargarMasTurnos = async () => {
+    try {
+      const { datos, siguiente } = await cargarPagina("/consultas/turnos/", {
+        params: ventanaTurnos(),
+        cursor: siguienteTurnos,
+      });
+      setTurnos((prev) => [...prev, ...datos]);
+      setSiguienteTurnos(siguiente);
     } catch (error) {
       console.error("Error al obtener turnos", error);
     }
@@ -162,7 +195,7 @@ const confirmarEliminarMascota = async () => {
   } catch (err) {
     console.error(err);
     setDeleteMascotaError(
-      err?.response?.data?.detail || "No se pudo eliminar la mascota."
+      mensajeError(err, "No se pudo eliminar la mascota.")
     );
   } finally {
     setDeletingMascota(false);
@@ -227,6 +260,7 @@ const confirmarEliminarMascota = async () => {
     setSelectedHora("");
     setSelectedDoctor(null);
     setSlots([]);
+    setDisponibilidad(null);
     setDoctoresDisponibles([]);
 
     setNuevoTurno({
@@ -255,6 +289,7 @@ const confirmarEliminarMascota = async () => {
     setTurnoError("");
     setSavingTurno(false);
     setSlots([]);
+    setDisponibilidad(null);
     setDoctoresDisponibles([]);
     setSelectedAgendaId(null);
     setSelectedHora("");
@@ -282,6 +317,7 @@ const confirmarEliminarMascota = async () => {
     // Resetear selecciones anteriores
     setDoctoresDisponibles([]);
     setSlots([]);
+    setDisponibilidad(null);
     setSelectedAgendaId(null);
     setSelectedHora("");
     setSelectedDoctor(null);
@@ -320,38 +356,57 @@ const confirmarEliminarMascota = async () => {
     setSlots([]);
     setSelectedAgendaId(null);
     setSelectedHora("");
-    
-    // Si ya hay fecha seleccionada, cargar slots
-    if (nuevoTurno.dia) {
-      cargarSlotsPorDoctor(doctor.id_usuario, nuevoTurno.dia);
-    }
+    // Los slots los carga el efecto de abajo (cambia selectedDoctor)
   };
 
   // ✅ Cargar slots por doctor y fecha
-  const cargarSlotsPorDoctor = async (idDoctor, dia) => {
+  // Una sola petición trae DIAS_DISPONIBILIDAD días de todos los doctores de la
+  // actividad: cambiar de doctor o de día dentro del rango no vuelve a pedir nada
+  const cargarSlotsPorDoctor = async (idDoctor, dia, forzar = false) => {
     if (!idDoctor || !dia) return;
-    
-    setLoadingSlots(true);
-    try {
-      const { data } = await api.get(
-        `/agenda/disponibilidad/${idDoctor}/`,
-        { params: { dia } }
-      );
-
-      const mapped = (data || []).map((a) => ({
-        id_agenda: a.id_agenda,
-        hora: (a.hora_atencion || a.hora || "").slice(0, 5),
-        ocupado: Boolean(a.ocupado),
-        id_doctor: idDoctor,
-      }));
 
-      setSlots(mapped);
-    } catch (err) {
-      console.error(err);
-      setTurnoError("No se pudieron cargar las horas disponibles.");
-    } finally {
-      setLoadingSlots(false);
+    let cache = disponibilidad;
+    const enCache =
+      cache &&
+      cache.idActividad === nuevoTurno.id_actividad &&
+      cache.desde <= dia &&
+      dia <= cache.hasta;
+
+    if (!enCache || forzar) {
+      setLoadingSlots(true);
+      try {
+        const { data } = await api.get("/agenda/disponibilidad/", {
+          params: {
+            id_actividad: nuevoTurno.id_actividad,
+            desde: dia,
+            hasta: sumarDias(dia, DIAS_DISPONIBILIDAD - 1),
+          },
+        });
+        cache = {
+          idActividad: nuevoTurno.id_actividad,
+          desde: data.desde,
+          hasta: data.hasta,
+          doctores: data.doctores || {},
+        };
+        setDisponibilidad(cache);
+      } catch (err) {
+        console.error(err);
+        setTurnoError("No se pudieron cargar las horas disponibles.");
+        return;
+      } finally {
+        setLoadingSlots(false);
+      }
     }
+
+    const bloques = cache.doctores[String(idDoctor)]?.[dia] || [];
+    setSlots(
+      bloques.map((b) => ({
+        id_agenda: b.id_agenda,
+        hora: b.hora,
+        ocupado: Boolean(b.ocupado),
+        id_doctor: idDoctor,
+      }))
+    );
   };
 
   // Efecto para cargar slots cuando cambia la fecha
@@ -400,11 +455,14 @@ const confirmarEliminarMascota = async () => {
       fetchTurnos();
     } catch (err) {
       console.error(err);
-      const msg =
-        err?.response?.data?.error ||
-        err?.response?.data?.detail ||
-        "No se pudo agendar la cita.";
+      const msg = mensajeError(err, "No se pudo agendar la cita.");
       setTurnoError(msg);
+      // 409: otra persona tomó el bloque; refrescar la disponibilidad
+      if (err?.response?.status === 409) {
+        setSelectedAgendaId(null);
+        setSelectedHora("");
+        cargarSlotsPorDoctor(selectedDoctor.id_usuario, nuevoTurno.dia, true);
+      }
     } finally {
       setSavingTurno(false);
     }
@@ -843,6 +901,11 @@ const confirmarEliminarMascota = async () => {
             )}
 
             <div className="dash-form-actions">
+              {siguienteTurnos && (
+                <button type="button" className="dash-btn dash-btn-outline" onClick={cargarMasTurnos}>
+                  Cargar más
+                </button>
+              )}
               <button
                 type="button"
                 className="dash-btn dash-btn-outline"
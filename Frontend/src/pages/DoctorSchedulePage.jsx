@@ -1,5 +1,5 @@
 import { useEffect, useState } from "react";
-import api from "../api";
+import api, { mensajeError } from "../api";
 import Navbar from "../components/Navbar";
 import Footer from "../components/Footer";
 import { useAuth } from "../context/AuthContext";
@@ -140,6 +140,27 @@ const esFechaPasada = Boolean(selectedDate && selectedDate < hoyStr);
     );
   };
 
+  // 🔹 Copiar la URL del calendario (.ics) del doctor para suscribirse desde
+  // Google Calendar / Outlook / el móvil, en vez de tener esta página abierta
+  // Solo el propio doctor o un admin. `nueva`: revoca las URLs copiadas antes
+  // (p. ej. si se compartió por error) y copia una nueva.
+  const handleCopiarCalendario = async (nueva = false) => {
+    if (!selectedDoctorId) return;
+    try {
+      setScheduleError("");
+      const url = `/agenda/calendario/doctor/${selectedDoctorId}/`;
+      const res = nueva ? await api.post(url) : await api.get(url);
+      await navigator.clipboard.writeText(res.data.url);
+      setInfoMessage(
+        (nueva ? "Las URLs anteriores ya no funcionan. " : "") +
+          "URL del calendario copiada. Añádela en tu app de calendario como 'suscribirse por URL'."
+      );
+    } catch (err) {
+      console.error(err);
+      setScheduleError(mensajeError(err, "No se pudo obtener la URL del calendario."));
+    }
+  };
+
   // 🔹 Guardar agenda: ahora sí se envía todo al backend
   const handleGuardarAgenda = async () => {
     if (!canShowSchedule) return;
@@ -229,6 +250,22 @@ const esFechaPasada = Boolean(selectedDate && selectedDate < hoyStr);
               {loadingDoctores && (
                 <p className="schedule-info">Cargando doctores...</p>
               )}
+              <button
+                type="button"
+                className="schedule-save-btn schedule-calendar-btn"
+                onClick={() => handleCopiarCalendario()}
+                disabled={!selectedDoctorId}
+              >
+                Copiar URL del calendario
+              </button>
+              <button
+                type="button"
+                className="schedule-save-btn schedule-calendar-btn"
+                onClick={() => handleCopiarCalendario(true)}
+                disabled={!selectedDoctorId}
+              >
+                Nueva URL (anula la anterior)
+              </button>
             </div>
 
             <div className="schedule-filter-block">
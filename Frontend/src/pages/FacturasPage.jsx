@@ -1,7 +1,7 @@
 import { useEffect, useMemo, useState } from "react";
 import Navbar from "../components/Navbar";
 import Footer from "../components/Footer";
-import api from "../api";
+import api, { cargarPagina, mensajeError } from "../api";
 import { useAuth } from "../context/AuthContext";
 import "../styles/Facturas.css";
 
@@ -17,6 +17,8 @@ const FacturasPage = () => {
   const canManageAll = Number(roleId) === ROLE_ADMIN || Number(roleId) === ROLE_RECEPCIONISTA;
 
   const [reservas, setReservas] = useState([]);
+  const [siguiente, setSiguiente] = useState(null); // cursor de la página siguiente
+  const [cargandoMas, setCargandoMas] = useState(false);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState("");
 
@@ -29,16 +31,18 @@ const FacturasPage = () => {
   const [canceling, setCanceling] = useState(false);
   const [cancelError, setCancelError] = useState("");
 
+  const urlReservas = canManageAll ? "/reservas/admin/" : "/reservas/";
+
   const fetchReservas = async () => {
     try {
       setLoading(true);
       setError("");
 
-      const url = canManageAll ? "/reservas/admin/" : "/reservas/";
-      const config = canManageAll && q ? { params: { q } } : undefined;
-
-      const { data } = await api.get(url, config);
-      setReservas(data || []);
+      const { datos, siguiente } = await cargarPagina(urlReservas, {
+        params: canManageAll && q ? { q } : undefined,
+      });
+      setReservas(datos);
+      setSiguiente(siguiente);
     } catch (e) {
       console.error(e);
       setError("No se pudieron cargar las reservas.");
@@ -47,6 +51,24 @@ const FacturasPage = () => {
     }
   };
 
+  // ✅ Siguiente página (más antiguas), con la misma búsqueda
+  const cargarMas = async () => {
+    try {
+      setCargandoMas(true);
+      const { datos, siguiente: otra } = await cargarPagina(urlReservas, {
+        params: canManageAll && q ? { q } : undefined,
+        cursor: siguiente,
+      });
+      setReservas((prev) => [...prev, ...datos]);
+      setSiguiente(otra);
+    } catch (e) {
+      console.error(e);
+      setError("No se pudieron cargar más reservas.");
+    } finally {
+      setCargandoMas(false);
+    }
+  };
+
   useEffect(() => {
     fetchReservas();
     // eslint-disable-next-line react-hooks/exhaustive-deps
@@ -70,7 +92,7 @@ const FacturasPage = () => {
       await fetchReservas();
     } catch (e) {
       console.error(e);
-      alert(e?.response?.data?.detail || "No se pudo cambiar el estado.");
+      alert(mensajeError(e, "No se pudo cambiar el estado."));
     }
   };
 
@@ -101,7 +123,7 @@ const FacturasPage = () => {
       await fetchReservas();
     } catch (e) {
       console.error(e);
-      setCancelError(e?.response?.data?.detail || "No se pudo cancelar.");
+      setCancelError(mensajeError(e, "No se pudo cancelar."));
     } finally {
       setCanceling(false);
     }
@@ -124,7 +146,7 @@ const FacturasPage = () => {
       window.URL.revokeObjectURL(url);
     } catch (e) {
       console.error(e);
-      alert(e?.response?.data?.detail || "No se pudo generar la factura.");
+      alert(mensajeError(e, "No se pudo generar la factura."));
     }
   };
 
@@ -255,6 +277,14 @@ const FacturasPage = () => {
             </div>
           )}
 
+          {!loading && !error && siguiente && (
+            <div className="fac-actions">
+              <button className="fac-btn-outline" onClick={cargarMas} disabled={cargandoMas}>
+                {cargandoMas ? "Cargando..." : "Cargar más"}
+              </button>
+            </div>
+          )}
+
           {selected && (
             <div className="fac-modal-backdrop" onClick={() => setSelected(null)}>
               <div className="fac-modal" onClick={(e) => e.stopPropagation()}>
@@ -1,8 +1,8 @@
 // Frontend/src/pages/StorePage.jsx
-import { useEffect, useMemo, useState } from "react";
+import { useEffect, useState } from "react";
 import Navbar from "../components/Navbar";
 import Footer from "../components/Footer";
-import api from "../api";
+import api, { cargarPagina, mensajeError } from "../api";
 import { useAuth } from "../context/AuthContext";
 import { useCart } from "../context/CartContext";
 import "../styles/Store.css";
@@ -28,9 +28,13 @@ const canManageProducts = [ROLE_ADMIN, ROLE_RECEPCIONISTA].includes(Number(roleI
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState("");
 
-  // filtros
+  const [siguiente, setSiguiente] = useState(null); // cursor de la página siguiente
+  const [cargandoMas, setCargandoMas] = useState(false);
+
+  // filtros (se aplican en el backend)
   const [q, setQ] = useState("");
   const [cat, setCat] = useState("");
+  const [categorias, setCategorias] = useState([]);
 
   // modal crear
   const [isCreateOpen, setIsCreateOpen] = useState(false);
@@ -88,13 +92,23 @@ const canManageProducts = [ROLE_ADMIN, ROLE_RECEPCIONISTA].includes(Number(roleI
     return stock > 0 ? "store-badge-available" : "store-badge-soldout";
   };
 
+  // La búsqueda y la categoría van al backend: /productos/ filtra antes de
+  // paginar, así que solo se baja la primera página de lo que coincide
+  const filtrosProductos = () => ({
+    ...(q.trim() ? { q: q.trim() } : {}),
+    ...(cat ? { categoria: cat } : {}),
+  });
+
   const fetchProductos = async () => {
     try {
       setLoading(true);
       setError("");
-      const endpoint = canManageProducts ? "/productos/admin/" : "/productos/";
-      const { data } = await api.get(endpoint);
-      setProductos(data || []);
+      const { datos, siguiente } = await cargarPagina("/productos/", { params: filtrosProductos() });
+      setProductos(datos);
+      setSiguiente(siguiente);
+      // Una alta o edición puede traer una categoría nueva
+      const res = await api.get("/productos/categorias/");
+      setCategorias(res.data || []);
     } catch (e) {
       console.error(e);
       setError("No se pudieron cargar los productos.");
@@ -103,10 +117,30 @@ const canManageProducts = [ROLE_ADMIN, ROLE_RECEPCIONISTA].includes(Number(roleI
     }
   };
 
+  // ✅ Siguiente página, con los mismos filtros
+  const cargarMas = async () => {
+    try {
+      setCargandoMas(true);
+      const { datos, siguiente: otra } = await cargarPagina("/productos/", {
+        params: filtrosProductos(),
+        cursor: siguiente,
+      });
+      setProductos((prev) => [...prev, ...datos]);
+      setSiguiente(otra);
+    } catch (e) {
+      console.error(e);
+      setError("No se pudieron cargar más productos.");
+    } finally {
+      setCargandoMas(false);
+    }
+  };
+
+  // Se espera a que el usuario deje de escribir para no pedir por cada tecla
   useEffect(() => {
-    fetchProductos();
+    const t = setTimeout(fetchProductos, 300);
+    return () => clearTimeout(t);
     // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [canManageProducts]);
+  }, [q, cat]);
 
   // limpiar preview al desmontar / cambiar
   useEffect(() => {
@@ -116,28 +150,6 @@ const canManageProducts = [ROLE_ADMIN, ROLE_RECEPCIONISTA].includes(Number(roleI
     };
   }, [imgPreview, editImgPreview]);
 
-  const categorias = useMemo(() => {
-    const setCats = new Set();
-    (productos || []).forEach((p) => {
-      if (p.categoria_producto) setCats.add(p.categoria_producto);
-    });
-    return Array.from(setCats).sort();
-  }, [productos]);
-
-  const filtrados = useMemo(() => {
-    const query = (q || "").trim().toLowerCase();
-
-    return (productos || []).filter((p) => {
-      const okQ =
-        !query ||
-        (p.nombre_producto || "").toLowerCase().includes(query) ||
-        (p.descripcion_producto || "").toLowerCase().includes(query);
-
-      const okCat = !cat || p.categoria_producto === cat;
-      return okQ && okCat;
-    });
-  }, [productos, q, cat]);
-
   // =========================
   // Modal crear producto
   // =========================
@@ -231,7 +243,7 @@ const canManageProducts = [ROLE_ADMIN, ROLE_RECEPCIONISTA].includes(Number(roleI
     } catch (err) {
       console.error(err);
       const msg =
-        err?.response?.data?.detail ||
+        mensajeError(err) ||
         JSON.stringify(err?.response?.data || {}) ||
         "No se pudo crear el producto. Revisa los campos.";
       setCreateError(msg);
@@ -318,7 +330,7 @@ const canManageProducts = [ROLE_ADMIN, ROLE_RECEPCIONISTA].includes(Number(roleI
     } catch (err) {
       console.error(err);
       const msg =
-        err?.response?.data?.detail ||
+        mensajeError(err) ||
         JSON.stringify(err?.response?.data || {}) ||
         "No se pudo actualizar el producto.";
       setEditError(msg);
@@ -356,7 +368,7 @@ const canManageProducts = [ROLE_ADMIN, ROLE_RECEPCIONISTA].includes(Number(roleI
     } catch (err) {
       console.error(err);
       const msg =
-        err?.response?.data?.detail ||
+        mensajeError(err) ||
         JSON.stringify(err?.response?.data || {}) ||
         "No se pudo eliminar el producto.";
       setDeleteError(msg);
@@ -404,12 +416,12 @@ const canManageProducts = [ROLE_ADMIN, ROLE_RECEPCIONISTA].includes(Number(roleI
           {loading && <p className="store-info">Cargando productos...</p>}
           {error && <p className="store-error">{error}</p>}
 
-          {!loading && !error && filtrados.length === 0 && (
+          {!loading && !error && productos.length === 0 && (
             <p className="store-info">No hay productos disponibles.</p>
           )}
 
           <div className="store-grid">
-            {filtrados.map((p) => (
+            {productos.map((p) => (
               <article key={p.id_producto} className="store-card">
                 <div className="store-imgwrap">
                   <img
@@ -490,6 +502,14 @@ const canManageProducts = [ROLE_ADMIN, ROLE_RECEPCIONISTA].includes(Number(roleI
               </article>
             ))}
           </div>
+
+          {!loading && !error && siguiente && (
+            <div className="store-more">
+              <button type="button" className="store-admin-btn" onClick={cargarMas} disabled={cargandoMas}>
+                {cargandoMas ? "Cargando..." : "Cargar más"}
+              </button>
+            </div>
+          )}
         </section>
       </main>
 
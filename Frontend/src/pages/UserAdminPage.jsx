@@ -1,5 +1,5 @@
 import { useEffect, useState } from "react";
-import api from "../api";
+import api, { cargarPagina } from "../api";
 import Navbar from "../components/Navbar";
 import Footer from "../components/Footer";
 import "../styles/UserAdmin.css";
@@ -112,6 +112,8 @@ const [savingEspecialidad, setSavingEspecialidad] = useState(false);
   const [userMascotas, setUserMascotas] = useState([]);
   const [loadingMascotas, setLoadingMascotas] = useState(false);
   const [mascotasError, setMascotasError] = useState("");
+  const [mascotasSiguiente, setMascotasSiguiente] = useState(null); // cursor de la página siguiente
+  const [cargandoMasMascotas, setCargandoMasMascotas] = useState(false);
 
   const cargarUsuarios = async (tipoLista) => {
     try {
@@ -284,12 +286,15 @@ const guardarEspecialidades = async () => {
     setLoadingMascotas(true);
     setMascotasError("");
     setUserMascotas([]);
+    setMascotasSiguiente(null);
 
     try {
       // Endpoint admin:
       // GET /mascotas/por-usuario/<id>/
-      const res = await api.get(`/mascotas/por-usuario/${idUsuario}/`);
-      setUserMascotas(res.data);
+      // Paginado en el backend: primera página y "Cargar más" para el resto
+      const { datos, siguiente } = await cargarPagina(`/mascotas/por-usuario/${idUsuario}/`);
+      setUserMascotas(datos);
+      setMascotasSiguiente(siguiente);
     } catch (err) {
       console.error(err);
       setMascotasError("No se pudieron cargar las mascotas del usuario.");
@@ -298,6 +303,24 @@ const guardarEspecialidades = async () => {
     }
   };
 
+  const cargarMasMascotas = async () => {
+    if (!selectedUser) return;
+    try {
+      setCargandoMasMascotas(true);
+      const { datos, siguiente } = await cargarPagina(
+        `/mascotas/por-usuario/${selectedUser.id_usuario}/`,
+        { cursor: mascotasSiguiente }
+      );
+      setUserMascotas((prev) => [...prev, ...datos]);
+      setMascotasSiguiente(siguiente);
+    } catch (err) {
+      console.error(err);
+      setMascotasError("No se pudieron cargar más mascotas.");
+    } finally {
+      setCargandoMasMascotas(false);
+    }
+  };
+
   // Abrir y cerrar modal de detalle
  const abrirModalUsuario = (usuario) => {
   setSelectedUser(usuario);
@@ -313,6 +336,7 @@ const guardarEspecialidades = async () => {
 
     // limpiar estado mascotas
     setUserMascotas([]);
+    setMascotasSiguiente(null);
     setMascotasError("");
     setLoadingMascotas(false);
   };
@@ -764,6 +788,17 @@ const guardarEspecialidades = async () => {
                   ))}
                 </div>
               )}
+
+              {!loadingMascotas && !mascotasError && mascotasSiguiente && (
+                <button
+                  type="button"
+                  className="ua-btn-outline"
+                  onClick={cargarMasMascotas}
+                  disabled={cargandoMasMascotas}
+                >
+                  {cargandoMasMascotas ? "Cargando..." : "Cargar más mascotas"}
+                </button>
+              )}
             </div>
 
             <div className="ua-modal-footer">